@@ -0,0 +1,48 @@
+# Compares SymptomDB.deserialize on symptoms.json with the cached validators
+# and with the previous behaviour (a new Schema built and run on every call).
+# Run with:
+#   PYTHONPATH=src python benchmarks/symptomdb_deserialize.py
+import json
+import os
+import time
+from contextlib import contextmanager
+from schema import Schema
+
+from episcope.core import Attribute, Symptom, SymptomCategory, SymptomDB
+
+SYMPTOMS_PATH = os.path.join(os.path.dirname(__file__), "..", "symptoms.json")
+RUNS = 50
+
+# Restores the uncached validators: the schema is rebuilt on every call.
+@contextmanager
+def legacyValidators():
+    classes = [ Attribute, Symptom, SymptomCategory, SymptomDB ]
+    saved = [ x.__dict__['validateSchema'] for x in classes ]
+    for cls in classes:
+        definition = cls._SCHEMA.schema
+        cls.validateSchema = staticmethod(lambda data, definition=definition: Schema(definition).validate(data))
+    try:
+        yield
+    finally:
+        for cls, validator in zip(classes, saved):
+            cls.validateSchema = validator
+
+def timeIt(data) -> float:
+    begin = time.perf_counter()
+    for _ in range(RUNS):
+        SymptomDB.deserialize(data)
+    return (time.perf_counter() - begin) / RUNS
+
+def main() -> None:
+    with open(SYMPTOMS_PATH, "r") as f:
+        data = json.loads(f.read())
+
+    with legacyValidators():
+        old = timeIt(data)
+    new = timeIt(data)
+    print("{:>10} {:>10.2f} ms".format("legacy", old * 1000))
+    print("{:>10} {:>10.2f} ms".format("cached", new * 1000))
+    print("{:>10} {:>10.1f}x".format("speedup", old / new))
+
+if __name__ == '__main__':
+    main()
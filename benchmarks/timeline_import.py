@@ -0,0 +1,46 @@
+# Measures the cost of importing a timeline, item by item and through the
+# batch API. Run with:
+#   PYTHONPATH=src python benchmarks/timeline_import.py
+import random
+import time
+
+from episcope.core import Symptom, SymptomCategory, Timeline
+
+SIZES = [ 1000, 10000, 100000 ]
+
+def makeItems(count : int) -> list[tuple[Symptom, int, int]]:
+    category = SymptomCategory("objective_symptoms", "category")
+    model = Symptom("symptom", attributes = {}, category = None, is_instance = False)
+    category.addSymptom(model)
+    instance = model.instantiate()
+
+    rng = random.Random(0)
+    output = []
+    for _ in range(count):
+        start = rng.randrange(0, 24 * 3600 * 1000)
+        output.append((instance, start, start + rng.randrange(1000, 60000)))
+    return output
+
+def timeIt(function) -> float:
+    begin = time.perf_counter()
+    function()
+    return time.perf_counter() - begin
+
+def itemByItem(items) -> None:
+    timeline = Timeline()
+    for item in items:
+        timeline.addSymptom(*item)
+
+def bulk(items) -> None:
+    Timeline().bulkLoad(items)
+
+def main() -> None:
+    print("{:>8} {:>14} {:>14} {:>14}".format("items", "addSymptom (s)", "bulkLoad (s)", "us/item (bulk)"))
+    for size in SIZES:
+        items = makeItems(size)
+        slow = timeIt(lambda: itemByItem(items))
+        fast = timeIt(lambda: bulk(items))
+        print("{:>8} {:>14.3f} {:>14.3f} {:>14.2f}".format(size, slow, fast, fast / size * 1e6))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+import sys
+
+from episcope.cli import main
+
+sys.exit(main())
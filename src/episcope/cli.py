@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, Optional, TextIO
+
+from episcope.core import SymptomDB, Timeline, ReportInfo, loadSymptomDB
+from episcope.core import CohortIndex, CohortIndexWriter, Occurrence
+from episcope.core.cohort import after, before, overlapping, withinOnset
+
+@dataclass
+class BatchOptions:
+    input : str
+    output : str
+    report : bool
+    json : bool
+    # "png", "svg", or None to skip the frieze.
+    frieze : Optional[str]
+    # Frieze scale in px/ms, None for the default one.
+    unit : Optional[float]
+
+# Returns the paths of the timeline exports below |root|, relative to it and
+# sorted. |excluded| directories (the output one) are not visited.
+def findTimelines(root : str, excluded : Iterable[str] = ()) -> list[str]:
+    excluded = [ os.path.abspath(x) for x in excluded ]
+    output = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = sorted(x for x in subdirectories if os.path.abspath(os.path.join(directory, x)) not in excluded)
+        for name in files:
+            if name.endswith(".json") and name != "symptoms.json":
+                output.append(os.path.relpath(os.path.join(directory, name), root))
+    return sorted(output)
+
+# Converts the timeline at |relative| (to the input directory), and returns the
+# paths of the written files. The outputs mirror the input tree.
+def processTimeline(database : SymptomDB, options : BatchOptions, relative : str) -> list[str]:
+    with open(os.path.join(options.input, relative), "r") as f:
+        timeline = Timeline.fromJSON(f, database)
+
+    stem = os.path.join(options.output, os.path.splitext(relative)[0])
+    os.makedirs(os.path.dirname(stem), exist_ok=True)
+    output = []
+    if options.report:
+        with open(stem + ".txt", "w") as f:
+            f.write(timeline.toReport(ReportInfo("", "", "", "")))
+        output.append(stem + ".txt")
+
+    if options.json:
+        with open(stem + ".json", "w") as f:
+            timeline.writeJSON(f)
+        output.append(stem + ".json")
+
+    if options.frieze is not None:
+        # Qt is only loaded by the processes rendering friezes.
+        from episcope.gui.frieze import FriezeRenderer, ensureApplication
+        from episcope.gui.timeline import DEFAULT_ZOOM_UNIT
+        ensureApplication()
+        renderer = FriezeRenderer(timeline, DEFAULT_ZOOM_UNIT if options.unit is None else options.unit)
+        if options.frieze == "svg":
+            renderer.writeSVG(stem + ".svg")
+            output.append(stem + ".svg")
+        else:
+            output += renderer.writePNG(stem + ".png")
+    return output
+
+# Set once per worker process by _initWorker(): the database is sent to each
+# worker when it starts instead of with every file.
+_worker_database : Optional[SymptomDB] = None
+_worker_options : Optional[BatchOptions] = None
+
+def _initWorker(database : SymptomDB, options : BatchOptions) -> None:
+    global _worker_database, _worker_options
+    _worker_database = database
+    _worker_options = options
+
+# Errors are returned instead of raised: one bad file must not stop the batch.
+def _processInWorker(relative : str) -> tuple[str, Optional[str]]:
+    assert _worker_database is not None and _worker_options is not None
+    try:
+        processTimeline(_worker_database, _worker_options, relative)
+    except Exception as e:
+        return relative, f"{type(e).__name__}: {e}"
+    return relative, None
+
+# Converts all the timelines below |options.input| with |workers| processes,
+# reporting progress and errors on |log| (stderr by default). Returns the
+# number of failed files.
+def runBatch(database : SymptomDB, options : BatchOptions, workers : int, log : Optional[TextIO] = None) -> int:
+    log = sys.stderr if log is None else log
+    files = findTimelines(options.input, [ options.output ])
+    failures = 0
+
+    def report(index : int, relative : str, error : Optional[str]) -> None:
+        nonlocal failures
+        if error is None:
+            log.write(f"[{index}/{len(files)}] {relative}\n")
+        else:
+            failures += 1
+            log.write(f"[{index}/{len(files)}] {relative}: error: {error}\n")
+
+    if workers == 1:
+        _initWorker(database, options)
+        for index, relative in enumerate(files, 1):
+            report(index, *_processInWorker(relative))
+    else:
+        # Qt does not support being forked: workers start from a fresh interpreter.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, context, _initWorker, (database, options)) as executor:
+            futures = [ executor.submit(_processInWorker, x) for x in files ]
+            for index, future in enumerate(as_completed(futures), 1):
+                report(index, *future.result())
+
+    log.write(f"{len(files)} timelines, {failures} failed.\n")
+    return failures
+
+def _batch(args : argparse.Namespace) -> int:
+    if not (args.report or args.json or args.frieze):
+        args.report = True
+    database = loadSymptomDB(args.symptoms)
+    options = BatchOptions(args.input, args.output, args.report, args.json, args.frieze, args.unit)
+    return 1 if runBatch(database, options, args.workers) != 0 else 0
+
+# Indexes all the timelines below |root| into the cohort index |path|. The
+# exports are read without instantiating the symptoms: the |database|, if any,
+# only tells which attributes are free text, not to index. Returns the number
+# of failed files.
+def buildCohortIndex(root : str, path : str, log : Optional[TextIO] = None, database : Optional[SymptomDB] = None) -> int:
+    log = sys.stderr if log is None else log
+    files = findTimelines(root)
+    writer = CohortIndexWriter(database)
+    failures = 0
+    for relative in files:
+        try:
+            with open(os.path.join(root, relative), "r") as f:
+                items = json.load(f)
+            if type(items) is not list:
+                raise ValueError("Expected a list of timeline items.")
+            writer.addItems(relative, items)
+        except Exception as e:
+            failures += 1
+            log.write(f"{relative}: error: {type(e).__name__}: {e}\n")
+
+    with open(path, "wb") as f:
+        writer.write(f)
+    log.write(f"{len(writer)} timelines indexed, {failures} failed.\n")
+    return failures
+
+# Parses SYMPTOM[:ATTRIBUTE=VALUE[,ATTRIBUTE=VALUE...]]. SYMPTOM is a symptom
+# path or name.
+def parseSymptomFilter(value : str) -> tuple[str, dict[str, str]]:
+    symptom, _, selection = value.rpartition(":")
+    if not symptom or "=" not in selection:
+        return value, {}
+    attributes = {}
+    for entry in selection.split(","):
+        attribute, separator, selected = entry.partition("=")
+        if not separator or not attribute:
+            raise ValueError(f"Invalid attribute selection {entry!r}, expected ATTRIBUTE=VALUE.")
+        attributes[attribute] = selected
+    return symptom, attributes
+
+# Returns the occurrences matching the query |args|, sorted by file then start.
+def queryCohort(index : CohortIndex, args : argparse.Namespace) -> list[Occurrence]:
+    output = index.occurrences(*parseSymptomFilter(args.symptom))
+    if args.within_onset is not None:
+        output = withinOnset(index, output, args.within_onset)
+    for reference in args.after:
+        output = after(output, index.occurrences(*parseSymptomFilter(reference)), args.within)
+    for reference in args.before:
+        output = before(output, index.occurrences(*parseSymptomFilter(reference)), args.within)
+    for reference in args.overlapping:
+        output = overlapping(output, index.occurrences(*parseSymptomFilter(reference)))
+    return output
+
+def _index(args : argparse.Namespace) -> int:
+    database = None if args.symptoms is None else loadSymptomDB(args.symptoms)
+    return 1 if buildCohortIndex(args.input, args.output, database = database) != 0 else 0
+
+def _query(args : argparse.Namespace) -> int:
+    with CohortIndex(args.index) as index:
+        occurrences = queryCohort(index, args)
+        files = sorted({ x.file for x in occurrences })
+        if args.occurrences:
+            for x in occurrences:
+                print(f"{index.file(x.file)}\t{x.start}\t{x.end}")
+        else:
+            for file in files:
+                print(index.file(file))
+    sys.stderr.write(f"{len(occurrences)} occurrences in {len(files)} timelines.\n")
+    return 0
+
+def main(argv : Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="episcope", description="EpiScope command line tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch",
+                                help="convert a directory tree of timeline exports",
+                                description="Converts every timeline JSON export below INPUT. The outputs "
+                                            "mirror the input tree in OUTPUT. Writes the reports if no output "
+                                            "is selected.")
+    batch.add_argument("input", help="directory containing the timeline exports")
+    batch.add_argument("-o", "--output", default=".", help="output directory (default: current directory)")
+    batch.add_argument("--symptoms", default="symptoms.json", help="symptom database (default: %(default)s)")
+    batch.add_argument("--report", action="store_true", help="write the text reports (.txt)")
+    batch.add_argument("--json", action="store_true", help="re-export the timelines (.json)")
+    batch.add_argument("--frieze", choices=[ "png", "svg" ], help="render the friezes")
+    batch.add_argument("--unit", type=float, help="frieze scale, in pixels per millisecond")
+    batch.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                       help="number of worker processes (default: %(default)s)")
+    batch.set_defaults(run=_batch)
+
+    index = commands.add_parser("index",
+                                help="index a directory tree of timeline exports for queries",
+                                description="Builds the cohort index of every timeline JSON export below "
+                                            "INPUT, for the query command.")
+    index.add_argument("input", help="directory containing the timeline exports")
+    index.add_argument("-o", "--output", default="cohort.idx", help="index file (default: %(default)s)")
+    index.add_argument("--symptoms", help="symptom database, to only index the attributes with predefined values "
+                                          "(default: all the attributes but the notes)")
+    index.set_defaults(run=_index)
+
+    query = commands.add_parser("query",
+                                help="find the timelines matching temporal conditions",
+                                description="Lists the timelines with an occurrence of SYMPTOM matching all "
+                                            "the conditions. Symptoms are written SYMPTOM[:ATTRIBUTE=VALUE,...], "
+                                            "with SYMPTOM a symptom path or name. Times are in milliseconds.")
+    query.add_argument("index", help="index file, built by the index command")
+    query.add_argument("symptom", help="symptom to find, with its attribute values")
+    query.add_argument("--within-onset", type=int, metavar="MS",
+                       help="starting at most MS after the first symptom of the timeline")
+    query.add_argument("--after", action="append", default=[], metavar="SYMPTOM",
+                       help="starting at most --within after the start of SYMPTOM")
+    query.add_argument("--before", action="append", default=[], metavar="SYMPTOM",
+                       help="starting at most --within before the start of SYMPTOM")
+    query.add_argument("--within", type=int, metavar="MS", help="delay for --after and --before")
+    query.add_argument("--overlapping", action="append", default=[], metavar="SYMPTOM",
+                       help="intersecting an occurrence of SYMPTOM")
+    query.add_argument("--occurrences", action="store_true",
+                       help="print each matching occurrence with its start and end instead of the timelines")
+    query.set_defaults(run=_query)
+
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        if args.workers < 1 or (args.unit is not None and args.unit <= 0):
+            batch.error("--workers and --unit must be positive")
+        if args.json and os.path.abspath(args.input) == os.path.abspath(args.output):
+            batch.error("--json would overwrite the inputs, choose another --output")
+    elif args.command == "query":
+        if (args.after or args.before) and args.within is None:
+            query.error("--after and --before require --within")
+        if any(x is not None and x < 0 for x in (args.within, args.within_onset)):
+            query.error("--within and --within-onset must not be negative")
+        try:
+            for value in [ args.symptom ] + args.after + args.before + args.overlapping:
+                parseSymptomFilter(value)
+        except ValueError as e:
+            query.error(str(e))
+    return args.run(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,9 @@
 from .attribute import Attribute, AttributeType
 from .symptom import Symptom, SymptomCategory
-from .timeline import Timeline, BlockType, ReportInfo
+from .timeline import Timeline, TimelineItem, TimelineJSONWriter, BlockType, ReportInfo, readTimelineJSON
+from .timeline import TimelineChange, TimelineEvent
 from .database import SymptomDB
+from .archive import TimelineArchive, writeTimelineArchive
+from .columns import TimelineColumns
+from .cache import loadSymptomDB
+from .cohort import CohortIndex, CohortIndexWriter, Occurrence
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import mmap
+import struct
+import sys
+from array import array
+from typing import Self, BinaryIO, Iterator, TYPE_CHECKING
+
+from episcope.core import Symptom, Attribute, AttributeType
+from episcope.core.timeline import Timeline, TimelineItem
+from episcope.core.binary import StringTable, align, column, writeSections
+
+if TYPE_CHECKING:
+    from episcope.core import SymptomDB
+
+# Binary timeline container. All integers are little-endian, and every section
+# starts on an 8-byte boundary:
+#   header      magic, version, item/selection/string counts
+#   starts      int64[items]
+#   ends        int64[items]
+#   paths       uint32[items]           string id of the symptom path
+#   spans       uint32[items + 1]       selections of item i: [spans[i], spans[i + 1])
+#   selections  (uint32 name, uint32 text, uint64 mask)[selections]
+#   offsets     uint32[strings + 1]     string i: blob[offsets[i]:offsets[i + 1]]
+#   blob        utf-8 bytes
+# Selections of exclusive/mix attributes are bitmasks over the attribute
+# values. Text attributes reference their content in the string table, with
+# one consecutive selection per value (version 1 only wrote single values).
+ARCHIVE_MAGIC = b"EPTL"
+ARCHIVE_VERSION = 2
+_READ_VERSIONS = (1, 2)
+
+_HEADER = struct.Struct("<4sHHIII")
+_SELECTION = struct.Struct("<IIQ")
+_NO_STRING = 0xFFFFFFFF
+_MAX_VALUES = 64
+
+def _encodeSelections(attribute : Attribute, strings : StringTable) -> list[tuple[int, int, int]]:
+    name = strings.add(attribute.name)
+    if attribute.type == AttributeType.TEXT:
+        return [ (name, strings.add(x), 0) for x in attribute.selection ]
+
+    if len(attribute.values) > _MAX_VALUES:
+        raise ValueError(f"Attribute {attribute.name!r} has more than {_MAX_VALUES} values.")
+    return [ (name, _NO_STRING, attribute.selectionMask()) ]
+
+def writeTimelineArchive(timeline : Timeline, stream : BinaryIO) -> None:
+    strings = StringTable()
+    starts, ends, paths, spans = [], [], [], [ 0 ]
+    selections = bytearray()
+    for item in timeline.getSymptoms():
+        serialized = item.symptom.serialize()
+        starts.append(int(item.start))
+        ends.append(int(item.start + item.duration))
+        paths.append(strings.add(serialized['path']))
+        for name in serialized['attributes']:
+            for selection in _encodeSelections(item.symptom.attributes[name], strings):
+                selections += _SELECTION.pack(*selection)
+        spans.append(len(selections) // _SELECTION.size)
+    offsets, blob = strings.encode()
+
+    sections = [
+        column('q', starts).tobytes(),
+        column('q', ends).tobytes(),
+        column('I', paths).tobytes(),
+        column('I', spans).tobytes(),
+        bytes(selections),
+        column('I', offsets).tobytes(),
+        blob,
+    ]
+    writeSections(stream, _HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0, len(starts), spans[-1], len(offsets) - 1), sections)
+
+# Read-only view over a binary timeline archive. The file is memory-mapped:
+# start/end columns are exposed without copy, strings and symptoms are only
+# decoded when accessed.
+class TimelineArchive():
+    def __init__(self : Self, path : str) -> None:
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parseHeader()
+        except Exception:
+            self._mmap.close()
+            raise
+        self._strings : dict[int, str] = {}
+
+    def __enter__(self : Self) -> Self:
+        return self
+
+    def __exit__(self : Self, *args) -> None:
+        self.close()
+
+    def __len__(self : Self) -> int:
+        return self._count
+
+    # Note: the views returned by starts(), ends() must be released before closing.
+    def close(self : Self) -> None:
+        self._mmap.close()
+
+    def _parseHeader(self : Self) -> None:
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError("Invalid timeline archive: file too small.")
+        magic, version, _, count, selection_count, string_count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != ARCHIVE_MAGIC:
+            raise ValueError("Invalid timeline archive: bad magic.")
+        if version not in _READ_VERSIONS:
+            raise ValueError(f"Unsupported timeline archive version {version}.")
+
+        self._count = count
+        self._selection_count = selection_count
+        self._string_count = string_count
+
+        position = align(_HEADER.size)
+        self._starts_offset = position
+        position = align(position + 8 * count)
+        self._ends_offset = position
+        position = align(position + 8 * count)
+        self._paths_offset = position
+        position = align(position + 4 * count)
+        self._spans_offset = position
+        position = align(position + 4 * (count + 1))
+        self._selections_offset = position
+        position = align(position + _SELECTION.size * selection_count)
+        self._string_offsets_offset = position
+        self._blob_offset = align(position + 4 * (string_count + 1))
+        if len(self._mmap) < self._blob_offset or len(self._mmap) < self._blob_offset + self._uint32(self._string_offsets_offset, string_count):
+            raise ValueError("Invalid timeline archive: file truncated.")
+
+    def _uint32(self : Self, offset : int, index : int) -> int:
+        return struct.unpack_from("<I", self._mmap, offset + 4 * index)[0]
+
+    def _int64Column(self : Self, offset : int) -> memoryview:
+        view = memoryview(self._mmap)[offset:offset + 8 * self._count]
+        if sys.byteorder != "little":
+            output = array('q')
+            output.frombytes(view)
+            output.byteswap()
+            return memoryview(output)
+        return view.cast('q')
+
+    def starts(self : Self) -> memoryview:
+        return self._int64Column(self._starts_offset)
+
+    def ends(self : Self) -> memoryview:
+        return self._int64Column(self._ends_offset)
+
+    def string(self : Self, identifier : int) -> str:
+        if identifier not in self._strings:
+            if identifier >= self._string_count:
+                raise ValueError(f"Invalid timeline archive: unknown string {identifier}.")
+            begin = self._blob_offset + self._uint32(self._string_offsets_offset, identifier)
+            end = self._blob_offset + self._uint32(self._string_offsets_offset, identifier + 1)
+            self._strings[identifier] = str(self._mmap[begin:end], "utf-8")
+        return self._strings[identifier]
+
+    def path(self : Self, index : int) -> str:
+        return self.string(self._uint32(self._paths_offset, index))
+
+    def _decodeSymptom(self : Self, index : int, database : SymptomDB) -> Symptom:
+        path = self.path(index)
+        output = database.fromPath(path).instantiate()
+        begin = self._uint32(self._spans_offset, index)
+        end = self._uint32(self._spans_offset, index + 1)
+        texts : dict[str, list[str]] = {}
+        for i in range(begin, end):
+            name_id, text_id, mask = _SELECTION.unpack_from(self._mmap, self._selections_offset + i * _SELECTION.size)
+            name = self.string(name_id)
+            if name not in output.attributes:
+                raise ValueError(f"Invalid attribute {name!r} for symptom {path!r}.")
+            attribute = output.attributes[name]
+
+            if attribute.type == AttributeType.TEXT:
+                texts.setdefault(name, []).append(self.string(text_id))
+                attribute.selection = texts[name]
+                continue
+
+            attribute.setSelectionMask(mask)
+        return output
+
+    def item(self : Self, index : int, database : SymptomDB) -> TimelineItem:
+        if index < 0 or index >= self._count:
+            raise IndexError(f"Invalid item index {index}.")
+        start = struct.unpack_from("<q", self._mmap, self._starts_offset + 8 * index)[0]
+        end = struct.unpack_from("<q", self._mmap, self._ends_offset + 8 * index)[0]
+        return TimelineItem(index + 1, self._decodeSymptom(index, database), start, end - start)
+
+    def items(self : Self, database : SymptomDB) -> Iterator[TimelineItem]:
+        for i in range(self._count):
+            yield self.item(i, database)
+
+    def toTimeline(self : Self, database : SymptomDB) -> Timeline:
+        output = Timeline()
+        output.bulkLoad((x.symptom, x.start, x.start + x.duration) for x in self.items(database))
+        return output
@@ -1,7 +1,7 @@
 import json
 from enum import Enum
 from typing import Self
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from schema import Schema, And, SchemaError, Optional
 
 
@@ -13,11 +13,10 @@ class AttributeType(Enum):
 
     @staticmethod
     def contains(value : str) -> bool:
-        try:
-            AttributeType[value]
-        except ValueError:
-            return False
-        return True
+        return value in AttributeType.__members__
+
+def _isStringList(data) -> bool:
+    return type(data) is list and all(type(x) is str for x in data)
 
 @dataclass
 class Attribute:
@@ -25,6 +24,65 @@ class Attribute:
     type : AttributeType
     values : list[str]
     selection : list[str]
+    # value -> bit index, shared by all the instances of a definition.
+    _index : dict[str, int] | None = field(default=None, init=False, repr=False, compare=False)
+    # Cached selectionMask(), reset when the selection is assigned. The
+    # selection list is replaced, never modified in place.
+    _mask : int | None = field(default=None, init=False, repr=False, compare=False)
+
+    def __setattr__(self : Self, name : str, value) -> None:
+        if name == 'selection':
+            object.__setattr__(self, '_mask', None)
+        object.__setattr__(self, name, value)
+
+    def valueIndex(self : Self) -> dict[str, int]:
+        if self._index is None:
+            self._index = { value: bit for bit, value in enumerate(self.values) }
+        return self._index
+
+    # Selection of an exclusive/mix attribute as a bitmask over its values.
+    def selectionMask(self : Self) -> int:
+        assert self.type != AttributeType.TEXT
+        if self._mask is not None:
+            return self._mask
+        index = self.valueIndex()
+        mask = 0
+        for value in self.selection:
+            if value not in index:
+                raise ValueError(f"Unknown value {value!r} for attribute {self.name!r}.")
+            mask |= 1 << index[value]
+        self._mask = mask
+        return mask
+
+    def setSelectionMask(self : Self, mask : int) -> None:
+        assert self.type != AttributeType.TEXT
+        if mask < 0 or mask >> len(self.values) != 0:
+            raise ValueError(f"Invalid selection mask {mask:#x} for attribute {self.name!r}.")
+        selection = [ value for bit, value in enumerate(self.values) if mask & (1 << bit) ]
+        if self.type != AttributeType.MIX and len(selection) > 1:
+            raise ValueError(f"Too many elements in field 'selection' of attribute {self.name!r}.")
+        self.selection = selection
+        self._mask = mask
+
+    # Hashable, order-independent identity of the selection, used to compare
+    # or aggregate selections.
+    def selectionKey(self : Self) -> tuple[str, int | tuple[str, ...]]:
+        if self.type == AttributeType.TEXT:
+            return (self.name, tuple(self.selection))
+        return (self.name, self.selectionMask())
+
+    # Selections are compared as bitmasks: the order of a mix selection does
+    # not matter. Selections with unknown values have no mask, they are
+    # compared as sets.
+    def __eq__(self : Self, other : object) -> bool:
+        if not isinstance(other, Attribute):
+            return NotImplemented
+        if self.type != other.type or not (self.values is other.values or self.values == other.values):
+            return False
+        try:
+            return self.selectionKey() == other.selectionKey()
+        except ValueError:
+            return self.name == other.name and frozenset(self.selection) == frozenset(other.selection)
 
     def getTooltipText(self : Self) -> str:
         assert len(self.selection) != 0
@@ -40,6 +98,14 @@ class Attribute:
             output += ", ".join(self.selection)
         return output
 
+    # Returns an attribute sharing the definition (name, type, values) of this
+    # one, with its own selection.
+    def instantiate(self : Self) -> "Attribute":
+        output = Attribute(self.name, self.type, self.values, list(self.selection))
+        output._index = self.valueIndex()
+        output._mask = self._mask
+        return output
+
     def hasSelection(self : Self) -> bool:
         return len(self.selection) != 0
 
@@ -52,12 +118,12 @@ class Attribute:
             data = Attribute.validateSchema(data)
 
             attribute_type = AttributeType[data['type'].upper()]
+            output = Attribute(data['name'], attribute_type, data['values'], selection = data['selection'])
             if attribute_type != AttributeType.TEXT:
                 if len(data['values']) == 0:
                     raise SchemaError("values field is required for non-text attributes.")
-                for x in data['selection']:
-                    if x not in data['values']:
-                        raise ValueError(f"Unknown value {x!r} for attribute {data['name']!r}.")
+                # Validates the selection against the value index.
+                output.selectionMask()
 
             if attribute_type != AttributeType.MIX and len(data['selection']) > 1:
                 raise ValueError(f"Too many elements in field 'selection' of attribute {data['name']!r}.")
@@ -65,15 +131,35 @@ class Attribute:
             e.add_note('Parsed item was:\n{}'.format(json.dumps(data, indent=4)))
             raise
 
-        return Attribute(data['name'], attribute_type, data['values'], selection = data['selection'])
+        return output
+
+    _SCHEMA = Schema({
+            'name': str,
+            'type': And(str, lambda x: AttributeType.contains(x.upper())),
+            Optional('values', default=[]): [ str ],
+            Optional('selection', default=[]): [ str ],
+    })
+    _KEYS = frozenset([ 'name', 'type', 'values', 'selection' ])
+
+    # Checks the common, valid shapes directly. Returns None if the schema
+    # validator is required (invalid data, or to produce the error).
+    @staticmethod
+    def _fastValidate(data : dict) -> dict | None:
+        if type(data) is not dict or not data.keys() <= Attribute._KEYS:
+            return None
+        name = data.get('name')
+        kind = data.get('type')
+        if type(name) is not str or type(kind) is not str or not AttributeType.contains(kind.upper()):
+            return None
+        values = data.get('values', [])
+        selection = data.get('selection', [])
+        if not _isStringList(values) or not _isStringList(selection):
+            return None
+        return { 'name': name, 'type': kind, 'values': list(values), 'selection': list(selection) }
 
     @staticmethod
     def validateSchema(data : dict):
-        schema = Schema({
-                'name': str,
-                'type': And(str, lambda x: AttributeType.contains(x.upper())),
-                Optional('values', default=[]): [ str ],
-                Optional('selection', default=[]): [ str ],
-
-        })
-        return schema.validate(data)
+        output = Attribute._fastValidate(data)
+        if output is not None:
+            return output
+        return Attribute._SCHEMA.validate(data)
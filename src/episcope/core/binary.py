@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from typing import Self, BinaryIO
+
+# Helpers shared by the binary formats (timeline archives, cohort indexes):
+# little-endian columns and string tables, in sections starting on an 8-byte
+# boundary.
+
+def align(offset : int) -> int:
+    return (offset + 7) & ~7
+
+def column(typecode : str, values : list[int]) -> array:
+    output = array(typecode, values)
+    if sys.byteorder != "little":
+        output.byteswap()
+    return output
+
+# Deduplicated strings, identified by their insertion order. Encoded as the
+# offsets of each string in a blob of utf-8 bytes:
+#   string i: blob[offsets[i]:offsets[i + 1]]
+class StringTable():
+    def __init__(self : Self) -> None:
+        self._ids : dict[str, int] = {}
+
+    def add(self : Self, value : str) -> int:
+        if value not in self._ids:
+            self._ids[value] = len(self._ids)
+        return self._ids[value]
+
+    def encode(self : Self) -> tuple[list[int], bytes]:
+        offsets = [ 0 ]
+        blob = bytearray()
+        for value in self._ids:
+            blob += value.encode("utf-8")
+            offsets.append(len(blob))
+        return offsets, bytes(blob)
+
+# Writes |header|, then each of the |sections| padded to start on an 8-byte
+# boundary.
+def writeSections(stream : BinaryIO, header : bytes, sections : list[bytes]) -> None:
+    position = len(header)
+    stream.write(header)
+    for section in sections:
+        padding = align(position) - position
+        stream.write(b"\0" * padding)
+        stream.write(section)
+        position += padding + len(section)
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from functools import cache
+
+import episcope
+from episcope.core.database import SymptomDB
+
+# Bump when the layout of the cached objects changes.
+CACHE_FORMAT = 1
+CACHE_SUFFIX = ".cache"
+
+def cachePath(path : str) -> str:
+    return path + CACHE_SUFFIX
+
+# Hash of the episcope.core sources, which define the pickled classes: editing
+# them invalidates the cache even if the package version is not bumped.
+@cache
+def _codeFingerprint() -> str:
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".py"):
+                with open(os.path.join(directory, name), "rb") as f:
+                    digest.update(name.encode("utf-8") + b"\0" + f.read())
+    except OSError:
+        # Sources not available (frozen application): rely on the version.
+        return ""
+    return digest.hexdigest()
+
+def _cacheKey(content : bytes) -> tuple[int, str, str, str]:
+    return (CACHE_FORMAT, episcope.__version__, _codeFingerprint(), hashlib.sha256(content).hexdigest())
+
+def _readCache(path : str, key : tuple[int, str, str, str]) -> SymptomDB | None:
+    try:
+        with open(path, "rb") as f:
+            # The key is pickled separately so a stale database is never unpickled.
+            if pickle.load(f) != key:
+                return None
+            database = pickle.load(f)
+    except Exception:
+        # Missing, truncated or incompatible cache: rebuild it.
+        return None
+    return database if isinstance(database, SymptomDB) else None
+
+def _writeCache(path : str, key : tuple[int, str, str, str], database : SymptomDB) -> None:
+    # The cache is an optimization only: failing to write it (read-only
+    # directory, full disk...) is not an error.
+    try:
+        f = tempfile.NamedTemporaryFile("wb", dir=os.path.dirname(os.path.abspath(path)), delete=False)
+    except OSError:
+        return
+    try:
+        with f:
+            pickle.dump(key, f)
+            pickle.dump(database, f)
+        # Atomic, so concurrent instances never read a partial cache.
+        os.replace(f.name, path)
+    except OSError:
+        try:
+            os.remove(f.name)
+        except OSError:
+            pass
+
+# Loads the symptom semiology from the JSON file at |path|. The built database
+# is cached next to it, keyed by the file content, the package version and the
+# code of the cached classes, so later loads skip parsing and validation. The
+# cache is trusted as much as the JSON file itself.
+def loadSymptomDB(path : str) -> SymptomDB:
+    with open(path, "rb") as f:
+        content = f.read()
+
+    key = _cacheKey(content)
+    database = _readCache(cachePath(path), key)
+    if database is not None:
+        return database
+
+    database = SymptomDB.deserialize(json.loads(content))
+    _writeCache(cachePath(path), key, database)
+    return database
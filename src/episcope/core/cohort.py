@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Self, BinaryIO, Iterable, Optional, TYPE_CHECKING
+
+from episcope.core import AttributeType
+from episcope.core.timeline import Timeline, TimelineItem
+from episcope.core.binary import StringTable, align, column, writeSections
+
+if TYPE_CHECKING:
+    from episcope.core import SymptomDB
+
+# Inverted index over a cohort of timeline exports. Each symptom path, and each
+# (symptom path, attribute, value) selection of an exclusive/mix attribute, is
+# a term with the list of its occurrences (postings) in the indexed files.
+# Free text is not indexed. All integers are little-endian,
+# and every section starts on an 8-byte boundary:
+#   header          magic, version, file/term/posting counts
+#   onsets          int64[files]            start of the first item of each file
+#   starts          int64[postings]
+#   ends            int64[postings]
+#   files           uint32[postings]        file of each posting
+#   items           uint32[postings]        item of each posting in its file
+#   spans           uint32[terms + 1]       postings of term i: [spans[i], spans[i + 1])
+#   file offsets    uint32[files + 1]       file names: string table
+#   file blob       utf-8 bytes
+#   term offsets    uint32[terms + 1]       terms, sorted: string table
+#   term blob       utf-8 bytes
+# The postings of a term are sorted by file, then start.
+COHORT_MAGIC = b"EPCI"
+COHORT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHHIII")
+# Separates the symptom path, attribute name and value in selection terms.
+_SEPARATOR = "\x1f"
+# Free-text attribute of every symptom.
+_NOTES = "notes"
+_INDEXED_TYPES = (AttributeType.EXCLUSIVE, AttributeType.MIX)
+
+def _selectionTerm(path : str, attribute : str, value : str) -> str:
+    return _SEPARATOR.join((path, attribute, value))
+
+@dataclass(frozen=True)
+class Occurrence:
+    file : int
+    item : int
+    start : int
+    end : int
+
+# Collects the items of the timelines to index, then writes the index at once.
+# Without a symptom |database|, the attribute types are unknown: all the
+# attributes but the notes are indexed.
+class CohortIndexWriter():
+    def __init__(self : Self, database : Optional[SymptomDB] = None) -> None:
+        self._database = database
+        self._files : list[str] = []
+        self._onsets : list[int] = []
+        self._postings : dict[str, list[tuple[int, int, int, int]]] = {}
+        self._names : set[str] = set()
+
+    def __len__(self : Self) -> int:
+        return len(self._files)
+
+    # Terms of a serialized item: its path and its indexed selections. With a
+    # database, unknown symptoms and attributes are rejected.
+    def _itemTerms(self : Self, item : dict) -> list[str]:
+        path = item['symptom']['path']
+        symptom = None if self._database is None else self._database.fromPath(path)
+        output = [ path ]
+        for attribute, values in item['symptom']['attributes'].items():
+            if symptom is None:
+                if attribute == _NOTES:
+                    continue
+            elif attribute not in symptom.attributes:
+                raise ValueError(f"Invalid attribute {attribute!r} for symptom {path!r}.")
+            elif symptom.attributes[attribute].type not in _INDEXED_TYPES:
+                continue
+            output += [ _selectionTerm(path, attribute, x) for x in set(values) ]
+        return output
+
+    # Adds the file |name|, with the (start, end, terms) of each of its items.
+    def _addFile(self : Self, name : str, entries : list[tuple[int, int, list[str]]]) -> None:
+        if name in self._names:
+            raise ValueError(f"File {name} is already indexed.")
+        self._names.add(name)
+        file = len(self._files)
+        self._files.append(name)
+        self._onsets.append(min((start for start, _, _ in entries), default=0))
+        for index, (start, end, terms) in enumerate(entries):
+            posting = (file, start, index, end)
+            for term in terms:
+                self._postings.setdefault(term, []).append(posting)
+
+    # Adds the file |name|, with its items in the serialized format of the
+    # JSON exports. Invalid items raise before anything is added.
+    def addItems(self : Self, name : str, items : Iterable[dict]) -> None:
+        items = [ TimelineItem.validateSchema(x) for x in items ]
+        self._addFile(name, [ (x['start'], x['end'], self._itemTerms(x)) for x in items ])
+
+    # The symptoms of a timeline know their attribute types: no database needed.
+    def addTimeline(self : Self, name : str, timeline : Timeline) -> None:
+        entries = []
+        for item in timeline.getSymptoms():
+            path = item.symptom.serialize()['path']
+            terms = [ path ]
+            for attribute in item.symptom.attributes.values():
+                if attribute.type in _INDEXED_TYPES:
+                    terms += [ _selectionTerm(path, attribute.name, x) for x in set(attribute.selection) ]
+            entries.append((int(item.start), int(item.start + item.duration), terms))
+        self._addFile(name, entries)
+
+    def write(self : Self, stream : BinaryIO) -> None:
+        terms = sorted(self._postings)
+        starts, ends, files, items, spans = [], [], [], [], [ 0 ]
+        for term in terms:
+            # Sorted by (file, start): files are added in order, only starts need sorting.
+            for file, start, item, end in sorted(self._postings[term]):
+                starts.append(start)
+                ends.append(end)
+                files.append(file)
+                items.append(item)
+            spans.append(len(starts))
+
+        file_table, term_table = StringTable(), StringTable()
+        for name in self._files:
+            file_table.add(name)
+        for term in terms:
+            term_table.add(term)
+        file_offsets, file_blob = file_table.encode()
+        term_offsets, term_blob = term_table.encode()
+
+        sections = [
+            column('q', self._onsets).tobytes(),
+            column('q', starts).tobytes(),
+            column('q', ends).tobytes(),
+            column('I', files).tobytes(),
+            column('I', items).tobytes(),
+            column('I', spans).tobytes(),
+            column('I', file_offsets).tobytes(),
+            file_blob,
+            column('I', term_offsets).tobytes(),
+            term_blob,
+        ]
+        writeSections(stream, _HEADER.pack(COHORT_MAGIC, COHORT_VERSION, 0, len(self._files), len(terms), len(starts)), sections)
+
+# Read-only view over a cohort index. The file is memory-mapped: the terms are
+# decoded when opening, the postings of a term only when it is queried.
+class CohortIndex():
+    def __init__(self : Self, path : str) -> None:
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def __enter__(self : Self) -> Self:
+        return self
+
+    def __exit__(self : Self, *args) -> None:
+        self.close()
+
+    def __len__(self : Self) -> int:
+        return self._file_count
+
+    def close(self : Self) -> None:
+        self._mmap.close()
+
+    def _parse(self : Self) -> None:
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError("Invalid cohort index: file too small.")
+        magic, version, _, file_count, term_count, posting_count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != COHORT_MAGIC:
+            raise ValueError("Invalid cohort index: bad magic.")
+        if version != COHORT_VERSION:
+            raise ValueError(f"Unsupported cohort index version {version}.")
+        self._file_count = file_count
+        self._posting_count = posting_count
+
+        position = align(_HEADER.size)
+        self._onsets_offset = position
+        position = align(position + 8 * file_count)
+        self._starts_offset = position
+        position = align(position + 8 * posting_count)
+        self._ends_offset = position
+        position = align(position + 8 * posting_count)
+        self._files_offset = position
+        position = align(position + 4 * posting_count)
+        self._items_offset = position
+        position = align(position + 4 * posting_count)
+        self._spans_offset = position
+        position = align(position + 4 * (term_count + 1))
+        self._file_offsets_offset = position
+        position = align(position + 4 * (file_count + 1))
+        self._file_blob_offset = position
+        if len(self._mmap) < position:
+            raise ValueError("Invalid cohort index: file truncated.")
+        position = align(position + self._uint32(self._file_offsets_offset, file_count))
+        term_offsets_offset = position
+        position = align(position + 4 * (term_count + 1))
+        if len(self._mmap) < position or len(self._mmap) < position + self._uint32(term_offsets_offset, term_count):
+            raise ValueError("Invalid cohort index: file truncated.")
+
+        offsets = self._uint32Column(term_offsets_offset, term_count + 1)
+        blob = self._mmap[position:position + offsets[-1]]
+        self._terms = { str(blob[offsets[i]:offsets[i + 1]], "utf-8"): i for i in range(term_count) }
+        # Symptom paths per symptom name, to query by name.
+        self._paths : dict[str, list[str]] = {}
+        for term in self._terms:
+            if _SEPARATOR not in term:
+                self._paths.setdefault(term.rsplit("/", 1)[-1], []).append(term)
+
+    def _uint32(self : Self, offset : int, index : int) -> int:
+        return struct.unpack_from("<I", self._mmap, offset + 4 * index)[0]
+
+    def _uint32Column(self : Self, offset : int, count : int) -> array:
+        output = array('I')
+        output.frombytes(self._mmap[offset:offset + 4 * count])
+        if sys.byteorder != "little":
+            output.byteswap()
+        return output
+
+    def _int64Column(self : Self, offset : int, begin : int, end : int) -> array:
+        output = array('q')
+        output.frombytes(self._mmap[offset + 8 * begin:offset + 8 * end])
+        if sys.byteorder != "little":
+            output.byteswap()
+        return output
+
+    def file(self : Self, index : int) -> str:
+        if index < 0 or index >= self._file_count:
+            raise IndexError(f"Invalid file index {index}.")
+        begin = self._uint32(self._file_offsets_offset, index)
+        end = self._uint32(self._file_offsets_offset, index + 1)
+        return str(self._mmap[self._file_blob_offset + begin:self._file_blob_offset + end], "utf-8")
+
+    # Start of the first symptom of the file.
+    def onset(self : Self, index : int) -> int:
+        return struct.unpack_from("<q", self._mmap, self._onsets_offset + 8 * index)[0]
+
+    def symptoms(self : Self) -> list[str]:
+        return sorted(x for x in self._terms if _SEPARATOR not in x)
+
+    # Returns the indexed symptom paths matching |symptom|: a full path, or the
+    # name of the symptom in any category.
+    def resolve(self : Self, symptom : str) -> list[str]:
+        if symptom in self._terms:
+            return [ symptom ]
+        return sorted(self._paths.get(symptom, []))
+
+    def _postings(self : Self, term : str) -> list[Occurrence]:
+        index = self._terms.get(term)
+        if index is None:
+            return []
+        begin = self._uint32(self._spans_offset, index)
+        end = self._uint32(self._spans_offset, index + 1)
+        files = self._uint32Column(self._files_offset + 4 * begin, end - begin)
+        items = self._uint32Column(self._items_offset + 4 * begin, end - begin)
+        starts = self._int64Column(self._starts_offset, begin, end)
+        ends = self._int64Column(self._ends_offset, begin, end)
+        return list(map(Occurrence, files, items, starts, ends))
+
+    # Returns the occurrences of |symptom| (path or name) with all the given
+    # attribute values selected, sorted by file then start.
+    def occurrences(self : Self, symptom : str, attributes : Optional[dict[str, str]] = None) -> list[Occurrence]:
+        output = []
+        for path in self.resolve(symptom):
+            postings = self._postings(path)
+            for attribute, value in (attributes or {}).items():
+                selected = { (x.file, x.item) for x in self._postings(_selectionTerm(path, attribute, value)) }
+                postings = [ x for x in postings if (x.file, x.item) in selected ]
+            output += postings
+        return sorted(output, key=lambda x: (x.file, x.start, x.item))
+
+# Temporal predicates: filter |occurrences| against other occurrences in the
+# same file. All of them keep the order of |occurrences|.
+
+def _startsPerFile(occurrences : list[Occurrence]) -> dict[int, list[int]]:
+    output : dict[int, list[int]] = {}
+    for x in occurrences:
+        output.setdefault(x.file, []).append(x.start)
+    for starts in output.values():
+        starts.sort()
+    return output
+
+# Keeps the occurrences starting at most |delay| ms after the first symptom of
+# their file.
+def withinOnset(index : CohortIndex, occurrences : list[Occurrence], delay : int) -> list[Occurrence]:
+    return [ x for x in occurrences if x.start - index.onset(x.file) <= delay ]
+
+# Keeps the occurrences starting at most |within| ms after the start of one of
+# the |references|.
+def after(occurrences : list[Occurrence], references : list[Occurrence], within : int) -> list[Occurrence]:
+    starts = _startsPerFile(references)
+    return [ x for x in occurrences
+             if bisect_right(starts.get(x.file, []), x.start) != bisect_left(starts.get(x.file, []), x.start - within) ]
+
+# Keeps the occurrences starting at most |within| ms before the start of one of
+# the |references|.
+def before(occurrences : list[Occurrence], references : list[Occurrence], within : int) -> list[Occurrence]:
+    starts = _startsPerFile(references)
+    return [ x for x in occurrences
+             if bisect_right(starts.get(x.file, []), x.start + within) != bisect_left(starts.get(x.file, []), x.start) ]
+
+# Keeps the occurrences intersecting one of the |references|.
+def overlapping(occurrences : list[Occurrence], references : list[Occurrence]) -> list[Occurrence]:
+    intervals : dict[int, list[tuple[int, int]]] = {}
+    for x in references:
+        intervals.setdefault(x.file, []).append((x.start, x.end))
+    # Per file: reference starts, and the maximum end of the references up to each.
+    lookup : dict[int, tuple[list[int], list[int]]] = {}
+    for file, values in intervals.items():
+        values.sort()
+        ends, max_end = [], None
+        for _, end in values:
+            max_end = end if max_end is None else max(max_end, end)
+            ends.append(max_end)
+        lookup[file] = ([ x[0] for x in values ], ends)
+
+    output = []
+    for x in occurrences:
+        if x.file not in lookup:
+            continue
+        starts, ends = lookup[x.file]
+        # References starting before the end of |x|: one of them must end after its start.
+        count = bisect_left(starts, x.end)
+        if count != 0 and ends[count - 1] > x.start:
+            output.append(x)
+    return output
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import operator
+from array import array
+from typing import Self, Iterable
+
+from episcope.core.timeline import Timeline
+from episcope.core.archive import TimelineArchive
+
+# Columnar copy of the timing information of a timeline: one array per field,
+# symptoms are referenced by an index in |paths|. This is a read-only snapshot
+# for statistics, not a storage backend: edits to the timeline are not
+# reflected. Built from an archive, no symptom is decoded.
+class TimelineColumns():
+    def __init__(self : Self,
+                 starts : Iterable[int] = (),
+                 durations : Iterable[int] = (),
+                 symptoms : Iterable[int] = (),
+                 paths : Iterable[str] = ()) -> None:
+        self.starts = array('q', starts)
+        self.durations = array('q', durations)
+        self.symptoms = array('I', symptoms)
+        self.paths = list(paths)
+        if not len(self.starts) == len(self.durations) == len(self.symptoms):
+            raise ValueError("Columns must have the same length.")
+
+    def __len__(self : Self) -> int:
+        return len(self.starts)
+
+    @staticmethod
+    def fromTimeline(timeline : Timeline) -> TimelineColumns:
+        paths : dict[str, int] = {}
+        starts, durations, symptoms = [], [], []
+        for item in timeline.getSymptoms():
+            path = item.symptom.serialize()['path']
+            starts.append(item.start)
+            durations.append(item.duration)
+            symptoms.append(paths.setdefault(path, len(paths)))
+        return TimelineColumns(starts, durations, symptoms, list(paths))
+
+    # Builds the columns straight from the memory-mapped archive, without
+    # decoding any symptom.
+    @staticmethod
+    def fromArchive(archive : TimelineArchive) -> TimelineColumns:
+        paths : dict[str, int] = {}
+        symptoms = [ paths.setdefault(archive.path(i), len(paths)) for i in range(len(archive)) ]
+        starts = archive.starts()
+        ends = archive.ends()
+        try:
+            return TimelineColumns(starts, map(operator.sub, ends, starts), symptoms, list(paths))
+        finally:
+            starts.release()
+            ends.release()
+
+    def ends(self : Self) -> array:
+        return array('q', map(operator.add, self.starts, self.durations))
+
+    # Sum of the item durations (overlapping items are counted twice).
+    def totalDuration(self : Self) -> int:
+        return sum(self.durations)
+
+    # Time covered by at least one item of each symptom, overlaps merged.
+    def coverage(self : Self) -> dict[str, int]:
+        output = dict.fromkeys(self.paths, 0)
+        current, covered_start, covered_end = None, 0, 0
+        for symptom, start, end in sorted(zip(self.symptoms, self.starts, self.ends())):
+            if symptom != current or start > covered_end:
+                if current is not None:
+                    output[self.paths[current]] += covered_end - covered_start
+                current, covered_start, covered_end = symptom, start, end
+            elif end > covered_end:
+                covered_end = end
+        if current is not None:
+            output[self.paths[current]] += covered_end - covered_start
+        return output
@@ -1,19 +1,69 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import json
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Self
-from schema import Schema, Optional, SchemaError
+from typing import Self, Optional
+from schema import Schema, SchemaError
 
 from episcope.core import SymptomCategory, Symptom, Attribute
 
+# Trie over the 'family/category/symptom' path components.
+class _PathTrie():
+    def __init__(self : Self) -> None:
+        self.children : dict[str, _PathTrie] = {}
+        self.path : Optional[str] = None
+
+    def insert(self : Self, path : str) -> None:
+        node : _PathTrie = self
+        for part in path.split("/"):
+            node = node.children.setdefault(part, _PathTrie())
+        node.path = path
+
+    def _collect(self : Self, output : list[str]) -> None:
+        if self.path is not None:
+            output.append(self.path)
+        for child in self.children.values():
+            child._collect(output)
+
+    # The last component of |prefix| can be partial, the others must match exactly.
+    def withPrefix(self : Self, prefix : str) -> list[str]:
+        *parts, last = prefix.split("/")
+        node : _PathTrie = self
+        for part in parts:
+            if part not in node.children:
+                return []
+            node = node.children[part]
+
+        output : list[str] = []
+        for name, child in node.children.items():
+            if name.startswith(last):
+                child._collect(output)
+        return output
+
 @dataclass
 class SymptomDB:
     attributes : list[Attribute]
     objective : list[SymptomCategory]
     subjective : list[SymptomCategory]
+    _paths : dict[str, Symptom] = field(init=False, repr=False, compare=False)
+    _trie : _PathTrie = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self : Self) -> None:
+        self._paths = {}
+        self._trie = _PathTrie()
+        for family, categories in [ ("objective_symptoms", self.objective), ("subjective_symptoms", self.subjective) ]:
+            for category in categories:
+                for symptom in category.symptoms():
+                    path = f"{family}/{category.name()}/{symptom.name}"
+                    self._paths[path] = symptom
+                    self._trie.insert(path)
 
     def fromPath(self : Self, path : str) -> Symptom:
+        if path in self._paths:
+            return self._paths[path]
+
+        # Slow path, only used to report what is wrong with the path.
         parts = path.split("/")
         if len(parts) != 3:
             raise ValueError(f"Invalid symptom path {path!r}. Expected format: 'familiy/category/symptom'.")
@@ -38,6 +88,13 @@ class SymptomDB:
                 return symptom
         raise ValueError(f"Invalid symptom path {path!r}. Unknown symptom {parts[2]!r}.")
 
+    def paths(self : Self) -> list[str]:
+        return list(self._paths)
+
+    # Returns the paths of all the symptoms starting with |prefix|, in database order.
+    def pathsWithPrefix(self : Self, prefix : str) -> list[str]:
+        return self._trie.withPrefix(prefix)
+
     @staticmethod
     def deserialize(data : dict):
         try:
@@ -55,12 +112,18 @@ class SymptomDB:
         objective = [ SymptomCategory.deserialize("objective_symptoms", attributes, x) for x in data['objective_symptoms'] ]
         return SymptomDB(attributes, objective, subjective)
 
+    _SCHEMA = Schema({
+        "attributes": list[dict],
+        "objective_symptoms": list[dict],
+        "subjective_symptoms": list[dict]
+    })
+    _KEYS = frozenset([ "attributes", "objective_symptoms", "subjective_symptoms" ])
+
     @staticmethod
     def validateSchema(data : dict):
-        schema = Schema({
-            "attributes": list[dict],
-            "objective_symptoms": list[dict],
-            "subjective_symptoms": list[dict]
-        })
-        return schema.validate(data)
+        # As for the schema, the lists must not be empty.
+        if type(data) is dict and data.keys() == SymptomDB._KEYS and \
+                all(type(x) is list and len(x) != 0 for x in data.values()):
+            return dict(data)
+        return SymptomDB._SCHEMA.validate(data)
 
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+from typing import Self, Optional, Any, Iterator
+
+# Keys are (start, identifier) tuples: the identifier breaks ties between
+# intervals starting at the same time.
+Key = tuple[int, int]
+
+class _Node:
+    __slots__ = ('key', 'end', 'value', 'left', 'right', 'height', 'max_end')
+
+    def __init__(self : Self, key : Key, end : int, value : Any) -> None:
+        self.key = key
+        self.end = end
+        self.value = value
+        self.left : Optional[_Node] = None
+        self.right : Optional[_Node] = None
+        self.height = 1
+        self.max_end = end
+
+def _height(node : Optional[_Node]) -> int:
+    return 0 if node is None else node.height
+
+def _update(node : _Node) -> None:
+    node.height = 1 + max(_height(node.left), _height(node.right))
+    max_end = node.end
+    if node.left is not None and node.left.max_end > max_end:
+        max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > max_end:
+        max_end = node.right.max_end
+    node.max_end = max_end
+
+def _rotateLeft(node : _Node) -> _Node:
+    pivot = node.right
+    assert pivot is not None
+    node.right = pivot.left
+    pivot.left = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+def _rotateRight(node : _Node) -> _Node:
+    pivot = node.left
+    assert pivot is not None
+    node.left = pivot.right
+    pivot.right = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+def _rebalance(node : _Node) -> _Node:
+    _update(node)
+    balance = _height(node.left) - _height(node.right)
+    # An unbalanced side is at least 2 high: it is never empty.
+    if balance > 1:
+        assert node.left is not None
+        if _height(node.left.left) < _height(node.left.right):
+            node.left = _rotateLeft(node.left)
+        return _rotateRight(node)
+    if balance < -1:
+        assert node.right is not None
+        if _height(node.right.right) < _height(node.right.left):
+            node.right = _rotateRight(node.right)
+        return _rotateLeft(node)
+    return node
+
+# AVL tree of half-open intervals [start, end), ordered by (start, identifier)
+# and augmented with the maximum end of each subtree. Insertion, removal and
+# neighbour lookups are O(log n), overlap queries are O(log n + k).
+class IntervalTree():
+    def __init__(self : Self) -> None:
+        self._root : Optional[_Node] = None
+        self._size : int = 0
+
+    # Builds a balanced tree in O(n) from (key, end, value) tuples sorted by key.
+    @staticmethod
+    def fromSorted(items : list[tuple[Key, int, Any]]) -> IntervalTree:
+        output = IntervalTree()
+        output._root = IntervalTree._build(items, 0, len(items))
+        output._size = len(items)
+        return output
+
+    @staticmethod
+    def _build(items : list[tuple[Key, int, Any]], begin : int, end : int) -> Optional[_Node]:
+        if begin >= end:
+            return None
+        middle = (begin + end) // 2
+        node = _Node(*items[middle])
+        node.left = IntervalTree._build(items, begin, middle)
+        node.right = IntervalTree._build(items, middle + 1, end)
+        _update(node)
+        return node
+
+    def __len__(self : Self) -> int:
+        return self._size
+
+    def __iter__(self : Self) -> Iterator[Any]:
+        stack : list[_Node] = []
+        node = self._root
+        while len(stack) != 0 or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.value
+            node = node.right
+
+    def maxEnd(self : Self) -> Optional[int]:
+        return None if self._root is None else self._root.max_end
+
+    def insert(self : Self, key : Key, end : int, value : Any) -> None:
+        self._root = self._insert(self._root, key, end, value)
+        self._size += 1
+
+    def _insert(self : Self, node : Optional[_Node], key : Key, end : int, value : Any) -> _Node:
+        if node is None:
+            return _Node(key, end, value)
+        if key == node.key:
+            raise KeyError(f"Duplicate key {key}.")
+        if key < node.key:
+            node.left = self._insert(node.left, key, end, value)
+        else:
+            node.right = self._insert(node.right, key, end, value)
+        return _rebalance(node)
+
+    def remove(self : Self, key : Key) -> None:
+        self._root = self._remove(self._root, key)
+        self._size -= 1
+
+    def _remove(self : Self, node : Optional[_Node], key : Key) -> Optional[_Node]:
+        if node is None:
+            raise KeyError(f"Unknown key {key}.")
+        if key < node.key:
+            node.left = self._remove(node.left, key)
+        elif key > node.key:
+            node.right = self._remove(node.right, key)
+        else:
+            if node.left is None:
+                return node.right
+            if node.right is None:
+                return node.left
+            # Replace the node by its in-order successor.
+            successor = node.right
+            while successor.left is not None:
+                successor = successor.left
+            node.right = self._remove(node.right, successor.key)
+            node.key = successor.key
+            node.end = successor.end
+            node.value = successor.value
+        return _rebalance(node)
+
+    # Returns the value of the last interval whose key is strictly lower than |key|.
+    def predecessor(self : Self, key : Key) -> Optional[Any]:
+        output = None
+        node = self._root
+        while node is not None:
+            if node.key < key:
+                output = node
+                node = node.right
+            else:
+                node = node.left
+        return None if output is None else output.value
+
+    # Returns the value of the first interval whose key is strictly greater than |key|.
+    def successor(self : Self, key : Key) -> Optional[Any]:
+        output = None
+        node = self._root
+        while node is not None:
+            if node.key > key:
+                output = node
+                node = node.left
+            else:
+                node = node.right
+        return None if output is None else output.value
+
+    # Returns the values of all intervals intersecting [start, end), sorted by key.
+    def overlapping(self : Self, start : int, end : int) -> list[Any]:
+        output : list[Any] = []
+        self._overlapping(self._root, start, end, output)
+        return output
+
+    def _overlapping(self : Self, node : Optional[_Node], start : int, end : int, output : list[Any]) -> None:
+        if node is None or node.max_end <= start:
+            return
+        self._overlapping(node.left, start, end, output)
+        # Everything on the right starts after this node: nothing more can overlap.
+        if node.key[0] >= end:
+            return
+        if node.end > start:
+            output.append(node.value)
+        self._overlapping(node.right, start, end, output)
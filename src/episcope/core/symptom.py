@@ -7,10 +7,12 @@ from schema import Schema, Optional, SchemaError, Or
 
 import json
 import traceback
-import copy
 
 from episcope.core import Attribute, AttributeType
 
+def _isDictList(data) -> bool:
+    return type(data) is list and all(type(x) is dict for x in data)
+
 @dataclass
 class Symptom:
     name : str
@@ -27,24 +29,26 @@ class Symptom:
         if 'notes' not in self.attributes:
             self.attributes['notes'] = Attribute('notes', AttributeType.TEXT, [], [])
 
-    def instantiate(self : Self) -> Self:
-        output = copy.deepcopy(self)
-        output.is_instance = True
-        return output
+    # Instances share the model definition (name, category, attribute values)
+    # instead of deep-copying it, only the attribute selections are copied.
+    def instantiate(self : Self) -> Symptom:
+        attributes = { name: attribute.instantiate() for name, attribute in self.attributes.items() }
+        return Symptom(self.name, attributes, self.category, is_instance = True)
 
-    def instantiateFromJSON(self : Self, attributes : dict[str, list[str]]) -> Self:
+    def instantiateFromJSON(self : Self, attributes : dict[str, list[str]]) -> Symptom:
         output = self.instantiate()
 
         for name, values in attributes.items():
             if name not in self.attributes:
-                raise ValueError(f"Invalid attribute {name!r} for symptom {parts[2]!r}.")
+                raise ValueError(f"Invalid attribute {name!r} for symptom {self.name!r}.")
 
             output.attributes[name].selection = values
             if self.attributes[name].type == AttributeType.TEXT:
                 continue
 
+            index = self.attributes[name].valueIndex()
             for x in values:
-                if x not in self.attributes[name].values:
+                if x not in index:
                     raise ValueError(f"Invalid attribute value {x!r} for attribute {name!r}.")
         return output
 
@@ -90,8 +94,9 @@ class Symptom:
         if selection is None:
             return
 
+        index = attribute.valueIndex()
         for item in selection:
-            if item not in attribute.values:
+            if item not in index:
                 raise ValueError(f"Unknown value {item!r} for attribute {name!r}.")
 
     @staticmethod
@@ -115,7 +120,8 @@ class Symptom:
 
                 attributes[name] = global_attributes[name]
                 if values is not None:
-                    attributes[name].selection = values
+                    # Don't leak the selection into the shared global attribute.
+                    attributes[name] = replace(global_attributes[name], selection = values)
                     is_instance = True
 
             for item in custom_attributes:
@@ -133,14 +139,34 @@ class Symptom:
             raise
         return Symptom(data['name'], attributes, category = None, is_instance = is_instance)
 
+    _SCHEMA = Schema({
+            'name': str,
+            Optional('custom_attributes', default=[]): [ dict ],
+            Optional('attributes', default=dict()): Or(dict[str, Union[None, list[str]]], list[str]),
+    })
+    _KEYS = frozenset([ 'name', 'custom_attributes', 'attributes' ])
+
+    # Checks the common, valid shapes directly. Returns None if the schema
+    # validator is required (invalid data, or to produce the error).
+    @staticmethod
+    def _fastValidate(data : dict) -> dict | None:
+        if type(data) is not dict or not data.keys() <= Symptom._KEYS or type(data.get('name')) is not str:
+            return None
+        custom_attributes = data.get('custom_attributes', [])
+        if not _isDictList(custom_attributes):
+            return None
+        # As for the schema, an explicit 'attributes' field must not be empty.
+        attributes = data.get('attributes', dict())
+        if 'attributes' in data and (type(attributes) not in (dict, list) or len(attributes) == 0):
+            return None
+        return { 'name': data['name'], 'custom_attributes': list(custom_attributes), 'attributes': attributes }
+
     @staticmethod
     def validateSchema(data : dict):
-        schema = Schema({
-                'name': str,
-                Optional('custom_attributes', default=[]): [ dict ],
-                Optional('attributes', default=dict()): Or(dict[str, Union[None, list[str]]], list[str]),
-        })
-        return schema.validate(data)
+        output = Symptom._fastValidate(data)
+        if output is not None:
+            return output
+        return Symptom._SCHEMA.validate(data)
 
 class SymptomCategory:
     def __init__(self : Self, symptom_family : str, name : str):
@@ -183,10 +209,14 @@ class SymptomCategory:
             output.addSymptom(Symptom.deserialize(attributes, child))
         return output
 
+    _SCHEMA = Schema({
+            'name': str,
+            'children': [ dict ]
+    })
+
     @staticmethod
     def validateSchema(data : dict):
-        schema = Schema({
-                'name': str,
-                'children': [ dict ]
-        })
-        return schema.validate(data)
+        if type(data) is dict and data.keys() == { 'name', 'children' } and \
+                type(data['name']) is str and _isDictList(data['children']):
+            return { 'name': data['name'], 'children': list(data['children']) }
+        return SymptomCategory._SCHEMA.validate(data)
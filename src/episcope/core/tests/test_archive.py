@@ -0,0 +1,168 @@
+import pytest
+from episcope.core import SymptomDB, Timeline, TimelineArchive, writeTimelineArchive
+
+@pytest.fixture()
+def database() -> SymptomDB:
+    return SymptomDB.deserialize({
+        "attributes": [
+            {
+                "name": "topography",
+                "type": "mix",
+                "values": [ "head", "body", "arm" ]
+            },
+            {
+                "name": "lateralized",
+                "type": "exclusive",
+                "values": [ "left", "right" ]
+            }
+        ],
+        "objective_symptoms": [
+            {
+                "name": "Motor",
+                "children": [
+                    { "name": "Clonic", "attributes": [ "topography", "lateralized" ] },
+                    { "name": "Tonic" }
+                ]
+            }
+        ],
+        "subjective_symptoms": [
+            {
+                "name": "Sensory",
+                "children": [ { "name": "Aura" } ]
+            }
+        ]
+    })
+
+@pytest.fixture()
+def timeline(database) -> Timeline:
+    clonic = database.fromPath("objective_symptoms/Motor/Clonic").instantiateFromJSON({
+        "topography": [ "head", "arm" ],
+        "lateralized": [ "right" ],
+        "notes": [ "some notes\non two lines" ]
+    })
+    tonic = database.fromPath("objective_symptoms/Motor/Tonic").instantiate()
+    aura = database.fromPath("subjective_symptoms/Sensory/Aura").instantiate()
+
+    output = Timeline()
+    output.addSymptom(tonic, 5000, 9000)
+    output.addSymptom(clonic, 1000, 20000)
+    output.addSymptom(aura, 0, 500)
+    return output
+
+def write(timeline, path):
+    with open(path, "wb") as f:
+        writeTimelineArchive(timeline, f)
+    return path
+
+def test_roundtrip(database, timeline, tmp_path):
+    path = write(timeline, tmp_path / "timeline.bin")
+
+    with TimelineArchive(path) as archive:
+        loaded = archive.toTimeline(database)
+
+    assert loaded.toJSON() == timeline.toJSON()
+
+def test_mix_selection_in_value_order(database, timeline, tmp_path):
+    timeline.getSymptoms()[1].symptom.attributes['topography'].selection = [ "arm", "head" ]
+    path = write(timeline, tmp_path / "timeline.bin")
+
+    with TimelineArchive(path) as archive:
+        item = archive.item(1, database)
+
+    assert item.symptom.attributes['topography'].selection == [ "head", "arm" ]
+
+def test_columns(timeline, tmp_path):
+    path = write(timeline, tmp_path / "timeline.bin")
+
+    archive = TimelineArchive(path)
+    starts = archive.starts()
+    ends = archive.ends()
+
+    assert len(archive) == 3
+    assert starts.tolist() == [ 0, 1000, 5000 ]
+    assert ends.tolist() == [ 500, 20000, 9000 ]
+    assert archive.path(1) == "objective_symptoms/Motor/Clonic"
+
+    starts.release()
+    ends.release()
+    archive.close()
+
+def test_item(database, timeline, tmp_path):
+    path = write(timeline, tmp_path / "timeline.bin")
+
+    with TimelineArchive(path) as archive:
+        item = archive.item(1, database)
+
+    assert item.identifier == 2
+    assert item.start == 1000
+    assert item.duration == 19000
+    assert item.symptom.isInstance()
+    assert item.symptom.attributes['topography'].selection == [ "head", "arm" ]
+    assert item.symptom.attributes['lateralized'].selection == [ "right" ]
+    assert item.symptom.attributes['notes'].selection == [ "some notes\non two lines" ]
+
+def test_empty(database, tmp_path):
+    path = write(Timeline(), tmp_path / "timeline.bin")
+
+    with TimelineArchive(path) as archive:
+        assert len(archive) == 0
+        assert archive.toTimeline(database).getSymptoms() == []
+
+def test_text_values(database, timeline, tmp_path):
+    # The JSON format accepts any number of values for a text attribute.
+    timeline.getSymptoms()[1].symptom.attributes['notes'].selection = [ "first", "second" ]
+    path = write(timeline, tmp_path / "timeline.bin")
+
+    with TimelineArchive(path) as archive:
+        loaded = archive.toTimeline(database)
+
+    assert loaded.getSymptoms()[1].symptom.attributes['notes'].selection == [ "first", "second" ]
+    assert loaded.toJSON() == timeline.toJSON()
+
+def test_reads_version_1(database, timeline, tmp_path):
+    path = write(timeline, tmp_path / "timeline.bin")
+    data = bytearray(path.read_bytes())
+    data[4] = 1
+    path.write_bytes(bytes(data))
+
+    with TimelineArchive(path) as archive:
+        assert archive.toTimeline(database).toJSON() == timeline.toJSON()
+
+def test_bad_magic(tmp_path):
+    path = tmp_path / "timeline.bin"
+    path.write_bytes(b"NOPE" + b"\0" * 32)
+
+    with pytest.raises(ValueError) as e:
+        TimelineArchive(path)
+    assert str(e.value) == "Invalid timeline archive: bad magic."
+
+def test_bad_version(timeline, tmp_path):
+    path = write(timeline, tmp_path / "timeline.bin")
+    data = bytearray(path.read_bytes())
+    data[4] = 42
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError) as e:
+        TimelineArchive(path)
+    assert str(e.value) == "Unsupported timeline archive version 42."
+
+def test_truncated(timeline, tmp_path):
+    path = write(timeline, tmp_path / "timeline.bin")
+    path.write_bytes(path.read_bytes()[:-4])
+
+    with pytest.raises(ValueError) as e:
+        TimelineArchive(path)
+    assert str(e.value) == "Invalid timeline archive: file truncated."
+
+def test_unknown_symptom(timeline, tmp_path):
+    path = write(timeline, tmp_path / "timeline.bin")
+    other = SymptomDB.deserialize({
+        "attributes": [ { "name": "lateralized", "type": "exclusive", "values": [ "left", "right" ] } ],
+        "objective_symptoms": [ { "name": "Motor", "children": [ { "name": "Tonic" } ] } ],
+        "subjective_symptoms": [ { "name": "Sensory", "children": [ { "name": "Aura" } ] } ]
+    })
+
+    with TimelineArchive(path) as archive:
+        with pytest.raises(ValueError) as e:
+            archive.toTimeline(other)
+    assert str(e.value) == "Invalid symptom path 'objective_symptoms/Motor/Clonic'. Unknown symptom 'Clonic'."
@@ -205,3 +205,100 @@ def test_tooltip_text_escaping():
 
     assert attribute.getTooltipText() == "notes: \n" + \
                                          "  some text \"with\" characters"
+
+@pytest.mark.parametrize("data", [
+    { "name": "abc", "type": "exclusive", "values": [ "a", "b" ] },
+    { "name": "abc", "type": "MIX", "values": [ "a", "b" ], "selection": [ "b", "a" ] },
+    { "name": "notes", "type": "text" },
+])
+def test_validate_schema_fast_path(data):
+    assert Attribute._fastValidate(data) is not None
+    assert Attribute.validateSchema(data) == Attribute._SCHEMA.validate(data)
+
+@pytest.mark.parametrize("data", [
+    { "name": "abc", "type": "exclusive", "values": [ "a", 1 ] },
+    { "name": "abc", "type": "exclusive", "other": 1 },
+    { "name": "abc", "type": "unknown" },
+    { "type": "mix" },
+])
+def test_validate_schema_fallback(data):
+    assert Attribute._fastValidate(data) is None
+    with pytest.raises(schema.SchemaError):
+        Attribute.validateSchema(data)
+
+def test_value_index():
+    attribute = Attribute("abc", AttributeType.MIX, [ "a", "b", "c" ], selection = [])
+
+    assert attribute.valueIndex() == { "a": 0, "b": 1, "c": 2 }
+
+def test_value_index_shared_by_instances():
+    attribute = Attribute("abc", AttributeType.MIX, [ "a", "b", "c" ], selection = [])
+
+    assert attribute.instantiate().valueIndex() is attribute.valueIndex()
+
+def test_selection_mask():
+    attribute = Attribute("abc", AttributeType.MIX, [ "a", "b", "c" ], selection = [ "c", "a" ])
+
+    assert attribute.selectionMask() == 0b101
+
+def test_selection_mask_unknown_value():
+    attribute = Attribute("abc", AttributeType.MIX, [ "a", "b", "c" ], selection = [ "d" ])
+    with pytest.raises(ValueError) as e:
+        attribute.selectionMask()
+    assert str(e.value) == "Unknown value 'd' for attribute 'abc'."
+
+def test_set_selection_mask():
+    attribute = Attribute("abc", AttributeType.MIX, [ "a", "b", "c" ], selection = [])
+
+    attribute.setSelectionMask(0b110)
+
+    assert attribute.selection == [ "b", "c" ]
+
+def test_set_selection_mask_out_of_range():
+    attribute = Attribute("abc", AttributeType.MIX, [ "a", "b", "c" ], selection = [])
+    with pytest.raises(ValueError) as e:
+        attribute.setSelectionMask(0b1000)
+    assert str(e.value) == "Invalid selection mask 0x8 for attribute 'abc'."
+
+def test_set_selection_mask_exclusive_multiple():
+    attribute = Attribute("abc", AttributeType.EXCLUSIVE, [ "a", "b" ], selection = [])
+    with pytest.raises(ValueError) as e:
+        attribute.setSelectionMask(0b11)
+    assert str(e.value) == "Too many elements in field 'selection' of attribute 'abc'."
+
+def test_selection_key():
+    first = Attribute("abc", AttributeType.MIX, [ "a", "b", "c" ], selection = [ "c", "a" ])
+    second = Attribute("abc", AttributeType.MIX, [ "a", "b", "c" ], selection = [ "a", "c" ])
+    text = Attribute("notes", AttributeType.TEXT, [], selection = [ "some text" ])
+
+    assert first.selectionKey() == second.selectionKey()
+    assert len({ first.selectionKey(), second.selectionKey() }) == 1
+    assert text.selectionKey() == ("notes", ("some text",))
+
+def test_equality_ignores_mix_order():
+    first = Attribute("abc", AttributeType.MIX, [ "a", "b", "c" ], selection = [ "c", "a" ])
+
+    assert first == Attribute("abc", AttributeType.MIX, [ "a", "b", "c" ], selection = [ "a", "c" ])
+    assert first != Attribute("abc", AttributeType.MIX, [ "a", "b", "c" ], selection = [ "a" ])
+    assert first != Attribute("abd", AttributeType.MIX, [ "a", "b", "c" ], selection = [ "a", "c" ])
+    assert first != Attribute("abc", AttributeType.MIX, [ "a", "b", "d" ], selection = [ "a", "c" ])
+    assert Attribute("t", AttributeType.TEXT, [], selection = [ "x" ]) != Attribute("t", AttributeType.TEXT, [], selection = [ "y" ])
+
+def test_equality_unknown_values():
+    first = Attribute("abc", AttributeType.MIX, [ "a", "b" ], selection = [ "d", "a" ])
+
+    assert first == Attribute("abc", AttributeType.MIX, [ "a", "b" ], selection = [ "a", "d" ])
+    assert first != Attribute("abc", AttributeType.MIX, [ "a", "b" ], selection = [ "a" ])
+    assert first != Attribute("abd", AttributeType.MIX, [ "a", "b" ], selection = [ "a", "d" ])
+
+def test_selection_mask_reset_on_assignment():
+    attribute = Attribute("abc", AttributeType.MIX, [ "a", "b", "c" ], selection = [ "a" ])
+    assert attribute.selectionMask() == 0b001
+
+    attribute.selection = [ "b", "c" ]
+
+    assert attribute.selectionMask() == 0b110
+    assert attribute.instantiate().selectionMask() == 0b110
+    attribute.selection = [ "d" ]
+    with pytest.raises(ValueError):
+        attribute.selectionMask()
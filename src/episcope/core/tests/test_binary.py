@@ -0,0 +1,21 @@
+import io
+from episcope.core.binary import StringTable, align, column, writeSections
+
+def test_align():
+    assert [ align(x) for x in [ 0, 1, 7, 8, 9 ] ] == [ 0, 8, 8, 8, 16 ]
+
+def test_column():
+    assert column('I', [ 1, 2 ]).tobytes() == b"\1\0\0\0\2\0\0\0"
+
+def test_string_table():
+    strings = StringTable()
+
+    assert [ strings.add(x) for x in [ "a", "bé", "a" ] ] == [ 0, 1, 0 ]
+    assert strings.encode() == ([ 0, 1, 4 ], "abé".encode("utf-8"))
+
+def test_write_sections():
+    stream = io.BytesIO()
+
+    writeSections(stream, b"head", [ b"abc", b"d" ])
+
+    assert stream.getvalue() == b"head\0\0\0\0abc\0\0\0\0\0d"
@@ -0,0 +1,102 @@
+import json
+import os
+import pytest
+import episcope
+from episcope.core import SymptomDB, loadSymptomDB
+from episcope.core import cache
+from episcope.core.cache import cachePath
+
+SAMPLE_DB = {
+    "attributes": [
+        { "name": "lateralized", "type": "exclusive", "values": [ "left", "right" ] }
+    ],
+    "objective_symptoms": [
+        { "name": "Motor", "children": [ { "name": "Tonic", "attributes": [ "lateralized" ] } ] }
+    ],
+    "subjective_symptoms": [
+        { "name": "Sensory", "children": [ { "name": "Aura" } ] }
+    ]
+}
+
+@pytest.fixture()
+def path(tmp_path) -> str:
+    output = str(tmp_path / "symptoms.json")
+    with open(output, "w") as f:
+        f.write(json.dumps(SAMPLE_DB))
+    return output
+
+def forbidDeserialize(monkeypatch):
+    def fail(data):
+        raise AssertionError("The cache should have been used.")
+    monkeypatch.setattr(SymptomDB, "deserialize", staticmethod(fail))
+
+def test_load_creates_cache(path):
+    database = loadSymptomDB(path)
+
+    assert os.path.exists(cachePath(path))
+    assert database.paths() == [ "objective_symptoms/Motor/Tonic", "subjective_symptoms/Sensory/Aura" ]
+
+def test_load_from_cache(path, monkeypatch):
+    loadSymptomDB(path)
+    forbidDeserialize(monkeypatch)
+
+    database = loadSymptomDB(path)
+
+    assert database.fromPath("objective_symptoms/Motor/Tonic").attributes['lateralized'].values == [ "left", "right" ]
+    assert database.fromPath("objective_symptoms/Motor/Tonic").category is database.objective[0]
+
+def test_cache_invalidated_on_change(path):
+    loadSymptomDB(path)
+    data = json.loads(json.dumps(SAMPLE_DB))
+    data["subjective_symptoms"][0]["children"].append({ "name": "Fear" })
+    with open(path, "w") as f:
+        f.write(json.dumps(data))
+
+    database = loadSymptomDB(path)
+
+    assert "subjective_symptoms/Sensory/Fear" in database.paths()
+
+def test_cache_invalidated_on_version_change(path, monkeypatch):
+    loadSymptomDB(path)
+    monkeypatch.setattr(episcope, "__version__", "something else")
+    calls = []
+    deserialize = SymptomDB.deserialize
+    monkeypatch.setattr(SymptomDB, "deserialize", staticmethod(lambda data: calls.append(data) or deserialize(data)))
+
+    loadSymptomDB(path)
+
+    assert len(calls) == 1
+
+def test_corrupted_cache(path):
+    with open(cachePath(path), "wb") as f:
+        f.write(b"garbage")
+
+    database = loadSymptomDB(path)
+
+    assert len(database.paths()) == 2
+    assert loadSymptomDB(path).paths() == database.paths()
+
+def test_unwritable_cache(path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("Read-only file system")
+    monkeypatch.setattr("tempfile.NamedTemporaryFile", fail)
+
+    database = loadSymptomDB(path)
+
+    assert len(database.paths()) == 2
+    assert not os.path.exists(cachePath(path))
+
+def test_cache_invalidated_on_code_change(path, monkeypatch):
+    loadSymptomDB(path)
+    monkeypatch.setattr(cache, "_codeFingerprint", lambda: "something else")
+    calls = []
+    deserialize = SymptomDB.deserialize
+    monkeypatch.setattr(SymptomDB, "deserialize", staticmethod(lambda data: calls.append(data) or deserialize(data)))
+
+    loadSymptomDB(path)
+
+    assert len(calls) == 1
+
+def test_code_fingerprint():
+    assert cache._codeFingerprint() != ""
+    assert cache._codeFingerprint() == cache._codeFingerprint()
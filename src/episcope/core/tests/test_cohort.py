@@ -0,0 +1,135 @@
+import pytest
+from episcope.core import CohortIndex, CohortIndexWriter, Occurrence, SymptomDB, Timeline
+from episcope.core.cohort import after, before, overlapping, withinOnset
+
+def item(path, start, end, **attributes):
+    return { "symptom": { "path": path, "attributes": attributes }, "start": start, "end": end }
+
+HEAD = "objective_symptoms/Motor/Head version"
+TONIC = "objective_symptoms/Motor/Tonic"
+AURA = "subjective_symptoms/Sensory/Aura"
+
+@pytest.fixture()
+def path(tmp_path):
+    writer = CohortIndexWriter()
+    writer.addItems("a.json", [ item(AURA, 2000, 3000),
+                                item(HEAD, 8000, 15000, lateralized = [ "left" ], notes = [ "brief" ]),
+                                item(TONIC, 14000, 30000) ])
+    writer.addItems("b.json", [ item(HEAD, 40000, 45000, lateralized = [ "left" ]),
+                                item(TONIC, 1000, 5000),
+                                item(HEAD, 3000, 4000, lateralized = [ "right" ]) ])
+    writer.addItems("c.json", [])
+    output = tmp_path / "cohort.idx"
+    with open(output, "wb") as f:
+        writer.write(f)
+    return output
+
+def test_files(path):
+    with CohortIndex(path) as index:
+        assert len(index) == 3
+        assert [ index.file(x) for x in range(3) ] == [ "a.json", "b.json", "c.json" ]
+        assert [ index.onset(x) for x in range(3) ] == [ 2000, 1000, 0 ]
+        with pytest.raises(IndexError):
+            index.file(3)
+
+def test_symptoms(path):
+    with CohortIndex(path) as index:
+        assert index.symptoms() == [ HEAD, TONIC, AURA ]
+        assert index.resolve("Head version") == [ HEAD ]
+        assert index.resolve(AURA) == [ AURA ]
+        assert index.resolve("Clonic") == []
+
+def test_occurrences(path):
+    with CohortIndex(path) as index:
+        assert index.occurrences("Head version") == [ Occurrence(0, 1, 8000, 15000),
+                                                      Occurrence(1, 2, 3000, 4000),
+                                                      Occurrence(1, 0, 40000, 45000) ]
+        assert index.occurrences(HEAD, { "lateralized": "left" }) == [ Occurrence(0, 1, 8000, 15000),
+                                                                       Occurrence(1, 0, 40000, 45000) ]
+        # Free text is not indexed.
+        assert index.occurrences(HEAD, { "lateralized": "left", "notes": "brief" }) == []
+        assert index.occurrences(HEAD, { "lateralized": "up" }) == []
+        assert index.occurrences("Clonic") == []
+
+def test_within_onset(path):
+    with CohortIndex(path) as index:
+        heads = index.occurrences("Head version", { "lateralized": "left" })
+        assert withinOnset(index, heads, 10000) == [ Occurrence(0, 1, 8000, 15000) ]
+        assert withinOnset(index, heads, 5000) == []
+
+def test_after_before(path):
+    with CohortIndex(path) as index:
+        heads = index.occurrences("Head version")
+        tonic = index.occurrences("Tonic")
+        assert after(heads, tonic, 2000) == [ Occurrence(1, 2, 3000, 4000) ]
+        assert after(heads, tonic, 1000) == []
+        assert before(heads, tonic, 6000) == [ Occurrence(0, 1, 8000, 15000) ]
+        assert before(heads, index.occurrences("Aura"), 100000) == []
+
+def test_overlapping(path):
+    with CohortIndex(path) as index:
+        heads = index.occurrences("Head version")
+        assert overlapping(heads, index.occurrences("Tonic")) == [ Occurrence(0, 1, 8000, 15000),
+                                                                   Occurrence(1, 2, 3000, 4000) ]
+        assert overlapping(heads, index.occurrences("Aura")) == []
+
+def test_add_timeline(tmp_path):
+    database = SymptomDB.deserialize({
+        "attributes": [ { "name": "lateralized", "type": "exclusive", "values": [ "left", "right" ] } ],
+        "objective_symptoms": [ { "name": "Motor", "children": [ { "name": "Tonic", "attributes": [ "lateralized" ] } ] } ],
+        "subjective_symptoms": [ { "name": "Sensory", "children": [ { "name": "Aura" } ] } ]
+    })
+    timeline = Timeline()
+    timeline.addSymptom(database.fromPath(TONIC).instantiateFromJSON({ "lateralized": [ "right" ], "notes": [ "brief" ] }), 500, 900)
+    writer = CohortIndexWriter()
+    writer.addTimeline("a.json", timeline)
+    with open(tmp_path / "cohort.idx", "wb") as f:
+        writer.write(f)
+
+    with CohortIndex(tmp_path / "cohort.idx") as index:
+        assert index.occurrences("Tonic", { "lateralized": "right" }) == [ Occurrence(0, 0, 500, 900) ]
+        assert index.occurrences("Tonic", { "notes": "brief" }) == []
+
+def test_add_items_with_database(tmp_path):
+    database = SymptomDB.deserialize({
+        "attributes": [ { "name": "lateralized", "type": "exclusive", "values": [ "left", "right" ] },
+                        { "name": "comment", "type": "text" } ],
+        "objective_symptoms": [ { "name": "Motor", "children": [ { "name": "Tonic", "attributes": [ "lateralized", "comment" ] } ] } ],
+        "subjective_symptoms": [ { "name": "Sensory", "children": [ { "name": "Aura" } ] } ]
+    })
+    writer = CohortIndexWriter(database)
+    writer.addItems("a.json", [ item(TONIC, 500, 900, lateralized = [ "left" ], comment = [ "long" ]) ])
+    with pytest.raises(ValueError):
+        writer.addItems("b.json", [ item(TONIC, 0, 100, laterality = [ "left" ]) ])
+    with open(tmp_path / "cohort.idx", "wb") as f:
+        writer.write(f)
+
+    with CohortIndex(tmp_path / "cohort.idx") as index:
+        assert len(index) == 1
+        assert index.occurrences("Tonic", { "lateralized": "left" }) == [ Occurrence(0, 0, 500, 900) ]
+        assert index.occurrences("Tonic", { "comment": "long" }) == []
+
+def test_invalid_items():
+    writer = CohortIndexWriter()
+    with pytest.raises(Exception):
+        writer.addItems("a.json", [ { "start": 0 } ])
+    assert len(writer) == 0
+
+    writer.addItems("a.json", [])
+    with pytest.raises(ValueError):
+        writer.addItems("a.json", [])
+
+def test_bad_magic(tmp_path):
+    path = tmp_path / "cohort.idx"
+    path.write_bytes(b"NOPE" + b"\0" * 32)
+
+    with pytest.raises(ValueError) as e:
+        CohortIndex(path)
+    assert str(e.value) == "Invalid cohort index: bad magic."
+
+def test_truncated(path):
+    path.write_bytes(path.read_bytes()[:-4])
+
+    with pytest.raises(ValueError) as e:
+        CohortIndex(path)
+    assert str(e.value) == "Invalid cohort index: file truncated."
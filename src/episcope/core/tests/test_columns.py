@@ -0,0 +1,70 @@
+import pytest
+from episcope.core import Symptom, SymptomCategory, Timeline, TimelineArchive, TimelineColumns, writeTimelineArchive, SymptomDB
+
+@pytest.fixture()
+def category() -> SymptomCategory:
+    return SymptomCategory("objective_symptoms", "category")
+
+@pytest.fixture()
+def a(category) -> Symptom:
+    output = Symptom("a", attributes = {}, category = None, is_instance = False)
+    category.addSymptom(output)
+    return output.instantiate()
+
+@pytest.fixture()
+def b(category) -> Symptom:
+    output = Symptom("b", attributes = {}, category = None, is_instance = False)
+    category.addSymptom(output)
+    return output.instantiate()
+
+@pytest.fixture()
+def timeline(a, b) -> Timeline:
+    output = Timeline()
+    output.addSymptom(a, 0, 10)
+    output.addSymptom(b, 5, 20)
+    output.addSymptom(a, 8, 15)
+    output.addSymptom(a, 30, 40)
+    return output
+
+def test_default():
+    columns = TimelineColumns()
+
+    assert len(columns) == 0
+    assert columns.totalDuration() == 0
+    assert columns.coverage() == {}
+
+def test_length_mismatch():
+    with pytest.raises(ValueError) as e:
+        TimelineColumns([ 1, 2 ], [ 1 ], [ 0, 0 ], [ "a" ])
+    assert str(e.value) == "Columns must have the same length."
+
+def test_from_timeline(timeline):
+    columns = TimelineColumns.fromTimeline(timeline)
+
+    assert list(columns.starts) == [ 0, 5, 8, 30 ]
+    assert list(columns.durations) == [ 10, 15, 7, 10 ]
+    assert list(columns.symptoms) == [ 0, 1, 0, 0 ]
+    assert columns.paths == [ "objective_symptoms/category/a", "objective_symptoms/category/b" ]
+
+def test_from_archive(timeline, tmp_path):
+    path = tmp_path / "timeline.bin"
+    with open(path, "wb") as f:
+        writeTimelineArchive(timeline, f)
+
+    with TimelineArchive(path) as archive:
+        columns = TimelineColumns.fromArchive(archive)
+
+    expected = TimelineColumns.fromTimeline(timeline)
+    assert columns.starts == expected.starts
+    assert columns.durations == expected.durations
+    assert columns.symptoms == expected.symptoms
+    assert columns.paths == expected.paths
+
+def test_total_duration(timeline):
+    assert TimelineColumns.fromTimeline(timeline).totalDuration() == 42
+
+def test_coverage(timeline):
+    assert TimelineColumns.fromTimeline(timeline).coverage() == {
+        "objective_symptoms/category/a": 25,
+        "objective_symptoms/category/b": 15,
+    }
@@ -132,3 +132,38 @@ def test_frompath_bad_symptom():
     with pytest.raises(ValueError) as e:
         symptom = db.fromPath("subjective_symptoms/category1/SymptomX")
     assert str(e.value) == "Invalid symptom path 'subjective_symptoms/category1/SymptomX'. Unknown symptom 'SymptomX'."
+
+def test_frompath_returns_model():
+    db = SymptomDB.deserialize(SAMPLE_DB)
+
+    assert db.fromPath("subjective_symptoms/category1/Symptom1") is db.subjective[0].symptoms()[0]
+    assert db.fromPath("objective_symptoms/category4/Symptom5") is db.objective[1].symptoms()[0]
+
+def test_paths():
+    db = SymptomDB.deserialize(SAMPLE_DB)
+
+    assert db.paths() == [
+        "objective_symptoms/category3/Symptom4",
+        "objective_symptoms/category4/Symptom5",
+        "subjective_symptoms/category1/Symptom1",
+        "subjective_symptoms/category1/Symptom2",
+        "subjective_symptoms/category2/Symptom3",
+    ]
+
+def test_paths_with_prefix():
+    db = SymptomDB.deserialize(SAMPLE_DB)
+
+    assert db.pathsWithPrefix("") == db.paths()
+    assert db.pathsWithPrefix("subj") == db.paths()[2:]
+    assert db.pathsWithPrefix("subjective_symptoms/") == db.paths()[2:]
+    assert db.pathsWithPrefix("subjective_symptoms/category1") == db.paths()[2:4]
+    assert db.pathsWithPrefix("subjective_symptoms/category1/Symptom2") == [ "subjective_symptoms/category1/Symptom2" ]
+    assert db.pathsWithPrefix("subjective_symptoms/category1/Symptom") == db.paths()[2:4]
+    assert db.pathsWithPrefix("objective_symptoms/category") == db.paths()[:2]
+
+def test_paths_with_prefix_unknown():
+    db = SymptomDB.deserialize(SAMPLE_DB)
+
+    assert db.pathsWithPrefix("x") == []
+    assert db.pathsWithPrefix("subjective_symptoms/x/") == []
+    assert db.pathsWithPrefix("subjective_symptoms/category1/Symptom1/x") == []
@@ -0,0 +1,84 @@
+import random
+import pytest
+from episcope.core.interval_tree import IntervalTree
+
+def build(intervals) -> IntervalTree:
+    tree = IntervalTree()
+    for i, (start, end) in enumerate(intervals):
+        tree.insert((start, i), end, (start, end, i))
+    return tree
+
+def test_default():
+    tree = IntervalTree()
+
+    assert len(tree) == 0
+    assert list(tree) == []
+    assert tree.maxEnd() is None
+    assert tree.overlapping(0, 10) == []
+    assert tree.predecessor((0, 0)) is None
+    assert tree.successor((0, 0)) is None
+
+def test_iteration_sorted():
+    tree = build([ (5, 6), (1, 2), (3, 4), (1, 10) ])
+
+    assert [ x[2] for x in tree ] == [ 1, 3, 2, 0 ]
+    assert tree.maxEnd() == 10
+
+def test_duplicate_key():
+    tree = IntervalTree()
+    tree.insert((0, 1), 10, None)
+    with pytest.raises(KeyError):
+        tree.insert((0, 1), 12, None)
+
+def test_remove():
+    tree = build([ (5, 6), (1, 2), (3, 40) ])
+
+    tree.remove((3, 2))
+
+    assert len(tree) == 2
+    assert [ x[2] for x in tree ] == [ 1, 0 ]
+    assert tree.maxEnd() == 6
+
+def test_remove_unknown():
+    tree = build([ (5, 6) ])
+    with pytest.raises(KeyError):
+        tree.remove((5, 1))
+    assert len(tree) == 1
+
+def test_neighbours():
+    tree = build([ (0, 1), (10, 11), (20, 21) ])
+
+    assert tree.predecessor((10, 1)) == (0, 1, 0)
+    assert tree.successor((10, 1)) == (20, 21, 2)
+    assert tree.predecessor((0, 0)) is None
+    assert tree.successor((20, 2)) is None
+
+def test_overlapping_half_open():
+    tree = build([ (0, 10), (10, 20), (5, 6) ])
+
+    assert [ x[2] for x in tree.overlapping(10, 11) ] == [ 1 ]
+    assert [ x[2] for x in tree.overlapping(9, 10) ] == [ 0 ]
+    assert [ x[2] for x in tree.overlapping(5, 15) ] == [ 0, 2, 1 ]
+    assert tree.overlapping(20, 30) == []
+
+def test_randomized_against_linear_scan():
+    rng = random.Random(42)
+    tree = IntervalTree()
+    intervals = {}
+    for i in range(500):
+        start = rng.randrange(0, 1000)
+        end = start + rng.randrange(0, 100)
+        intervals[i] = (start, end)
+        tree.insert((start, i), end, i)
+    for i in rng.sample(sorted(intervals), 200):
+        start, _ = intervals.pop(i)
+        tree.remove((start, i))
+
+    assert list(tree) == sorted(intervals, key=lambda x: (intervals[x][0], x))
+    assert tree.maxEnd() == max(x[1] for x in intervals.values())
+    for _ in range(50):
+        start = rng.randrange(0, 1100)
+        end = start + rng.randrange(1, 200)
+        expected = [ i for i in intervals if intervals[i][0] < end and intervals[i][1] > start ]
+        expected.sort(key=lambda x: (intervals[x][0], x))
+        assert tree.overlapping(start, end) == expected
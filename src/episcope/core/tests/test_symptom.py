@@ -410,3 +410,73 @@ def test_tooltip_multiple_attribute_set():
     assert instance.getTooltipText() == "test\n" + \
                                         " - attr: a, b\n" + \
                                         " - custom_attr: a"
+
+def test_instance_shares_definition():
+    category = SymptomCategory("objective", "category")
+    symptom = Symptom.deserialize({}, {
+        "name": "test",
+        "custom_attributes": [
+            {
+                "name": "custom_attr",
+                "type": "mix",
+                "values": [ "a", "b" ]
+            }
+        ]
+    })
+    category.addSymptom(symptom)
+
+    instance = symptom.instantiate()
+
+    assert instance.category is category
+    assert instance.attributes['custom_attr'] is not symptom.attributes['custom_attr']
+    assert instance.attributes['custom_attr'].values is symptom.attributes['custom_attr'].values
+    assert category.symptoms() == [ symptom ]
+
+def test_instance_selection_copied():
+    attribute = Attribute("attr", AttributeType.MIX, values=["a", "b"], selection = [ "a" ])
+    symptom = Symptom("test", { "attr": attribute }, category = None, is_instance = False)
+
+    instance = symptom.instantiate()
+    instance.attributes['attr'].selection.append("b")
+
+    assert attribute.selection == [ "a" ]
+    assert instance.attributes['attr'].selection == [ "a", "b" ]
+
+def test_deserialize_instance_does_not_change_global():
+    attribute = Attribute("attr", AttributeType.MIX, values = ["a", "b"], selection = [])
+    symptom = Symptom.deserialize({ "attr": attribute }, {
+        "name": "test",
+        "attributes": {
+            "attr": ["a"]
+        }
+    })
+
+    assert symptom.attributes['attr'].selection == ['a']
+    assert attribute.selection == []
+
+@pytest.mark.parametrize("data", [
+    { "name": "test" },
+    { "name": "test", "attributes": [ "attr" ] },
+    { "name": "test", "attributes": { "attr": None, "other": [ "a" ] } },
+    { "name": "test", "custom_attributes": [ { "name": "x", "type": "text" } ] },
+])
+def test_validate_schema_fast_path(data):
+    assert Symptom._fastValidate(data) is not None
+    assert Symptom.validateSchema(data) == Symptom._SCHEMA.validate(data)
+
+@pytest.mark.parametrize("data", [
+    { "name": "test", "attributes": 1 },
+    { "name": "test", "attributes": {} },
+    { "name": "test", "custom_attributes": [ 1 ] },
+    { "name": 1 },
+])
+def test_validate_schema_fallback(data):
+    assert Symptom._fastValidate(data) is None
+    with pytest.raises(schema.SchemaError):
+        Symptom.validateSchema(data)
+
+def test_category_validate_schema():
+    data = { "name": "category", "children": [ { "name": "a" } ] }
+    assert SymptomCategory.validateSchema(data) == SymptomCategory._SCHEMA.validate(data)
+    with pytest.raises(schema.SchemaError):
+        SymptomCategory.validateSchema({ "name": "category" })
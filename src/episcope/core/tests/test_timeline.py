@@ -1,7 +1,10 @@
 import episcope.core
+import io
 import pytest
 import schema
-from episcope.core import Attribute, AttributeType, Symptom, SymptomCategory, Timeline, ReportInfo
+from episcope.core import Attribute, AttributeType, Symptom, SymptomCategory, SymptomDB, Timeline, ReportInfo
+from episcope.core import TimelineJSONWriter, TimelineChange, readTimelineJSON
+from episcope.core.timeline import _JSONArrayReader
 
 @pytest.fixture()
 def category() -> SymptomCategory:
@@ -29,6 +32,33 @@ def c(category) -> Symptom:
     category.addSymptom(output)
     return output
 
+@pytest.fixture()
+def database() -> SymptomDB:
+    return SymptomDB.deserialize({
+        "attributes": [
+            {
+                "name": "lateralized",
+                "type": "exclusive",
+                "values": [ "left", "right" ]
+            }
+        ],
+        "objective_symptoms": [
+            {
+                "name": "category",
+                "children": [
+                    { "name": "a", "attributes": [ "lateralized" ] },
+                    { "name": "b" }
+                ]
+            }
+        ],
+        "subjective_symptoms": [
+            {
+                "name": "other",
+                "children": [ { "name": "c" } ]
+            }
+        ]
+    })
+
 def test_default():
     timeline = Timeline()
 
@@ -230,3 +260,256 @@ Chronology:
    2 - start 00:00, duration 00:00, (end 00:00):
 	c
 """
+
+def test_remove_symptom(a, b, c):
+    timeline = Timeline()
+    id_a = timeline.addSymptom(a, 0, 10)
+    id_b = timeline.addSymptom(b, 1, 10)
+    id_c = timeline.addSymptom(c, 2, 10)
+
+    timeline.removeSymptom(id_b)
+
+    assert [ x.identifier for x in timeline.getSymptoms() ] == [ id_a, id_c ]
+    assert timeline.getItem(id_b) is None
+    assert timeline.getNextSymptom(id_a) == timeline.getItem(id_c)
+
+def test_get_next_prev_after_update(a, b, c):
+    timeline = Timeline()
+    id_a = timeline.addSymptom(a, 0, 10)
+    id_b = timeline.addSymptom(b, 1, 10)
+    id_c = timeline.addSymptom(c, 2, 10)
+
+    timeline.updateSymptom(id_a, start = 3)
+
+    assert timeline.getPreviousSymptom(id_a) == timeline.getItem(id_c)
+    assert timeline.getNextSymptom(id_a) is None
+    assert timeline.getPreviousSymptom(id_b) is None
+
+def test_active_at(a, b, c):
+    timeline = Timeline()
+    id_a = timeline.addSymptom(a, 0, 10)
+    id_b = timeline.addSymptom(b, 5, 20)
+    id_c = timeline.addSymptom(c, 10, 15)
+
+    assert [ x.identifier for x in timeline.activeAt(0) ] == [ id_a ]
+    assert [ x.identifier for x in timeline.activeAt(7) ] == [ id_a, id_b ]
+    assert [ x.identifier for x in timeline.activeAt(10) ] == [ id_b, id_c ]
+    assert [ x.identifier for x in timeline.activeAt(19) ] == [ id_b ]
+    assert timeline.activeAt(20) == []
+
+def test_active_at_after_update(a, b):
+    timeline = Timeline()
+    id_a = timeline.addSymptom(a, 0, 10)
+    id_b = timeline.addSymptom(b, 20, 30)
+
+    timeline.updateSymptom(id_a, end = 25)
+
+    assert [ x.identifier for x in timeline.activeAt(22) ] == [ id_a, id_b ]
+
+def test_overlapping(a, b, c):
+    timeline = Timeline()
+    id_a = timeline.addSymptom(a, 0, 10)
+    id_b = timeline.addSymptom(b, 5, 20)
+    id_c = timeline.addSymptom(c, 30, 35)
+
+    assert [ x.identifier for x in timeline.overlapping(8, 12) ] == [ id_a, id_b ]
+    assert [ x.identifier for x in timeline.overlapping(10, 31) ] == [ id_b, id_c ]
+    assert timeline.overlapping(20, 30) == []
+
+def test_symptom_before_after(a, b, c):
+    timeline = Timeline()
+    id_a = timeline.addSymptom(a, 0, 10)
+    id_b = timeline.addSymptom(b, 5, 20)
+    id_c = timeline.addSymptom(c, 30, 35)
+
+    assert timeline.symptomBefore(0) is None
+    assert timeline.symptomBefore(5).identifier == id_a
+    assert timeline.symptomBefore(100).identifier == id_c
+    assert timeline.symptomAfter(5).identifier == id_c
+    assert timeline.symptomAfter(4).identifier == id_b
+    assert timeline.symptomAfter(30) is None
+
+def test_bulk_load(a, b, c):
+    timeline = Timeline()
+
+    ids = timeline.bulkLoad([ (c, 2, 10), (a, 0, 10), (b, 1, 10) ])
+
+    assert len(ids) == 3
+    assert [ x.identifier for x in timeline.getSymptoms() ] == [ ids[1], ids[2], ids[0] ]
+    assert timeline.getNextSymptom(ids[1]).identifier == ids[2]
+    assert timeline.getDuration() == 10
+
+def test_bulk_load_then_edit(a, b, c):
+    timeline = Timeline()
+    id_c, id_a, id_b = timeline.bulkLoad([ (c, 2, 10), (a, 0, 10), (b, 1, 10) ])
+
+    timeline.updateSymptom(id_a, start = 3)
+    id_d = timeline.addSymptom(a, 4, 5)
+
+    assert [ x.identifier for x in timeline.getSymptoms() ] == [ id_b, id_c, id_a, id_d ]
+
+def test_batch(a, b, c):
+    timeline = Timeline()
+    with timeline.batch():
+        id_c = timeline.addSymptom(c, 2, 10)
+        id_a = timeline.addSymptom(a, 0, 10)
+        id_b = timeline.addSymptom(b, 1, 10)
+        timeline.updateSymptom(id_a, start = 5)
+        timeline.removeSymptom(id_b)
+
+    assert [ x.identifier for x in timeline.getSymptoms() ] == [ id_c, id_a ]
+    assert timeline.getItem(id_a).duration == 5
+
+def test_batch_query_inside(a, b):
+    timeline = Timeline()
+    with timeline.batch():
+        id_b = timeline.addSymptom(b, 5, 10)
+        assert [ x.identifier for x in timeline.getSymptoms() ] == [ id_b ]
+        id_a = timeline.addSymptom(a, 0, 10)
+
+    assert [ x.identifier for x in timeline.getSymptoms() ] == [ id_a, id_b ]
+
+def test_batch_nested(a, b):
+    timeline = Timeline()
+    with timeline.batch():
+        id_b = timeline.addSymptom(b, 5, 10)
+        with timeline.batch():
+            id_a = timeline.addSymptom(a, 0, 10)
+
+    assert [ x.identifier for x in timeline.getSymptoms() ] == [ id_a, id_b ]
+
+def test_batch_validates_on_commit(a):
+    timeline = Timeline()
+    model = Symptom("model", attributes = {}, category = None, is_instance = False)
+    with pytest.raises(AssertionError):
+        with timeline.batch():
+            timeline.addSymptom(model, 0, 10)
+
+def test_duration_is_max_end(a, b):
+    timeline = Timeline()
+    id_a = timeline.addSymptom(a, 0, 100)
+    timeline.addSymptom(b, 10, 20)
+
+    assert timeline.getDuration() == 100
+    timeline.updateSymptom(id_a, end = 15)
+    assert timeline.getDuration() == 20
+
+def test_observer(a, b):
+    timeline = Timeline()
+    events = []
+    timeline.addObserver(events.append)
+
+    id_a = timeline.addSymptom(a, 0, 10)
+    timeline.updateSymptom(id_a, start = 20, end = 30)
+    timeline.updateSymptom(id_a, symptom = b)
+    timeline.removeSymptom(id_a)
+
+    assert [ (x.change, x.item.identifier, x.start, x.end) for x in events ] == [
+        (TimelineChange.ADDED, id_a, 0, 10),
+        (TimelineChange.UPDATED, id_a, 0, 30),
+        (TimelineChange.UPDATED, id_a, 20, 30),
+        (TimelineChange.REMOVED, id_a, 20, 30),
+    ]
+
+def test_observer_batch(a, b):
+    timeline = Timeline()
+    events = []
+    timeline.addObserver(events.append)
+
+    with timeline.batch():
+        timeline.addSymptom(a, 0, 10)
+        timeline.addSymptom(b, 5, 10)
+        assert events == []
+
+    assert [ x.item.symptom for x in events ] == [ a, b ]
+
+def test_remove_observer(a):
+    timeline = Timeline()
+    events = []
+    timeline.addObserver(events.append)
+    timeline.removeObserver(events.append)
+
+    timeline.addSymptom(a, 0, 10)
+
+    assert events == []
+
+def test_write_json_matches_to_json(a, b, c):
+    timeline = Timeline()
+    timeline.addSymptom(c, 2, 10)
+    timeline.addSymptom(a, 0, 10)
+    timeline.addSymptom(b, 1, 10)
+    stream = io.StringIO()
+
+    timeline.writeJSON(stream)
+
+    assert stream.getvalue() == timeline.toJSON()
+
+def test_json_writer_empty():
+    stream = io.StringIO()
+    with TimelineJSONWriter(stream):
+        pass
+    assert stream.getvalue() == "[]"
+
+@pytest.mark.parametrize("chunk_size", [ 1, 7, 4096 ])
+def test_read_json(database, chunk_size):
+    a = database.fromPath("objective_symptoms/category/a").instantiateFromJSON({ "lateralized": [ "left" ] })
+    b = database.fromPath("objective_symptoms/category/b").instantiateFromJSON({})
+    timeline = Timeline()
+    timeline.addSymptom(b, 1000, 2000)
+    timeline.addSymptom(a, 0, 12345)
+
+    items = list(readTimelineJSON(io.StringIO(timeline.toJSON()), database, chunk_size))
+
+    assert [ x.identifier for x in items ] == [ 1, 2 ]
+    assert [ (x.start, x.duration) for x in items ] == [ (0, 12345), (1000, 1000) ]
+    assert items[0].symptom.name == "a"
+    assert items[0].symptom.isInstance()
+    assert items[0].symptom.attributes['lateralized'].selection == [ "left" ]
+    assert items[1].symptom.name == "b"
+
+def test_read_json_empty(database):
+    assert list(readTimelineJSON(io.StringIO(" [ ]\n"), database)) == []
+
+def test_read_json_compact(database):
+    data = '[{"symptom":{"path":"objective_symptoms/category/b","attributes":{}},"start":5,"end":9}]'
+    items = list(readTimelineJSON(io.StringIO(data), database, 3))
+    assert [ (x.start, x.duration) for x in items ] == [ (5, 4) ]
+
+def test_read_json_truncated(database):
+    data = '[{"symptom":{"path":"objective_symptoms/category/b","attributes":{}},"start":5,"end":9}'
+    with pytest.raises(ValueError) as e:
+        list(readTimelineJSON(io.StringIO(data), database))
+    assert str(e.value) == "Unexpected end of JSON document."
+
+@pytest.mark.parametrize("chunk_size", [ 1, 2, 3, 4, 4096 ])
+def test_read_json_split_numbers(chunk_size):
+    data = '[1.5, 10e3, -2, 123456]'
+    assert list(_JSONArrayReader(io.StringIO(data), chunk_size)) == [ 1.5, 10e3, -2, 123456 ]
+
+def test_read_json_trailing_content(database):
+    assert list(_JSONArrayReader(io.StringIO("[1] \n"), 1)) == [ 1 ]
+    with pytest.raises(ValueError) as e:
+        list(_JSONArrayReader(io.StringIO("[1]xyz"), 2))
+    assert str(e.value) == "Unexpected character 'x' after the JSON array."
+    with pytest.raises(ValueError):
+        list(readTimelineJSON(io.StringIO("[] ]"), database))
+
+def test_read_json_not_an_array(database):
+    with pytest.raises(ValueError) as e:
+        list(readTimelineJSON(io.StringIO("{}"), database))
+    assert str(e.value) == "Unexpected character '{' in JSON document, expected one of '['."
+
+def test_read_json_bad_item(database):
+    data = '[{"symptom":{"path":"objective_symptoms/category/b","attributes":{}},"start":"5","end":9}]'
+    with pytest.raises(schema.SchemaError):
+        list(readTimelineJSON(io.StringIO(data), database))
+
+def test_from_json(database):
+    data = '''[
+        {"symptom":{"path":"objective_symptoms/category/b","attributes":{}},"start":50,"end":90},
+        {"symptom":{"path":"objective_symptoms/category/a","attributes":{"lateralized":["right"]}},"start":5,"end":9}
+    ]'''
+    timeline = Timeline.fromJSON(io.StringIO(data), database)
+
+    assert [ x.symptom.name for x in timeline.getSymptoms() ] == [ "a", "b" ]
+    assert timeline.getDuration() == 90
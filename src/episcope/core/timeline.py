@@ -1,9 +1,21 @@
+from __future__ import annotations
+
 from enum import Enum
+import io
 import json
-from typing import Self, Optional
+from typing import Self, Optional, Iterable, Iterator, TextIO, Any, Callable, TYPE_CHECKING
 from dataclasses import dataclass
+from contextlib import contextmanager
+from schema import Schema, SchemaError, Optional as SchemaOptional
 
 from episcope.core import Symptom, Attribute
+from episcope.core.interval_tree import IntervalTree
+
+if TYPE_CHECKING:
+    from episcope.core import SymptomDB
+
+# Size of the chunks read from the file by the streaming JSON reader.
+JSON_READ_CHUNK_SIZE = 64 * 1024
 
 class BlockType(Enum):
     SPACER = 0,
@@ -23,6 +35,189 @@ class TimelineItem:
     start : int
     duration : int
 
+    def serialize(self : Self) -> dict:
+        return {
+            'symptom': self.symptom.serialize(),
+            'start': int(self.start),
+            'end': int(self.start + self.duration)
+        }
+
+    @staticmethod
+    def deserialize(database : SymptomDB, identifier : int, data : dict) -> TimelineItem:
+        try:
+            data = TimelineItem.validateSchema(data)
+        except SchemaError as e:
+            e.add_note('Parsed item was:\n{}'.format(json.dumps(data, indent=4)))
+            raise
+
+        model = database.fromPath(data['symptom']['path'])
+        symptom = model.instantiateFromJSON(data['symptom']['attributes'])
+        return TimelineItem(identifier, symptom, data['start'], data['end'] - data['start'])
+
+    _SCHEMA = Schema({
+            'symptom': {
+                'path': str,
+                'attributes': { SchemaOptional(str): [ str ] }
+            },
+            'start': int,
+            'end': int
+    })
+
+    # Checks the common, valid shapes directly. Returns None if the schema
+    # validator is required (invalid data, or to produce the error).
+    @staticmethod
+    def _fastValidate(data : dict) -> Optional[dict]:
+        if type(data) is not dict or data.keys() != { 'symptom', 'start', 'end' }:
+            return None
+        if type(data['start']) is not int or type(data['end']) is not int:
+            return None
+        symptom = data['symptom']
+        if type(symptom) is not dict or symptom.keys() != { 'path', 'attributes' } or type(symptom['path']) is not str:
+            return None
+        attributes = symptom['attributes']
+        if type(attributes) is not dict:
+            return None
+        for name, values in attributes.items():
+            if type(name) is not str or type(values) is not list or not all(type(x) is str for x in values):
+                return None
+        return {
+            'symptom': {
+                'path': symptom['path'],
+                'attributes': { name: list(values) for name, values in attributes.items() }
+            },
+            'start': data['start'],
+            'end': data['end']
+        }
+
+    @staticmethod
+    def validateSchema(data : dict):
+        output = TimelineItem._fastValidate(data)
+        if output is not None:
+            return output
+        return TimelineItem._SCHEMA.validate(data)
+
+class TimelineChange(Enum):
+    ADDED = 0
+    UPDATED = 1
+    REMOVED = 2
+
+# Sent to the observers of a timeline for each change. [start, end) covers the
+# time range affected by the change: for a move, both the old and new ranges.
+@dataclass
+class TimelineEvent:
+    change : TimelineChange
+    item : TimelineItem
+    start : int
+    end : int
+
+TimelineObserver = Callable[[TimelineEvent], None]
+
+# Writes a timeline as a JSON array, one item at a time. The output is
+# identical to json.dumps(items, indent=4).
+class TimelineJSONWriter():
+    def __init__(self : Self, stream : TextIO) -> None:
+        self._stream = stream
+        self._count = 0
+
+    def __enter__(self : Self) -> Self:
+        return self
+
+    def __exit__(self : Self, *args) -> None:
+        self.close()
+
+    def write(self : Self, item : TimelineItem) -> None:
+        self._stream.write("[\n    " if self._count == 0 else ",\n    ")
+        self._stream.write(json.dumps(item.serialize(), indent=4).replace("\n", "\n    "))
+        self._count += 1
+
+    def close(self : Self) -> None:
+        self._stream.write("[]" if self._count == 0 else "\n]")
+
+_NUMBER_CHARACTERS = frozenset("0123456789+-.eE")
+
+# Incrementally decodes the elements of a top-level JSON array, only keeping
+# the current chunk of the file in memory.
+class _JSONArrayReader():
+    def __init__(self : Self, stream : TextIO, chunk_size : int) -> None:
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def _fill(self : Self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._stream.read(self._chunk_size)
+        self._eof = len(chunk) == 0
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        return not self._eof
+
+    def _peek(self : Self) -> str:
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position].isspace():
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document.")
+
+    def _expect(self : Self, characters : str) -> str:
+        character = self._peek()
+        if character not in characters:
+            raise ValueError(f"Unexpected character {character!r} in JSON document, expected one of {characters!r}.")
+        self._position += 1
+        return character
+
+    def _decode(self : Self) -> Any:
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+                # A number followed by the end of the buffer or by a number
+                # character ("1." of "1.5") might continue in the next chunk.
+                if self._eof or (end < len(self._buffer) and self._buffer[end] not in _NUMBER_CHARACTERS):
+                    self._position = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    # Only whitespace may follow the array.
+    def _expectEnd(self : Self) -> None:
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position].isspace():
+                self._position += 1
+            if self._position < len(self._buffer):
+                raise ValueError(f"Unexpected character {self._buffer[self._position]!r} after the JSON array.")
+            if not self._fill():
+                return
+
+    def __iter__(self : Self) -> Iterator[Any]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._position += 1
+            self._expectEnd()
+            return
+        while True:
+            self._peek()
+            yield self._decode()
+            if self._expect(",]") == "]":
+                self._expectEnd()
+                return
+
+# Yields the items of a JSON timeline export without loading the whole
+# document. Identifiers are the 1-based position of the items in the file.
+def readTimelineJSON(stream : TextIO,
+                     database : SymptomDB,
+                     chunk_size : int = JSON_READ_CHUNK_SIZE) -> Iterator[TimelineItem]:
+    identifier = 1
+    for data in _JSONArrayReader(stream, chunk_size):
+        yield TimelineItem.deserialize(database, identifier, data)
+        identifier += 1
+
 def millisToTimeString(millis : int) -> str:
     seconds = millis // 1000
     minutes = seconds // 60
@@ -32,36 +227,105 @@ def millisToTimeString(millis : int) -> str:
 class Timeline():
     def __init__(self : Self) -> None:
         self._symptoms : dict[int, TimelineItem] = {}
-        self._timeline : list[int] = []
+        self._index : IntervalTree = IntervalTree()
         self._next_id : int = 1
+        # While a batch is open, the index is not maintained and only rebuilt
+        # once on commit (or lazily, when queried).
+        self._batch_depth : int = 0
+        self._dirty : bool = False
+        self._observers : list[TimelineObserver] = []
+        # Events of the open batch, sent on commit.
+        self._pending : list[TimelineEvent] = []
+
+    # |observer| is called with a TimelineEvent after each change. Changes done
+    # in a batch are sent once the batch commits.
+    def addObserver(self : Self, observer : TimelineObserver) -> None:
+        self._observers.append(observer)
+
+    def removeObserver(self : Self, observer : TimelineObserver) -> None:
+        self._observers.remove(observer)
+
+    def _notify(self : Self, change : TimelineChange, item : TimelineItem, start : int, end : int) -> None:
+        if len(self._observers) == 0:
+            return
+        event = TimelineEvent(change, item, start, end)
+        if self._batch_depth != 0:
+            self._pending.append(event)
+            return
+        for observer in list(self._observers):
+            observer(event)
+
+    def _flushEvents(self : Self) -> None:
+        events, self._pending = self._pending, []
+        for event in events:
+            for observer in list(self._observers):
+                observer(event)
 
     def _allocateId(self : Self) -> int:
         identifier = self._next_id
         self._next_id += 1
         return identifier
 
-    def _updateTimeline(self : Self):
-        self._timeline = sorted(self._timeline, key=lambda x : self._symptoms[x].start)
+    def _indexItem(self : Self, item : TimelineItem) -> None:
+        if self._batch_depth != 0 or self._dirty:
+            self._dirty = True
+            return
+        self._index.insert((item.start, item.identifier), item.start + item.duration, item)
+
+    def _unindexItem(self : Self, item : TimelineItem) -> None:
+        if self._batch_depth != 0 or self._dirty:
+            self._dirty = True
+            return
+        self._index.remove((item.start, item.identifier))
+
+    # Rebuilds the index from scratch if mutations were deferred: validates the
+    # items, sorts them once and builds the tree in linear time.
+    def _ensureIndex(self : Self) -> IntervalTree:
+        if not self._dirty:
+            return self._index
+        for item in self._symptoms.values():
+            assert item.symptom.isInstance()
+        items = sorted(self._symptoms.values(), key=lambda x : (x.start, x.identifier))
+        self._index = IntervalTree.fromSorted([ ((x.start, x.identifier), x.start + x.duration, x) for x in items ])
+        self._dirty = False
+        return self._index
 
+    # Defers ordering and validation of all the mutations done in this context
+    # until it exits. Batches can be nested, only the outermost one commits.
+    @contextmanager
+    def batch(self : Self) -> Iterator[Self]:
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                # The changes are done even if the validation fails.
+                try:
+                    self._ensureIndex()
+                finally:
+                    self._flushEvents()
+
+    def bulkLoad(self : Self, items : Iterable[tuple[Symptom, int, int]]) -> list[int]:
+        with self.batch():
+            return [ self.addSymptom(symptom, start, end) for symptom, start, end in items ]
+
+    # End of the last item to end. The tree keeps the maximum end up to date on
+    # each change, this is O(1).
     def getDuration(self : Self) -> int:
-        if len(self._timeline) == 0:
-            return 0
-        item = self._symptoms[self._timeline[-1]]
-        return item.start + item.duration
+        max_end = self._ensureIndex().maxEnd()
+        return 0 if max_end is None else max_end
 
     def getSymptoms(self : Self) -> list[TimelineItem]:
-        output = []
-        for identifier in self._timeline:
-            item = self._symptoms[identifier]
-            output.append(item)
-        return output
+        return list(self._ensureIndex())
 
     def addSymptom(self : Self, symptom : Symptom, start : int, end : int) -> int:
-        assert symptom.isInstance()
+        assert self._batch_depth != 0 or symptom.isInstance()
         identifier = self._allocateId()
-        self._symptoms[identifier] = TimelineItem(identifier, symptom, start, end - start)
-        self._timeline.append(identifier)
-        self._updateTimeline()
+        item = TimelineItem(identifier, symptom, start, end - start)
+        self._symptoms[identifier] = item
+        self._indexItem(item)
+        self._notify(TimelineChange.ADDED, item, start, end)
         return identifier
 
     def updateSymptom(self : Self,
@@ -71,21 +335,28 @@ class Timeline():
                       end : Optional[int] = None) -> bool:
         if identifier not in self._symptoms:
             raise KeyError(f"Invalid identifier {identifier}.")
+        item = self._symptoms[identifier]
         if symptom is not None:
-            self._symptoms[identifier].symptom = symptom
+            item.symptom = symptom
+
+        old_start = item.start
+        old_end = item.start + item.duration
+        if start is None and end is None:
+            self._notify(TimelineChange.UPDATED, item, old_start, old_end)
+            return True
 
-        old_start = self._symptoms[identifier].start
-        old_end = old_start + self._symptoms[identifier].duration
+        self._unindexItem(item)
 
         if start is not None:
-            self._symptoms[identifier].start = start
-            self._symptoms[identifier].duration = old_end - start
+            item.start = start
+            item.duration = old_end - start
 
-        start = self._symptoms[identifier].start
         if end is not None:
-            self._symptoms[identifier].duration = end - start
+            item.duration = end - item.start
 
-        self._updateTimeline()
+        self._indexItem(item)
+        self._notify(TimelineChange.UPDATED, item,
+                     min(old_start, item.start), max(old_end, item.start + item.duration))
         return True
 
     def getItem(self : Self, identifier : int) -> Optional[TimelineItem]:
@@ -94,30 +365,55 @@ class Timeline():
         return self._symptoms[identifier]
 
     def getPreviousSymptom(self : Self, identifier : int) -> Optional[TimelineItem]:
-        for i in range(len(self._timeline)):
-            if self._timeline[i] == identifier:
-                return self.getItem(self._timeline[i - 1]) if i > 0 else None
-        return None
+        item = self.getItem(identifier)
+        if item is None:
+            return None
+        return self._ensureIndex().predecessor((item.start, item.identifier))
 
     def getNextSymptom(self : Self, identifier : int) -> Optional[TimelineItem]:
-        for i in range(len(self._timeline)):
-            if self._timeline[i] == identifier:
-                return self.getItem(self._timeline[i + 1]) if i + 1 < len(self._timeline) else None
-        return None
+        item = self.getItem(identifier)
+        if item is None:
+            return None
+        return self._ensureIndex().successor((item.start, item.identifier))
+
+    # Returns the symptoms active at |time|, meaning start <= time < end.
+    def activeAt(self : Self, time : int) -> list[TimelineItem]:
+        return [ x for x in self._ensureIndex().overlapping(time, time + 1) if x.start <= time ]
+
+    # Returns the symptoms intersecting the [start, end) range, sorted by start.
+    def overlapping(self : Self, start : int, end : int) -> list[TimelineItem]:
+        return self._ensureIndex().overlapping(start, end)
+
+    # Returns the last symptom starting strictly before |time|. Identifiers
+    # start at 1: (time, 0) is lower than the key of any item starting at |time|.
+    def symptomBefore(self : Self, time : int) -> Optional[TimelineItem]:
+        return self._ensureIndex().predecessor((time, 0))
+
+    # Returns the first symptom starting strictly after |time|. No item has an
+    # identifier as high as the next one allocated.
+    def symptomAfter(self : Self, time : int) -> Optional[TimelineItem]:
+        return self._ensureIndex().successor((time, self._next_id))
 
     def removeSymptom(self : Self, identifier : int) -> None:
-        del self._symptoms[identifier]
-        self._timeline.remove(identifier)
+        item = self._symptoms.pop(identifier)
+        self._unindexItem(item)
+        self._notify(TimelineChange.REMOVED, item, item.start, item.start + item.duration)
 
     def toJSON(self : Self) -> str:
-        output = []
-        for item in self.getSymptoms():
-            output.append({
-                'symptom': item.symptom.serialize(),
-                'start': int(item.start),
-                'end': int(item.start + item.duration)
-            })
-        return json.dumps(output, indent=4)
+        output = io.StringIO()
+        self.writeJSON(output)
+        return output.getvalue()
+
+    def writeJSON(self : Self, stream : TextIO) -> None:
+        with TimelineJSONWriter(stream) as writer:
+            for item in self._ensureIndex():
+                writer.write(item)
+
+    @staticmethod
+    def fromJSON(stream : TextIO, database : SymptomDB) -> Timeline:
+        output = Timeline()
+        output.bulkLoad((x.symptom, x.start, x.start + x.duration) for x in readTimelineJSON(stream, database))
+        return output
 
     def toReport(self : Self, info : ReportInfo) -> str:
         observations = info.notes.split("\n")
@@ -1,4 +1,5 @@
 from .timeline import TimelineWidget
+from .playhead import PlayheadClock
 from .report_editor import ReportEditor
 from .attribute_editor import AttributeEditor, MixPicker, ExclusivePicker, TextEdit
 from .symptom_picker_list import SymptomPickerList
@@ -0,0 +1,150 @@
+from PySide6.QtCore import QCoreApplication, QRectF, QSize, Qt
+from PySide6.QtGui import QImage, QPainter
+from PySide6.QtSvg import QSvgGenerator
+from PySide6.QtWidgets import QApplication, QStyleOptionGraphicsItem
+from typing import Self, Iterator, Optional
+
+import argparse
+import math
+import os
+import sys
+
+from episcope.core import Timeline, loadSymptomDB
+from episcope.gui.timeline import (DEFAULT_ZOOM_UNIT,
+                                   LINE_HEIGHT_PX,
+                                   LINE_START_PX,
+                                   TimelineBackground,
+                                   TimelineBlock,
+                                   packIntervals,
+                                   pixelToSceneTransform)
+
+# Width of the images rendered at once. Wider friezes are written to several
+# PNG files, and drawn piece by piece in SVG.
+FRIEZE_TILE_WIDTH_PX = 4096
+
+# Renders a timeline as a frieze without any window, with the drawing code of
+# the timeline widget: the ruler of TimelineBackground, and the blocks packed
+# on lines like in the widget. Only the blocks of the tile being drawn exist,
+# so the memory used does not depend on the length of the recording.
+class FriezeRenderer():
+    def __init__(self : Self, timeline : Timeline, unit : float = DEFAULT_ZOOM_UNIT, duration : int = 0) -> None:
+        if unit <= 0:
+            raise ValueError(f"Invalid scale {unit} px/ms.")
+        self._timeline = timeline
+        self._unit = unit
+        items = timeline.getSymptoms()
+        lines = packIntervals([ (x.start, x.start + x.duration) for x in items ])
+        self._lines = { item.identifier: line for item, line in zip(items, lines) }
+        self._width = max(1, math.ceil(max(timeline.getDuration(), duration) * unit))
+        self._height = LINE_START_PX + max(1, max(lines, default=0) + 1) * LINE_HEIGHT_PX
+
+    def size(self : Self) -> QSize:
+        return QSize(self._width, self._height)
+
+    def _tileRanges(self : Self, tile_width : int) -> Iterator[tuple[int, int]]:
+        for left in range(0, self._width, tile_width):
+            yield left, min(tile_width, self._width - left)
+
+    # Draws the [left, left + width[ pixel range of the frieze at the origin of
+    # |painter|.
+    def render(self : Self, painter : QPainter, left : int, width : int) -> None:
+        painter.fillRect(QRectF(0, 0, width, self._height), Qt.GlobalColor.white)
+        background = TimelineBackground(width, self._height)
+        background.setUnit(self._unit)
+        background.drawRange(painter, left, width)
+
+        # Blocks are painted in scene coordinates, like in the scene.
+        painter.save()
+        to_pixels, _ = pixelToSceneTransform(self._unit, left).inverted()
+        painter.setWorldTransform(to_pixels * painter.worldTransform())
+        option = QStyleOptionGraphicsItem()
+        for item in self._timeline.overlapping(math.floor(left / self._unit), math.ceil((left + width) / self._unit)):
+            block = TimelineBlock(item.symptom, item.start, item.duration)
+            block.setUnit(self._unit)
+            block.setOffset(left)
+            block.setLine(self._lines[item.identifier])
+            block.paint(painter, option)
+        painter.restore()
+
+    def tiles(self : Self, tile_width : int = FRIEZE_TILE_WIDTH_PX) -> Iterator[QImage]:
+        for left, width in self._tileRanges(tile_width):
+            image = QImage(width, self._height, QImage.Format.Format_ARGB32_Premultiplied)
+            painter = QPainter(image)
+            self.render(painter, left, width)
+            painter.end()
+            yield image
+
+    # Writes the frieze to |path|. When it is wider than |tile_width|, each tile
+    # goes to its own file, numbered from the left: frieze_0.png, frieze_1.png...
+    # Returns the paths of the written files.
+    def writePNG(self : Self, path : str, tile_width : int = FRIEZE_TILE_WIDTH_PX) -> list[str]:
+        count = math.ceil(self._width / tile_width)
+        root, extension = os.path.splitext(path)
+        digits = len(str(count - 1))
+        paths = [ path ] if count == 1 else [ f"{root}_{i:0{digits}}{extension}" for i in range(count) ]
+        for output, image in zip(paths, self.tiles(tile_width)):
+            if not image.save(output, "PNG"):
+                raise OSError(f"Cannot write {output}.")
+        return paths
+
+    def writeSVG(self : Self, path : str, tile_width : int = FRIEZE_TILE_WIDTH_PX) -> None:
+        generator = QSvgGenerator()
+        generator.setFileName(path)
+        generator.setSize(self.size())
+        generator.setViewBox(QRectF(0, 0, self._width, self._height))
+        painter = QPainter(generator)
+        if not painter.isActive():
+            raise OSError(f"Cannot write {path}.")
+        for left, width in self._tileRanges(tile_width):
+            painter.save()
+            painter.translate(left, 0)
+            painter.setClipRect(QRectF(0, 0, width, self._height))
+            self.render(painter, left, width)
+            painter.restore()
+        painter.end()
+
+# Returns the application needed to render. When it has to be created, it
+# uses the offscreen platform (unless another one is configured): no window is
+# ever shown, and no display is needed.
+def ensureApplication() -> QCoreApplication:
+    application = QApplication.instance()
+    if application is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        application = QApplication(sys.argv[:1])
+    return application
+
+# Renders a JSON timeline export to PNG or SVG. Runs without a display:
+#   python -m episcope.gui.frieze timeline.json frieze.png --unit 0.02
+def main(argv : Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m episcope.gui.frieze",
+                                     description="Renders a timeline export as a frieze.")
+    parser.add_argument("timeline", help="timeline JSON export")
+    parser.add_argument("output", help="output file, .png or .svg")
+    parser.add_argument("--symptoms", default="symptoms.json", help="symptom database (default: %(default)s)")
+    parser.add_argument("--unit", type=float, default=DEFAULT_ZOOM_UNIT, help="scale, in pixels per millisecond (default: %(default)s)")
+    parser.add_argument("--duration", type=int, default=0, help="minimum duration shown, in milliseconds")
+    parser.add_argument("--tile-width", type=int, default=FRIEZE_TILE_WIDTH_PX, help="width of the rendered tiles, in pixels (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    extension = os.path.splitext(args.output)[1].lower()
+    if extension not in (".png", ".svg"):
+        parser.error(f"unsupported output format {extension!r}, expected .png or .svg")
+    if args.unit <= 0 or args.tile_width <= 0:
+        parser.error("--unit and --tile-width must be positive")
+
+    application = ensureApplication()
+    database = loadSymptomDB(args.symptoms)
+    with open(args.timeline, "r") as f:
+        timeline = Timeline.fromJSON(f, database)
+    renderer = FriezeRenderer(timeline, args.unit, args.duration)
+    if extension == ".svg":
+        renderer.writeSVG(args.output, args.tile_width)
+        paths = [ args.output ]
+    else:
+        paths = renderer.writePNG(args.output, args.tile_width)
+    for path in paths:
+        print(path)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
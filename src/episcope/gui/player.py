@@ -17,10 +17,9 @@ from PySide6.QtMultimediaWidgets import QVideoWidget
 from typing import Self, Optional
 
 import sys
-import json
 from episcope.localization import I18N
-from episcope.core import Timeline, Symptom, SymptomCategory, SymptomDB, Attribute, ReportInfo
-from episcope.gui import TimelineWidget, AttributeEditor, SymptomPickerList, ReportEditor
+from episcope.core import Timeline, Symptom, SymptomCategory, SymptomDB, Attribute, ReportInfo, loadSymptomDB
+from episcope.gui import TimelineWidget, AttributeEditor, SymptomPickerList, ReportEditor, PlayheadClock
 
 AVI = "video/x-msvideo"  # AVI
 MP4 = 'video/mp4'
@@ -100,10 +99,17 @@ class MainWidget(QWidget):
         self._player.errorOccurred.connect(self._player_error)
         self._player.playbackStateChanged.connect(self._update_toolbar)
         self._player.setVideoOutput(video)
-        self._player.positionChanged.connect(self._player_position_changed)
         self._player.durationChanged.connect(self._timelineWidget.updateMediaDuration)
         self._media_url = None
 
+        # The playhead follows the clock, which follows the player.
+        self._clock = PlayheadClock(parent=self)
+        self._clock.on_position_changed.connect(self._player_position_changed)
+        self._player.positionChanged.connect(self._clock.synchronize)
+        self._player.playbackStateChanged.connect(lambda state: self._clock.setPlaying(state == QMediaPlayer.PlaybackState.PlayingState))
+        self._player.playbackRateChanged.connect(self._clock.setRate)
+        self._player.durationChanged.connect(self._clock.setDuration)
+
         vsplit = QSplitter(Qt.Vertical)
         vsplit.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         vsplit.addWidget(video)
@@ -147,6 +153,7 @@ class MainWidget(QWidget):
 
     def _player_seek(self, position):
         self._player.setPosition(position)
+        self._clock.seek(position)
 
     def _onSymptomEdit(self : Self, symptom : Symptom) -> None:
         dialog = AttributeEditor(self._symptoms, symptom)
@@ -254,23 +261,11 @@ class Player(QMainWindow):
         #self._loadTimeline("/home/nathan/test.json")
 
     def _loadSymptoms(self : Self, filename : str) -> None:
-        with open(filename, "r") as f:
-            data = json.loads(f.read())
-        self._symptoms = SymptomDB.deserialize(data)
-
-    def _loadSymptom(self : Self, path : str, attributes : dict[str, list[str]]) -> Symptom:
-        model = self._symptoms.fromPath(path)
-        return model.instantiateFromJSON(attributes)
+        self._symptoms = loadSymptomDB(filename)
 
     def _loadTimeline(self : Self, filename : str) -> None:
         with open(filename, "r") as f:
-            data = json.loads(f.read())
-
-        timeline = Timeline()
-        for item in data:
-            symptom = self._loadSymptom(item["symptom"]["path"], item["symptom"]['attributes'])
-            assert symptom is not None
-            timeline.addSymptom(symptom, item['start'], item['end'])
+            timeline = Timeline.fromJSON(f, self._symptoms)
         self._player.setTimeline(timeline)
 
     def action_reset(self : Self):
@@ -300,7 +295,7 @@ class Player(QMainWindow):
         if path is None:
             return
         with open(path, "w+") as f:
-            f.write(self._player.export().toJSON())
+            self._player.export().writeJSON(f)
 
     def action_export_report(self : Self):
         data = self._doReportDialog()
@@ -0,0 +1,98 @@
+from PySide6.QtCore import QObject, QTimer, Qt, Signal
+from PySide6.QtGui import QGuiApplication
+from typing import Self, Callable, Optional
+
+import time
+
+# Refresh rate used when the screen does not report one.
+DEFAULT_REFRESH_RATE_HZ = 60
+# Players report positions late and irregularly. A report behind the
+# extrapolated position by less than this is not drawn as a backward jump.
+MAX_DRIFT_MS = 250
+
+# Duration of a frame of the primary screen, in milliseconds.
+def frameInterval() -> int:
+    screen = QGuiApplication.primaryScreen()
+    rate = DEFAULT_REFRESH_RATE_HZ if screen is None else screen.refreshRate()
+    return max(1, int(1000 / (rate if rate > 0 else DEFAULT_REFRESH_RATE_HZ)))
+
+# Media clock driving the playhead. The player only reports its position every
+# now and then: in between, the position is extrapolated from a monotonic
+# clock and the playback rate, and emitted once per screen refresh.
+class PlayheadClock(QObject):
+    on_position_changed = Signal(int)
+
+    def __init__(self : Self, now : Callable[[], float] = time.monotonic, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._now = now
+        self._anchor_position = 0
+        self._anchor_time = now()
+        self._rate = 1.0
+        self._playing = False
+        self._duration : Optional[int] = None
+        self._last_emitted : Optional[int] = None
+
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.setInterval(frameInterval())
+        self._timer.timeout.connect(self._tick)
+
+    def isPlaying(self : Self) -> bool:
+        return self._playing
+
+    def position(self : Self) -> int:
+        position = self._anchor_position
+        if self._playing:
+            position += round((self._now() - self._anchor_time) * 1000 * self._rate)
+        if self._duration is not None:
+            position = min(position, self._duration)
+        return max(0, position)
+
+    def _anchor(self : Self, position : int) -> None:
+        self._anchor_position = position
+        self._anchor_time = self._now()
+
+    def _emit(self : Self, position : int) -> None:
+        if position == self._last_emitted:
+            return
+        self._last_emitted = position
+        self.on_position_changed.emit(position)
+
+    def _tick(self : Self) -> None:
+        position = self.position()
+        # Small corrections are absorbed instead of moving the playhead back.
+        if self._last_emitted is not None and 0 < self._last_emitted - position < MAX_DRIFT_MS:
+            return
+        self._emit(position)
+
+    # Position reported by the player.
+    def synchronize(self : Self, position : int) -> None:
+        self._anchor(position)
+        # While playing, the next frame shows it.
+        if not self._playing:
+            self._emit(self.position())
+
+    # Position explicitly changed: shown right away, even if moving back.
+    def seek(self : Self, position : int) -> None:
+        self._anchor(position)
+        self._last_emitted = None
+        self._emit(self.position())
+
+    def setPlaying(self : Self, playing : bool) -> None:
+        if playing == self._playing:
+            return
+        self._anchor(self.position())
+        self._playing = playing
+        if playing:
+            self._timer.start()
+        else:
+            self._timer.stop()
+            self._last_emitted = None
+            self._emit(self.position())
+
+    def setRate(self : Self, rate : float) -> None:
+        self._anchor(self.position())
+        self._rate = rate
+
+    def setDuration(self : Self, duration : int) -> None:
+        self._duration = duration if duration > 0 else None
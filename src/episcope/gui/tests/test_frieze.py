@@ -0,0 +1,100 @@
+import json
+import pytest
+from PySide6.QtGui import QColor, QImage, QPainter
+
+from episcope.core import Symptom, SymptomCategory, Timeline
+from episcope.gui.frieze import FriezeRenderer, main
+from episcope.gui.timeline import LINE_HEIGHT_PX, LINE_START_PX
+
+@pytest.fixture()
+def category() -> SymptomCategory:
+    return SymptomCategory("objective", "category")
+
+def create_symptom(category : SymptomCategory, name : str) -> Symptom:
+    output = Symptom(name, attributes = {}, category = None, is_instance = False).instantiate()
+    category.addSymptom(output)
+    return output
+
+@pytest.fixture()
+def timeline(category) -> Timeline:
+    output = Timeline()
+    output.bulkLoad([ (create_symptom(category, "a"), 1000, 9000),
+                      (create_symptom(category, "b"), 5000, 30000),
+                      (create_symptom(category, "c"), 31000, 60000) ])
+    return output
+
+def stitch(images : list[QImage]) -> QImage:
+    output = QImage(sum(x.width() for x in images), images[0].height(), images[0].format())
+    painter = QPainter(output)
+    x = 0
+    for image in images:
+        painter.drawImage(x, 0, image)
+        x += image.width()
+    painter.end()
+    return output
+
+def test_size(qtbot, timeline):
+    renderer = FriezeRenderer(timeline, 0.02)
+
+    assert renderer.size().width() == 1200
+    assert renderer.size().height() == LINE_START_PX + 2 * LINE_HEIGHT_PX
+
+def test_size_duration(qtbot, timeline):
+    assert FriezeRenderer(timeline, 0.02, 120000).size().width() == 2400
+    assert FriezeRenderer(Timeline(), 0.02).size().width() == 1
+
+def test_invalid_unit(qtbot, timeline):
+    with pytest.raises(ValueError):
+        FriezeRenderer(timeline, 0)
+
+def test_draws_blocks(qtbot, timeline):
+    image = next(FriezeRenderer(timeline, 0.02).tiles())
+
+    # Block a on the first line, b on the second one, nothing after b.
+    assert image.pixelColor(60, LINE_START_PX + 10) == QColor.fromRgb(81, 176, 245)
+    assert image.pixelColor(400, LINE_START_PX + LINE_HEIGHT_PX + 10) == QColor.fromRgb(81, 176, 245)
+    assert image.pixelColor(610, LINE_START_PX + LINE_HEIGHT_PX + 10) != QColor.fromRgb(81, 176, 245)
+
+def test_tiles_match_single_image(qtbot, timeline):
+    renderer = FriezeRenderer(timeline, 0.02)
+    tiles = list(renderer.tiles(256))
+
+    assert [ x.width() for x in tiles ] == [ 256, 256, 256, 256, 176 ]
+    assert stitch(tiles) == next(renderer.tiles(2000))
+
+def test_write_png(qtbot, timeline, tmp_path):
+    renderer = FriezeRenderer(timeline, 0.02)
+
+    assert renderer.writePNG(str(tmp_path / "a.png")) == [ str(tmp_path / "a.png") ]
+    assert QImage(str(tmp_path / "a.png")).width() == 1200
+
+    paths = renderer.writePNG(str(tmp_path / "b.png"), 500)
+    assert paths == [ str(tmp_path / "b_0.png"), str(tmp_path / "b_1.png"), str(tmp_path / "b_2.png") ]
+    assert [ QImage(x).width() for x in paths ] == [ 500, 500, 200 ]
+
+def test_write_svg(qtbot, timeline, tmp_path):
+    FriezeRenderer(timeline, 0.02).writeSVG(str(tmp_path / "a.svg"), 500)
+
+    content = (tmp_path / "a.svg").read_text()
+    assert 'viewBox="0 0 1200 120"' in content
+    assert ">b</text>" in content
+
+def test_main(qtbot, tmp_path, capsys):
+    (tmp_path / "symptoms.json").write_text(json.dumps({
+        "attributes": [ { "name": "lateralized", "type": "exclusive", "values": [ "left", "right" ] } ],
+        "objective_symptoms": [ { "name": "category", "children": [ { "name": "a" } ] } ],
+        "subjective_symptoms": [ { "name": "other", "children": [ { "name": "b" } ] } ]
+    }))
+    (tmp_path / "timeline.json").write_text(json.dumps([
+        { "symptom": { "path": "objective_symptoms/category/a", "attributes": {} }, "start": 0, "end": 10000 }
+    ]))
+
+    assert main([ str(tmp_path / "timeline.json"), str(tmp_path / "frieze.png"),
+                  "--symptoms", str(tmp_path / "symptoms.json"), "--unit", "0.05" ]) == 0
+
+    assert capsys.readouterr().out == str(tmp_path / "frieze.png") + "\n"
+    assert QImage(str(tmp_path / "frieze.png")).width() == 500
+
+def test_main_bad_format(qtbot, tmp_path):
+    with pytest.raises(SystemExit):
+        main([ "timeline.json", str(tmp_path / "frieze.jpg") ])
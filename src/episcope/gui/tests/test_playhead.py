@@ -0,0 +1,104 @@
+import pytest
+
+from episcope.gui import PlayheadClock
+from episcope.gui.playhead import MAX_DRIFT_MS
+
+class FakeTime():
+    def __init__(self) -> None:
+        self.value = 100.0
+
+    def __call__(self) -> float:
+        return self.value
+
+    def advance(self, ms : int) -> None:
+        self.value += ms / 1000
+
+@pytest.fixture
+def now() -> FakeTime:
+    return FakeTime()
+
+@pytest.fixture
+def clock(qtbot, now) -> PlayheadClock:
+    return PlayheadClock(now)
+
+# Positions emitted by the clock.
+@pytest.fixture
+def emitted(clock) -> list[int]:
+    output : list[int] = []
+    clock.on_position_changed.connect(output.append)
+    return output
+
+def test_paused_follows_player(clock, now, emitted):
+    clock.synchronize(1000)
+    now.advance(500)
+
+    assert clock.position() == 1000
+    assert emitted == [ 1000 ]
+
+def test_playing_extrapolates(clock, now, emitted):
+    clock.synchronize(1000)
+    clock.setPlaying(True)
+    now.advance(40)
+
+    assert clock.position() == 1040
+    clock._tick()
+    assert emitted == [ 1000, 1040 ]
+
+def test_playing_does_not_emit_on_report(clock, now, emitted):
+    clock.setPlaying(True)
+    clock.synchronize(1000)
+
+    assert emitted == []
+    clock._tick()
+    assert emitted == [ 1000 ]
+
+def test_rate_change(clock, now):
+    clock.synchronize(1000)
+    clock.setPlaying(True)
+    now.advance(100)
+    clock.setRate(2.0)
+    now.advance(100)
+
+    assert clock.position() == 1300
+
+def test_pause_stops_extrapolation(clock, now, emitted):
+    clock.setPlaying(True)
+    now.advance(100)
+    clock.setPlaying(False)
+    now.advance(100)
+
+    assert clock.position() == 100
+    assert emitted[-1] == 100
+
+def test_small_lag_does_not_move_back(clock, now, emitted):
+    clock.synchronize(1000)
+    clock.setPlaying(True)
+    now.advance(100)
+    clock._tick()
+    clock.synchronize(1100 - MAX_DRIFT_MS // 2)
+    clock._tick()
+
+    assert emitted == [ 1000, 1100 ]
+
+def test_seek_moves_back(clock, now, emitted):
+    clock.setPlaying(True)
+    now.advance(100)
+    clock._tick()
+    clock.seek(50)
+
+    assert emitted == [ 100, 50 ]
+
+def test_clamped_to_duration(clock, now):
+    clock.setDuration(1000)
+    clock.synchronize(900)
+    clock.setPlaying(True)
+    now.advance(500)
+
+    assert clock.position() == 1000
+
+def test_timer_emits(qtbot):
+    clock = PlayheadClock()
+    clock.setPlaying(True)
+    with qtbot.waitSignal(clock.on_position_changed, timeout = 1000):
+        pass
+    clock.setPlaying(False)
@@ -0,0 +1,527 @@
+import pytest
+from PySide6.QtCore import Qt, QEvent, QPoint, QPointF, QRectF
+from PySide6.QtGui import QHelpEvent
+from PySide6.QtWidgets import QApplication, QToolTip
+
+from episcope.core import Symptom, SymptomCategory, Timeline
+from episcope.gui import TimelineWidget
+from episcope.gui.timeline import CURSOR_WIDTH_PX, TimelineBackground, TimelineBlock, TimelineLine, TimelineScene, TimelineView
+from episcope.gui.timeline import BACKGROUND_CACHED_TILES, BACKGROUND_TILE_WIDTH_PX, formatTimestamp, packIntervals
+
+@pytest.fixture()
+def category() -> SymptomCategory:
+    return SymptomCategory("objective", "category")
+
+def create_symptom(category : SymptomCategory, name : str) -> Symptom:
+    output = Symptom(name, attributes = {}, category = None, is_instance = False).instantiate()
+    category.addSymptom(output)
+    return output
+
+@pytest.fixture
+def widget(qtbot) -> TimelineWidget:
+    widget = TimelineWidget()
+    qtbot.addWidget(widget)
+    widget.resize(800, 300)
+    widget.show()
+    qtbot.waitExposed(widget)
+    return widget
+
+def scene(widget : TimelineWidget) -> TimelineScene:
+    return widget._scene
+
+def view(widget : TimelineWidget) -> TimelineView:
+    output = scene(widget).views()[0]
+    assert isinstance(output, TimelineView)
+    return output
+
+def test_block_pixel_position(widget, category):
+    block = TimelineBlock(create_symptom(category, "a"), 10000, 5000)
+    scene(widget).addBlock(block)
+    scene(widget).setUnit(0.05)
+    scene(widget).setOffset(137)
+
+    assert block.x() == 10000 * 0.05 - 137
+    assert block.width() == 5000 * 0.05
+    assert view(widget).mapFromScene(QPointF(10000, 0)).x() == 363
+
+def test_pan_and_zoom_keep_scene_geometry(widget, category):
+    block = TimelineBlock(create_symptom(category, "a"), 10000, 5000)
+    scene(widget).addBlock(block)
+    before = block.sceneBoundingRect()
+
+    scene(widget).setUnit(0.2)
+    scene(widget).setOffset(1500)
+
+    assert block.sceneBoundingRect() == before
+    assert view(widget).mapFromScene(QPointF(10000, 0)).x() == 500
+
+def test_drag_block(widget, qtbot, category):
+    block = TimelineBlock(create_symptom(category, "a"), 10000, 5000)
+    scene(widget).addBlock(block)
+    scene(widget).setUnit(0.05)
+    scene(widget).setOffset(300)
+
+    # Grab the middle of the block (x: 200 to 450 pixels) and move it 50px right.
+    viewport = view(widget).viewport()
+    qtbot.mousePress(viewport, Qt.LeftButton, pos = QPoint(325, 40))
+    qtbot.mouseMove(viewport, QPoint(375, 40))
+    qtbot.mouseRelease(viewport, Qt.LeftButton, pos = QPoint(375, 40))
+
+    assert block.rawX() == 11000
+    assert block.rawWidth() == 5000
+
+def test_drag_moves_coalesced(widget, qtbot, category, monkeypatch):
+    block = TimelineBlock(create_symptom(category, "a"), 10000, 5000)
+    scene(widget).addBlock(block)
+    scene(widget).setUnit(0.05)
+    scene(widget).setOffset(300)
+    scene(widget)._moveTimer.setInterval(60 * 1000)
+    moves = []
+    move_block = TimelineScene._moveBlock
+    monkeypatch.setattr(TimelineScene, "_moveBlock", lambda self, *args: moves.append(args) or move_block(self, *args))
+
+    viewport = view(widget).viewport()
+    qtbot.mousePress(viewport, Qt.LeftButton, pos = QPoint(325, 40))
+    for x in range(330, 380, 5):
+        qtbot.mouseMove(viewport, QPoint(x, 40))
+    assert moves == []
+
+    qtbot.mouseRelease(viewport, Qt.LeftButton, pos = QPoint(375, 40))
+    assert len(moves) == 1
+    assert block.rawX() == 11000
+
+def test_resize_block_right_handle(widget, qtbot, category):
+    block = TimelineBlock(create_symptom(category, "a"), 10000, 5000)
+    scene(widget).addBlock(block)
+    scene(widget).setUnit(0.05)
+    scene(widget).setOffset(300)
+
+    # Right handle is on the last pixels of the block.
+    viewport = view(widget).viewport()
+    qtbot.mousePress(viewport, Qt.LeftButton, pos = QPoint(446, 40))
+    qtbot.mouseMove(viewport, QPoint(496, 40))
+    qtbot.mouseRelease(viewport, Qt.LeftButton, pos = QPoint(496, 40))
+
+    assert block.rawX() == 10000
+    assert block.rawWidth() == 6000
+
+def test_pan_background(widget, qtbot, category):
+    scene(widget).addBlock(TimelineBlock(create_symptom(category, "a"), 100000, 5000))
+    scene(widget).setUnit(0.05)
+    scene(widget).setOffset(300)
+
+    viewport = view(widget).viewport()
+    qtbot.mousePress(viewport, Qt.LeftButton, pos = QPoint(100, 100))
+    qtbot.mouseMove(viewport, QPoint(60, 100))
+    qtbot.mouseRelease(viewport, Qt.LeftButton, pos = QPoint(60, 100))
+
+    assert scene(widget).offset() == 340
+
+def test_line_insert_sorted(category):
+    line = TimelineLine()
+    b = TimelineBlock(create_symptom(category, "b"), 2000, 1000)
+    a = TimelineBlock(create_symptom(category, "a"), 0, 1000)
+    c = TimelineBlock(create_symptom(category, "c"), 1000, 1000)
+
+    assert line.insert(b)
+    assert line.insert(a)
+    assert line.insert(c)
+    assert list(line) == [ a, c, b ]
+
+def test_line_insert_overlapping(category):
+    line = TimelineLine()
+    assert line.insert(TimelineBlock(create_symptom(category, "a"), 1000, 1000))
+
+    assert not line.insert(TimelineBlock(create_symptom(category, "b"), 500, 1000))
+    assert not line.insert(TimelineBlock(create_symptom(category, "c"), 1500, 1000))
+    assert not line.insert(TimelineBlock(create_symptom(category, "d"), 1200, 100))
+    assert len(line) == 1
+
+def test_line_overlapping(category):
+    line = TimelineLine()
+    blocks = [ TimelineBlock(create_symptom(category, "a"), i * 1000, 500) for i in range(10) ]
+    for block in blocks:
+        line.insert(block)
+
+    assert line.overlapping(2200, 4100) == blocks[2:5]
+    assert line.overlapping(2600, 2900) == []
+    assert line.overlapping(2500, 3000) == []
+
+def test_line_remove(category):
+    line = TimelineLine()
+    a = TimelineBlock(create_symptom(category, "a"), 0, 1000)
+    b = TimelineBlock(create_symptom(category, "b"), 1000, 1000)
+    line.insert(a)
+    line.insert(b)
+
+    line.remove(a)
+    assert list(line) == [ b ]
+    assert a not in line
+    with pytest.raises(ValueError):
+        line.remove(a)
+
+def test_block_at(widget, category):
+    blocks = [ TimelineBlock(create_symptom(category, "a"), i * 10000, 5000) for i in range(100) ]
+    for block in blocks:
+        scene(widget).addBlock(block)
+    scene(widget).setUnit(0.05)
+    scene(widget).setOffset(2000)
+
+    # Block 5 spans from 500 to 750 pixels.
+    assert scene(widget).blockAt(600, 40) is blocks[5]
+    assert scene(widget).blockAt(800, 40) is None
+    assert scene(widget).blockAt(600, 100) is None
+
+def test_add_overlapping_block_uses_new_line(widget, category):
+    a = TimelineBlock(create_symptom(category, "a"), 0, 5000)
+    b = TimelineBlock(create_symptom(category, "b"), 4000, 5000)
+    c = TimelineBlock(create_symptom(category, "c"), 5000, 5000)
+    for block in [ a, b, c ]:
+        scene(widget).addBlock(block)
+
+    assert (a.line(), b.line(), c.line()) == (0, 1, 0)
+
+def test_remove_block(widget, category):
+    a = TimelineBlock(create_symptom(category, "a"), 0, 5000)
+    b = TimelineBlock(create_symptom(category, "b"), 4000, 5000)
+    scene(widget).addBlock(a)
+    scene(widget).addBlock(b)
+
+    assert scene(widget).removeBlock(b)
+    assert not scene(widget).removeBlock(b)
+    assert len(scene(widget)._lines) == 1
+
+def test_cursor_move_repaints_cursor_only(widget, qtbot, category):
+    scene(widget).addBlock(TimelineBlock(create_symptom(category, "a"), 10000, 5000))
+    scene(widget).setUnit(0.05)
+    qtbot.wait(10)
+
+    with qtbot.waitSignal(scene(widget).changed) as blocker:
+        widget.updateCursorPosition(12000)
+
+    rects = blocker.args[0]
+    assert len(rects) != 0
+    for rect in rects:
+        assert rect.width() * scene(widget).unit() <= CURSOR_WIDTH_PX
+    assert scene(widget).cursorPosition() == 12000
+
+def test_cursor_move_uses_block_cache(widget, qtbot, category, monkeypatch):
+    scene(widget).addBlock(TimelineBlock(create_symptom(category, "a"), 10000, 5000))
+    scene(widget).setUnit(0.05)
+    qtbot.wait(10)
+
+    painted = []
+    paint = TimelineBlock.paint
+    monkeypatch.setattr(TimelineBlock, "paint", lambda self, *args: painted.append(self) or paint(self, *args))
+    for time in range(10000, 15000, 500):
+        widget.updateCursorPosition(time)
+        qtbot.wait(1)
+
+    assert painted == []
+
+def test_line_covered_before(category):
+    line = TimelineLine()
+    line.insert(TimelineBlock(create_symptom(category, "a"), 1000, 1000))
+    line.insert(TimelineBlock(create_symptom(category, "b"), 3000, 500))
+
+    assert line.duration() == 1500
+    assert line.coveredBefore(0) == 0
+    assert line.coveredBefore(1500) == 500
+    assert line.coveredBefore(2500) == 1000
+    assert line.coveredBefore(3200) == 1200
+    assert line.coveredBefore(10000) == 1500
+
+def test_level_of_detail(widget, category):
+    blocks = [ TimelineBlock(create_symptom(category, "a"), i * 2000, 1000) for i in range(1000) ]
+    for block in blocks:
+        scene(widget).addBlock(block)
+
+    # Blocks are 1000 * 0.001 = 1px wide.
+    scene(widget).setUnit(0.001)
+    assert scene(widget).levelOfDetail()
+    assert not any(x.isVisible() for x in blocks)
+    assert scene(widget).blockAt(blocks[0].x() + 0.5, 40) is None
+
+    scene(widget).setUnit(0.05)
+    assert not scene(widget).levelOfDetail()
+    assert all(x.isVisible() for x in blocks)
+    assert scene(widget).blockAt(blocks[0].x() + 10, 40) is blocks[0]
+
+def test_level_of_detail_new_block_hidden(widget, category):
+    for i in range(100):
+        scene(widget).addBlock(TimelineBlock(create_symptom(category, "a"), i * 2000, 1000))
+    scene(widget).setUnit(0.001)
+    block = TimelineBlock(create_symptom(category, "a"), 500000, 1000)
+    scene(widget).addBlock(block)
+
+    assert not block.isVisible()
+
+def test_level_of_detail_redrawn_on_timeline_update(widget, category, monkeypatch):
+    timeline = Timeline()
+    timeline.bulkLoad([ (create_symptom(category, "a"), i * 2000, i * 2000 + 1000) for i in range(100) ])
+    widget.setTimeline(timeline)
+    scene(widget).setUnit(0.001)
+    assert scene(widget).levelOfDetail()
+
+    redraws = []
+    monkeypatch.setattr(scene(widget), "_redrawScene", lambda: redraws.append(True))
+    timeline.updateSymptom(timeline.getSymptoms()[0].identifier, start = 500000, end = 501000)
+
+    # The density bars are in the cached background.
+    assert len(redraws) == 1
+
+def test_level_of_detail_paints_no_block(widget, qtbot, category, monkeypatch):
+    for i in range(1000):
+        scene(widget).addBlock(TimelineBlock(create_symptom(category, "a"), i * 2000, 1000))
+    scene(widget).setUnit(0.001)
+
+    painted = []
+    paint = TimelineBlock.paint
+    monkeypatch.setattr(TimelineBlock, "paint", lambda self, *args: painted.append(self) or paint(self, *args))
+    image = view(widget).grab().toImage()
+
+    assert painted == []
+    # Line 0 is drawn as a half-covered density bar.
+    color = image.pixelColor(100, 40)
+    assert color.blue() > color.red()
+
+def test_block_tooltip_lazy(widget, category, monkeypatch):
+    calls = []
+    monkeypatch.setattr(Symptom, "getTooltipText", lambda self: calls.append(self) or self.name)
+    block = TimelineBlock(create_symptom(category, "a"), 10000, 5000)
+    scene(widget).addBlock(block)
+    view(widget).grab()
+    assert calls == []
+
+    assert block.tooltip() == "a"
+    assert block.tooltip() == "a"
+    assert len(calls) == 1
+
+    block.invalidateData()
+    assert block.tooltip() == "a"
+    assert len(calls) == 2
+
+def test_block_tooltip_on_hover(widget, category):
+    block = TimelineBlock(create_symptom(category, "a"), 10000, 5000)
+    scene(widget).addBlock(block)
+    scene(widget).setUnit(0.05)
+
+    viewport = view(widget).viewport()
+    position = QPoint(600, 40)
+    QApplication.sendEvent(viewport, QHelpEvent(QEvent.ToolTip, position, viewport.mapToGlobal(position)))
+
+    assert QToolTip.text() == block.tooltip()
+
+def test_block_text_cached(widget, category):
+    TimelineBlock._layoutText.cache_clear()
+    blocks = [ TimelineBlock(create_symptom(category, "symptom"), i * 10000, 5000) for i in range(10) ]
+    for block in blocks:
+        scene(widget).addBlock(block)
+    scene(widget).setUnit(0.05)
+    view(widget).grab()
+    assert TimelineBlock._layoutText.cache_info().misses == 1
+
+    # Wide enough for the whole name at both zoom levels.
+    scene(widget).setUnit(0.06)
+    view(widget).grab()
+    assert TimelineBlock._layoutText.cache_info().misses == 1
+    assert blocks[0]._text == "symptom"
+
+def test_format_timestamp():
+    assert formatTimestamp(0, False) == "0:00"
+    assert formatTimestamp(75000, False) == "1:15"
+    assert formatTimestamp(3723000, False) == "1:02:03"
+    assert formatTimestamp(1500, True) == "0:01.500"
+
+def test_background_steps():
+    background = TimelineBackground(800, 300)
+    background.setUnit(0.05)
+
+    # 500ms is the first step at least 20px wide, labels need 80px.
+    assert background._msPerStep == 500
+    assert background._labelEvery == 4
+    assert not background._preciseLabels
+
+def test_background_tiles_reused_when_panning(widget, monkeypatch):
+    background = scene(widget)._background
+    rendered = []
+    render = TimelineBackground._renderTile
+    monkeypatch.setattr(TimelineBackground, "_renderTile", lambda self, *args: rendered.append(args[0]) or render(self, *args))
+    scene(widget).updateMediaDuration(600000)
+    scene(widget).setUnit(0.05)
+    view(widget).grab()
+    count = len(rendered)
+    assert count != 0
+
+    scene(widget).setOffset(128)
+    view(widget).grab()
+    scene(widget).setOffset(0)
+    view(widget).grab()
+
+    # Only the tile entering the window on the right was rendered.
+    assert len(rendered) == count + 1
+
+def test_background_tiles_bounded_per_level(widget):
+    background = scene(widget)._background
+    scene(widget).updateMediaDuration(3600000)
+    scene(widget).setUnit(0.3)
+    for offset in range(0, 100 * BACKGROUND_TILE_WIDTH_PX, 1000):
+        scene(widget).setOffset(offset)
+        view(widget).grab()
+
+    tiles = list(background._tiles.values())[-1]
+    assert len(tiles) == BACKGROUND_CACHED_TILES
+    # The tiles kept are the ones drawn last.
+    assert max(tiles) == int((scene(widget).offset() + background._width) // BACKGROUND_TILE_WIDTH_PX)
+
+def test_pack_intervals():
+    assert packIntervals([]) == []
+    assert packIntervals([ (0, 10), (10, 20), (20, 30) ]) == [ 0, 0, 0 ]
+    assert packIntervals([ (0, 10), (5, 15), (12, 20), (0, 30) ]) == [ 0, 2, 0, 1 ]
+
+def test_pack_intervals_minimum_lines():
+    intervals = [ ((i * 7) % 50, (i * 7) % 50 + 1 + i % 9) for i in range(200) ]
+    lines = packIntervals(intervals)
+
+    # As many lines as intervals overlapping at the busiest time.
+    overlap = max(sum(1 for start, end in intervals if start <= t < end) for t in range(60))
+    assert max(lines) + 1 == overlap
+    for line in set(lines):
+        spans = sorted(x for x, l in zip(intervals, lines) if l == line)
+        assert all(a[1] <= b[0] for a, b in zip(spans, spans[1:]))
+
+def test_repack(widget, category):
+    a = TimelineBlock(create_symptom(category, "a"), 0, 5000)
+    b = TimelineBlock(create_symptom(category, "b"), 1000, 5000)
+    c = TimelineBlock(create_symptom(category, "c"), 2000, 5000)
+    for block in [ a, b, c ]:
+        scene(widget).addBlock(block)
+    # Leaves a gap on line 1 after moving b away.
+    scene(widget)._moveBlock(b, 1, b.x() + 10000 * scene(widget).unit(), b.width())
+    assert (a.line(), b.line(), c.line()) == (0, 1, 2)
+
+    scene(widget).repack()
+
+    assert (a.line(), b.line(), c.line()) == (0, 0, 1)
+    assert len(scene(widget)._lines) == 2
+    assert scene(widget).blockAt(b.x() + 10, 40) is b
+
+def test_set_blocks(widget, category):
+    blocks = [ TimelineBlock(create_symptom(category, "a"), i * 1000, 2500) for i in range(10) ]
+    scene(widget).addBlock(TimelineBlock(create_symptom(category, "old"), 0, 1000))
+
+    scene(widget).setBlocks(blocks)
+
+    assert scene(widget).items() != []
+    assert sorted(scene(widget).items(), key=lambda x: x.rawX()) == blocks
+    assert [ x.line() for x in blocks ] == [ 0, 1, 2, 0, 1, 2, 0, 1, 2, 0 ]
+    assert len(scene(widget)._lines) == 3
+
+def test_set_blocks_redraws_once(widget, category, monkeypatch):
+    redraws = []
+    monkeypatch.setattr(TimelineScene, "_redrawScene", lambda self: redraws.append(self))
+    blocks = [ TimelineBlock(create_symptom(category, "a"), i * 1000, 2500) for i in range(100) ]
+
+    scene(widget).setBlocks(blocks)
+
+    assert len(redraws) == 1
+
+def test_set_blocks_indexes_blocks(widget, category, monkeypatch):
+    scene(widget).setBlocks([ TimelineBlock(create_symptom(category, "a"), i * 1000, 500) for i in range(1000) ])
+    QApplication.processEvents()
+    visited = []
+    bounding_rect = TimelineBlock.boundingRect
+    monkeypatch.setattr(TimelineBlock, "boundingRect", lambda self: visited.append(self) or bounding_rect(self))
+
+    assert len(scene(widget).items(QRectF(2200, 0, 2000, 100))) == 3
+    assert len(visited) < 100
+
+def test_set_timeline(widget, category):
+    timeline = Timeline()
+    timeline.bulkLoad([ (create_symptom(category, "a"), 0, 1000),
+                        (create_symptom(category, "b"), 500, 1500),
+                        (create_symptom(category, "c"), 2000, 3000) ])
+
+    widget.setTimeline(timeline)
+
+    output = widget.getTimeline()
+    assert [ (x.symptom.name, x.start, x.duration) for x in output.getSymptoms() ] == \
+           [ ("a", 0, 1000), ("b", 500, 1000), ("c", 2000, 1000) ]
+
+def test_timeline_follows_edits(widget, category):
+    timeline = Timeline()
+    timeline.bulkLoad([ (create_symptom(category, "a"), 0, 1000) ])
+    widget.setTimeline(timeline)
+    a = scene(widget)._lines[0][0]
+    b = TimelineBlock(create_symptom(category, "b"), 5000, 1000)
+
+    scene(widget).addBlock(b)
+    scene(widget)._moveBlock(a, 0, 2000 * scene(widget).unit(), a.width())
+
+    assert widget.getTimeline() is timeline
+    assert [ (x.symptom.name, x.start, x.duration) for x in timeline.getSymptoms() ] == \
+           [ ("a", 2000, 1000), ("b", 5000, 1000) ]
+
+    scene(widget).removeBlock(a)
+
+    assert [ x.symptom.name for x in timeline.getSymptoms() ] == [ "b" ]
+    assert b.identifier() == timeline.getSymptoms()[0].identifier
+
+def test_scene_follows_timeline(widget, category):
+    timeline = Timeline()
+    timeline.bulkLoad([ (create_symptom(category, "a"), 0, 1000) ])
+    widget.setTimeline(timeline)
+    a = scene(widget)._lines[0][0]
+
+    identifier = timeline.addSymptom(create_symptom(category, "b"), 500, 1500)
+    b = scene(widget)._lines[1][0]
+    assert (b.symptom().name, b.rawX(), b.rawWidth(), b.identifier()) == ("b", 500, 1000, identifier)
+
+    # Still fits on its line: stays there.
+    timeline.updateSymptom(identifier, start = 2000, end = 2500)
+    assert (b.rawX(), b.rawWidth(), b.line()) == (2000, 500, 1)
+
+    # Overlaps another block on its line: moved to the first line it fits in.
+    timeline.addSymptom(create_symptom(category, "d"), 500, 1500)
+    assert scene(widget)._lines[1][0].symptom().name == "d"
+    timeline.updateSymptom(identifier, start = 1000, end = 1600)
+    assert (b.rawX(), b.line()) == (1000, 0)
+
+    c = create_symptom(category, "c")
+    timeline.updateSymptom(a.identifier(), symptom = c)
+    assert a.symptom() is c
+
+    timeline.removeSymptom(identifier)
+    assert b.scene() is None
+    assert b.identifier() is None
+    assert list(scene(widget)._lines[0]) == [ a ]
+    assert len(scene(widget)._lines) == 2
+
+def test_scene_edits_not_applied_twice(widget, category):
+    timeline = Timeline()
+    widget.setTimeline(timeline)
+    events = []
+    timeline.addObserver(events.append)
+
+    scene(widget).addBlock(TimelineBlock(create_symptom(category, "a"), 0, 1000))
+
+    assert len(events) == 1
+    assert len(scene(widget).items()) == 1
+
+def test_set_timeline_unbinds_previous(widget, category):
+    first = Timeline()
+    widget.setTimeline(first)
+    widget.setTimeline(Timeline())
+
+    first.addSymptom(create_symptom(category, "a"), 0, 1000)
+
+    assert scene(widget).items() == []
+
+def test_reset(widget, category):
+    for i in range(10):
+        scene(widget).addBlock(TimelineBlock(create_symptom(category, "a"), i * 1000, 2500))
+
+    scene(widget).reset()
+
+    assert scene(widget).items() == []
+    assert scene(widget)._lines == []
@@ -1,17 +1,28 @@
 from PySide6.QtWidgets import (QGraphicsItem,
                                QGraphicsScene,
+                               QGraphicsSceneHelpEvent,
                                QGraphicsSceneMouseEvent,
                                QGraphicsView,
                                QMenu,
                                QStyleOptionGraphicsItem,
+                               QToolTip,
                                QVBoxLayout,
                                QWidget)
-from PySide6.QtCore import Signal, Qt, QRect, QPoint, QRectF, QPointF
-from PySide6.QtGui import QPainter, QFont, QBrush, QColor, QFontMetrics, QPen, QAction, QWheelEvent
-from typing import Self, Optional, override
+from PySide6.QtCore import Signal, Qt, QRect, QPoint, QRectF, QPointF, QLineF, QTimer
+from PySide6.QtGui import QPainter, QFont, QBrush, QColor, QFontMetrics, QPen, QAction, QWheelEvent, QTransform, QPixmap
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from heapq import heappop, heappush
+from itertools import accumulate
+from typing import Self, Optional, Iterator, override
+
+import math
 
 from episcope.localization import I18N
-from episcope.core import Timeline, Symptom, Attribute
+from episcope.core import Timeline, TimelineChange, TimelineEvent, Symptom, Attribute
+from episcope.gui.playhead import frameInterval
 
 # The maximum level of zoom (zoom in).
 MAX_ZOOM_UNIT = 0.3
@@ -26,6 +37,26 @@ LINE_HEIGHT_PX = 50
 CURSOR_WIDTH_PX = 20
 # Minimum size of a step(gradation) on the timeline.
 MIN_TIMELINE_STEP_WIDTH_PX = 20
+# Possible durations of a step. Beyond the last one, it is doubled.
+TIMELINE_STEPS_MS = [ 10, 20, 50, 100, 200, 500,
+                      1000, 2000, 5000, 10000, 15000, 30000,
+                      60000, 120000, 300000, 600000, 900000, 1800000, 3600000 ]
+# Minimum space between two timestamps on the ruler.
+MIN_LABEL_SPACING_PX = 80
+# Width of the cached background tiles.
+BACKGROUND_TILE_WIDTH_PX = 256
+# Number of zoom levels whose background tiles are kept.
+BACKGROUND_CACHED_LEVELS = 4
+# Number of tiles kept per zoom level, the least recently drawn are evicted.
+BACKGROUND_CACHED_TILES = 32
+
+# Below this mean block width, lines are drawn as density bars (level of
+# detail) instead of blocks.
+LOD_BLOCK_WIDTH_PX = 4
+# Width of a density bar.
+LOD_BAR_WIDTH_PX = 2
+# Number of shades used to draw the density bars.
+LOD_LEVELS = 8
 
 # Default duration of the newly created symptoms. 10s by default.
 SYMPTOM_DEFAULT_DURATION_MS = 10 * 1000
@@ -35,6 +66,21 @@ DEFAULT_FONT_SIZE = 10
 # Default font name.
 DEFAULT_FONT_NAME = "arial"
 
+# Formats |time| as h:mm:ss (or m:ss), with milliseconds if |precise|.
+def formatTimestamp(time : int, precise : bool) -> str:
+    seconds, milliseconds = divmod(int(time), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    output = f"{hours}:{minutes:02}:{seconds:02}" if hours != 0 else f"{minutes}:{seconds:02}"
+    return f"{output}.{milliseconds:03}" if precise else output
+
+# Scene coordinates are (time in ms, y in pixels): the zoom (|unit|, pixels per
+# ms) and the pan (|offset|, in pixels) are applied by the view transform.
+# Element geometry (handles, hit-testing, drawing) is expressed in pixel space,
+# which this transform maps back to scene coordinates.
+def pixelToSceneTransform(unit : float, offset : float) -> QTransform:
+    return QTransform(1 / unit, 0, 0, 1, offset / unit, 0)
+
 class TimelineElement(QGraphicsItem):
     def __init__(self, x, y, width, height, *kargs, **kwargs):
         super().__init__(*kargs, **kwargs)
@@ -48,8 +94,18 @@ class TimelineElement(QGraphicsItem):
     def _onSizeChanged(self : Self) -> None:
         pass
 
+    # Elements added to a scene follow its zoom and offset. The others (cursor,
+    # background) are drawn by the scene itself and get them pushed.
+    def unit(self : Self) -> float:
+        scene = self.scene()
+        return scene.unit() if isinstance(scene, TimelineScene) else self._unit
+
+    def offset(self : Self) -> float:
+        scene = self.scene()
+        return scene.offset() if isinstance(scene, TimelineScene) else self._offset
+
     def width(self : Self) -> float:
-        return self._width * self._unit
+        return self._width * self.unit()
 
     def rawWidth(self : Self) -> float:
         return self._width
@@ -58,19 +114,22 @@ class TimelineElement(QGraphicsItem):
         return self._height
 
     def setWidth(self, width):
-        self._width = width / self._unit
+        self.prepareGeometryChange()
+        self._width = width / self.unit()
         self._onSizeChanged()
 
     def setRawWidth(self, width):
+        self.prepareGeometryChange()
         self._width = width
         self._onSizeChanged()
 
     def setHeight(self, height):
+        self.prepareGeometryChange()
         self._height = height
         self._onSizeChanged()
 
     def x(self):
-        return self._x * self._unit - self._offset
+        return self._x * self.unit() - self.offset()
 
     def rawX(self):
         return self._x
@@ -79,9 +138,11 @@ class TimelineElement(QGraphicsItem):
         return self._y
 
     def setX(self, x):
-        self._x = (x + self._offset) / self._unit
+        self.prepareGeometryChange()
+        self._x = (x + self.offset()) / self.unit()
 
     def setRawX(self, x):
+        self.prepareGeometryChange()
         self._x = x
 
     def setUnit(self, unit):
@@ -91,8 +152,14 @@ class TimelineElement(QGraphicsItem):
     def setOffset(self, offset):
         self._offset = offset
 
+    # In scene coordinates: does not change when zooming or panning.
     def boundingRect(self):
-        return QRectF(self.x(), self.y(), self.width(), self.height())
+        return QRectF(self._x, self.y(), self._width, self.height())
+
+    # Switches |painter| from scene coordinates to pixel space.
+    def _toPixelSpace(self : Self, painter : QPainter) -> None:
+        transform = pixelToSceneTransform(self.unit(), self.offset())
+        painter.setWorldTransform(transform * painter.worldTransform())
 
     def grabbedLeftHandle(self, x):
         return False
@@ -121,22 +188,39 @@ class TimelineBlock(TimelineElement):
         super().__init__(x, LINE_START_PX, width, LINE_HEIGHT_PX, *kargs, **kwargs)
         self._line = 0
         self._symptom = symptom
+        # Identifier of the matching item in the scene's timeline.
+        self._identifier : Optional[int] = None
+        self._tooltip : Optional[str] = None
+        self._textLetters : Optional[int] = None
+        # Blocks are repainted from a pixmap unless they change or the zoom does.
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
         self.invalidateData()
 
     @override
     def invalidateData(self : Self) -> None:
-        self.setToolTip(self._getTooltip())
-        self._computeText()
+        # Computed when needed: the tooltip on hover, the text when painting.
+        self._tooltip = None
+        self._textLetters = None
+        self.update()
 
-    def _getTooltip(self : Self) -> str:
-        return self.symptom().getTooltipText()
+    def tooltip(self : Self) -> str:
+        if self._tooltip is None:
+            self._tooltip = self.symptom().getTooltipText()
+        return self._tooltip
 
     def symptom(self : Self) -> Symptom:
         return self._symptom
 
-    def _onSizeChanged(self : Self) -> None:
+    def setSymptom(self : Self, symptom : Symptom) -> None:
+        self._symptom = symptom
         self.invalidateData()
 
+    def identifier(self : Self) -> Optional[int]:
+        return self._identifier
+
+    def setIdentifier(self : Self, identifier : Optional[int]) -> None:
+        self._identifier = identifier
+
     # Override of the base class y(): block's height depends on its line.
     def y(self):
         return LINE_START_PX + self.line() * LINE_HEIGHT_PX
@@ -145,6 +229,7 @@ class TimelineBlock(TimelineElement):
         return self._line
 
     def setLine(self, line):
+        self.prepareGeometryChange()
         self._line = line
 
     def _canDrawHandles(self : Self) -> bool:
@@ -156,21 +241,28 @@ class TimelineBlock(TimelineElement):
     def _availableSpaceForText(self : Self) -> int:
         return int(self.width() - self._handlesSize())
 
-    # Compute the text that can be shown in the block
+    # Compute the text that can be shown in the block. It only changes when the
+    # number of letters which fit in the block does.
     def _computeText(self : Self) -> None:
-        self._text = ""
-        self._textWidth = 0
-
-        letter_width = self.FONT_METRIC.horizontalAdvance("A")
-        available = self._availableSpaceForText()
-        letter_count = int(available // letter_width)
-
-        if letter_count < 3:
-            return
-
+        letter_count = int(self._availableSpaceForText() // self._letterWidth())
         name = self._symptom.name
-        self._text = name[:min(letter_count, len(name))]
-        self._textWidth = self.FONT_METRIC.horizontalAdvance(self._text)
+        letter_count = 0 if letter_count < 3 else min(letter_count, len(name))
+        if letter_count != self._textLetters:
+            self._text, self._textWidth = self._layoutText(name, letter_count)
+            self._textLetters = letter_count
+
+    # Measured once the application (and its fonts) exists.
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _letterWidth() -> int:
+        return TimelineBlock.FONT_METRIC.horizontalAdvance("A")
+
+    # Shared by all the blocks: a name is only measured once per letter count.
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _layoutText(name : str, letter_count : int) -> tuple[str, int]:
+        text = name[:letter_count]
+        return text, TimelineBlock.FONT_METRIC.horizontalAdvance(text)
 
     def _drawHandle(self, painter, x):
         brush = QBrush()
@@ -205,6 +297,10 @@ class TimelineBlock(TimelineElement):
         painter.setPen(Qt.NoPen)
 
     def paint(self, painter, option, widget=None):
+        self._computeText()
+
+        painter.save()
+        self._toPixelSpace(painter)
         painter.setPen(Qt.NoPen)
         self._drawBackground(painter)
 
@@ -216,6 +312,7 @@ class TimelineBlock(TimelineElement):
             handle_right_x = self.width() - self.HANDLE_WIDTH - self.HANDLE_MARGIN
             self._drawHandle(painter, self.x() + handle_left_x)
             self._drawHandle(painter, self.x() + handle_right_x)
+        painter.restore()
 
     def grabbedLeftHandle(self, x):
         if self.width() < self.HANDLE_CUTOFF:
@@ -228,18 +325,25 @@ class TimelineBlock(TimelineElement):
         return x >= self.x() + self.width() - self.HANDLE_WIDTH - self.HANDLE_MARGIN
 
 class TimelineBackground(QGraphicsItem):
+    LIGHT_PEN = QPen(QColor.fromRgb(200, 200, 200))
+    DARK_PEN = QPen(QColor.fromRgb(100, 100, 100))
+    LABEL_PEN = QPen(QColor.fromRgb(60, 60, 60))
+    OUT_OF_MEDIA_BRUSH = QBrush(QColor.fromRgb(255, 0, 0))
+    FONT = QFont(DEFAULT_FONT_NAME, DEFAULT_FONT_SIZE - 2)
+
     def __init__(self, width, height, *kargs, **kwargs):
         super().__init__(*kargs, **kwargs)
         self._width = width;
         self._height = height;
         self._unit = DEFAULT_ZOOM_UNIT
         self._offset = 0
-        self._computeDrawingConstants()
         self._media_duration = None
+        # Rendered tiles, per (unit, height, pixel ratio), least recently used first.
+        self._tiles : OrderedDict[tuple[float, float, float], OrderedDict[int, QPixmap]] = OrderedDict()
+        self._computeDrawingConstants()
 
     def setOffset(self, offset):
         self._offset = offset
-        self._computeDrawingConstants()
 
     def setUnit(self, unit):
         self._unit = unit
@@ -247,55 +351,92 @@ class TimelineBackground(QGraphicsItem):
 
     def setMediaDuration(self, duration):
         self._media_duration = duration
-        self._computeDrawingConstants()
 
     def resize(self, width, height):
         self._width = width
         self._height = height
-        self._computeDrawingConstants()
 
+    # Picks the smallest step at least MIN_TIMELINE_STEP_WIDTH_PX wide, and
+    # labels every |_labelEvery| steps.
     def _computeDrawingConstants(self):
-        if self._width < 10:
-            return
-        msPerChunk = 2
-        pxPerChunk = 0
-        while pxPerChunk < MIN_TIMELINE_STEP_WIDTH_PX:
-            msPerChunk *= 4
-            msPerWidth = self._width / self._unit
-            chunkCount = msPerWidth / msPerChunk
-            pxPerChunk = self._width / chunkCount
-
-        self._x_start = -pxPerChunk * ((self._offset / self._unit) % msPerChunk / msPerChunk)
-        self._x_end = self._width
-        if self._media_duration is not None:
-            self._x_end = self._media_duration * self._unit - self._offset
-        self._pxPerChunk = pxPerChunk
-        self._chunkCount = int(self._width / pxPerChunk + 1)
+        step = TIMELINE_STEPS_MS[-1]
+        for candidate in TIMELINE_STEPS_MS:
+            if candidate * self._unit >= MIN_TIMELINE_STEP_WIDTH_PX:
+                step = candidate
+                break
+        while step * self._unit < MIN_TIMELINE_STEP_WIDTH_PX:
+            step *= 2
+        self._msPerStep = step
+        self._labelEvery = math.ceil(MIN_LABEL_SPACING_PX / (step * self._unit))
+        self._preciseLabels = (step * self._labelEvery) % 1000 != 0
 
+    def boundingRect(self):
+        return QRectF(0, 0, self._width, self._height)
+
+    # Draws the [left, left + width[ pixel range of the timeline at the origin
+    # of |painter|: a light line every step, a dark one between them and the
+    # timestamps on the ruler.
+    def drawRange(self, painter, left, width):
+        step_px = self._msPerStep * self._unit
+        # Labels starting before the range may overflow into it.
+        first = math.floor((left - MIN_LABEL_SPACING_PX) / step_px)
+        last = math.ceil((left + width) / step_px)
+        light = [ QLineF(i * step_px - left, 0, i * step_px - left, self._height) for i in range(first, last + 1) ]
+        dark = [ QLineF(x.x1() + step_px / 2, 0, x.x1() + step_px / 2, self._height) for x in light ]
+
+        painter.setPen(self.LIGHT_PEN)
+        painter.drawLines(light)
+        painter.setPen(self.DARK_PEN)
+        painter.drawLines(dark)
+        painter.setPen(self.LABEL_PEN)
+        painter.setFont(self.FONT)
+        for i in range(max(0, first + (-first) % self._labelEvery), last + 1, self._labelEvery):
+            text = formatTimestamp(i * self._msPerStep, self._preciseLabels)
+            painter.drawText(QPointF(i * step_px - left + 3, LINE_START_PX - 6), text)
+
+    # Renders the tile starting at |index| * BACKGROUND_TILE_WIDTH_PX, in
+    # pixels from the start of the timeline.
+    def _renderTile(self, index, ratio):
+        width = BACKGROUND_TILE_WIDTH_PX
+        pixmap = QPixmap(math.ceil(width * ratio), math.ceil(self._height * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.white)
+        painter = QPainter(pixmap)
+        self.drawRange(painter, index * width, width)
+        painter.end()
+        return pixmap
+
+    def _tile(self, index, ratio):
+        key = (self._unit, self._height, ratio)
+        if key not in self._tiles:
+            self._tiles[key] = OrderedDict()
+            if len(self._tiles) > BACKGROUND_CACHED_LEVELS:
+                self._tiles.popitem(last=False)
+        self._tiles.move_to_end(key)
+        tiles = self._tiles[key]
+        if index not in tiles:
+            tiles[index] = self._renderTile(index, ratio)
+            if len(tiles) > BACKGROUND_CACHED_TILES:
+                tiles.popitem(last=False)
+        tiles.move_to_end(index)
+        return tiles[index]
+
+    # Draws in pixel space: only blits cached tiles, rendered once per zoom level.
     def paint(self, painter, option, widget=None):
-        pen = QPen(QColor.fromRgb(200, 200, 200))
-        brush = QBrush()
-        brush.setStyle(Qt.SolidPattern)
-        brush.setColor(QColor.fromRgb(255, 255, 255))
-
-        painter.setPen(pen)
-        painter.setBrush(brush)
-
-        for i in range(self._chunkCount):
-            x = i * self._pxPerChunk + self._x_start
-            painter.drawLine(x, 0, x, self._height)
-
-        pen = QPen(QColor.fromRgb(100, 100, 100))
-        painter.setPen(pen)
-        for i in range(self._chunkCount):
-            x = i * self._pxPerChunk + self._x_start
-            painter.drawLine(x + self._pxPerChunk // 2, 0, x + self._pxPerChunk // 2, self._height)
+        if self._width < 1 or self._height < 1:
+            return
+        ratio = painter.device().devicePixelRatioF()
+        first = int(self._offset // BACKGROUND_TILE_WIDTH_PX)
+        last = int((self._offset + self._width) // BACKGROUND_TILE_WIDTH_PX)
+        for index in range(first, last + 1):
+            painter.drawPixmap(QPointF(index * BACKGROUND_TILE_WIDTH_PX - self._offset, 0), self._tile(index, ratio))
 
-        if self._x_end < self._width:
-            brush.setColor(QColor.fromRgb(255, 0, 0))
-            painter.setPen(Qt.NoPen)
-            painter.setBrush(brush)
-            painter.drawRect(self._x_end, 0, self._width, self._height)
+        if self._media_duration is not None:
+            x_end = self._media_duration * self._unit - self._offset
+            if x_end < self._width:
+                painter.setPen(Qt.NoPen)
+                painter.setBrush(self.OUT_OF_MEDIA_BRUSH)
+                painter.drawRect(QRectF(x_end, 0, self._width - x_end, self._height))
 
 class TimelineCursor(TimelineElement):
     def __init__(self, height, *kargs, **kwargs):
@@ -309,7 +450,8 @@ class TimelineCursor(TimelineElement):
         return True
 
     def boundingRect(self):
-        return QRectF(self.x() - CURSOR_WIDTH_PX / 2, self.y(), CURSOR_WIDTH_PX, self.height())
+        width = CURSOR_WIDTH_PX / self.unit()
+        return QRectF(self._x - width / 2, self.y(), width, self.height())
 
     def paint(self, painter, option, widget=None):
         painter.setPen(Qt.NoPen)
@@ -355,6 +497,110 @@ class DragState():
     def grabbedRightHandle(self):
         return self._item is not None and self._grabbedRight
 
+# Assigns a line to each [start, end[ interval so that intervals on a line do
+# not overlap, using as few lines as possible (the maximum number of intervals
+# overlapping at any time). Sweeps the intervals by start time: lines are
+# reused as soon as their last interval ended, lowest index first.
+# O(n log n). Returns the line of each interval, in input order.
+def packIntervals(intervals : list[tuple[float, float]]) -> list[int]:
+    output = [ 0 ] * len(intervals)
+    busy : list[tuple[float, int]] = []
+    free : list[int] = []
+    line_count = 0
+    for i in sorted(range(len(intervals)), key=lambda x: intervals[x]):
+        start, end = intervals[i]
+        while len(busy) != 0 and busy[0][0] <= start:
+            heappush(free, heappop(busy)[1])
+        if len(free) != 0:
+            line = heappop(free)
+        else:
+            line = line_count
+            line_count += 1
+        heappush(busy, (end, line))
+        output[i] = line
+    return output
+
+# Blocks of one line of the timeline. They never overlap, so sorting them by
+# start time also sorts them by end time: lookups are binary searches on the
+# (time coordinates) start of the blocks.
+class TimelineLine():
+    def __init__(self : Self) -> None:
+        self._starts : list[float] = []
+        self._blocks : list[TimelineBlock] = []
+        self._duration = 0.0
+        # Time covered by the blocks before block i, built on demand.
+        self._covered : Optional[list[float]] = None
+
+    def __len__(self : Self) -> int:
+        return len(self._blocks)
+
+    def __iter__(self : Self) -> Iterator[TimelineBlock]:
+        return iter(self._blocks)
+
+    def __getitem__(self : Self, index : int) -> TimelineBlock:
+        return self._blocks[index]
+
+    def __contains__(self : Self, block : TimelineBlock) -> bool:
+        return self._indexOf(block) is not None
+
+    def _indexOf(self : Self, block : TimelineBlock) -> Optional[int]:
+        i = bisect_left(self._starts, block.rawX())
+        while i < len(self._blocks) and self._starts[i] == block.rawX():
+            if self._blocks[i] is block:
+                return i
+            i += 1
+        return None
+
+    # Returns the blocks intersecting [start, end[, sorted by time.
+    def overlapping(self : Self, start : float, end : float) -> list[TimelineBlock]:
+        # Only the block starting right before |start| can span over it.
+        first = max(0, bisect_right(self._starts, start) - 1)
+        last = bisect_left(self._starts, end)
+        return [ x for x in self._blocks[first:last] if x.rawX() + x.rawWidth() > start ]
+
+    # Returns the blocks which could contain |time|, sorted by time.
+    def around(self : Self, time : float) -> list[TimelineBlock]:
+        i = bisect_right(self._starts, time)
+        return self._blocks[max(0, i - 2):i]
+
+    # Sum of the block durations.
+    def duration(self : Self) -> float:
+        return self._duration
+
+    # Returns the time covered by blocks before |time|, in O(log n).
+    def coveredBefore(self : Self, time : float) -> float:
+        if self._covered is None:
+            self._covered = [ 0, *accumulate(x.rawWidth() for x in self._blocks) ]
+        i = bisect_right(self._starts, time)
+        if i == 0:
+            return 0
+        return self._covered[i - 1] + min(time - self._starts[i - 1], self._blocks[i - 1].rawWidth())
+
+    # Tries to insert |block|. Returns True if insertion was done, False if
+    # the block overlaps another one.
+    def insert(self : Self, block : TimelineBlock) -> bool:
+        start = block.rawX()
+        i = bisect_right(self._starts, start)
+        # Block on the left must end before, block on the right start after.
+        if i > 0 and self._blocks[i - 1].rawX() + self._blocks[i - 1].rawWidth() > start:
+            return False
+        if i < len(self._blocks) and self._starts[i] < start + block.rawWidth():
+            return False
+        self._starts.insert(i, start)
+        self._blocks.insert(i, block)
+        self._duration += block.rawWidth()
+        self._covered = None
+        return True
+
+    def remove(self : Self, block : TimelineBlock) -> None:
+        i = self._indexOf(block)
+        if i is None:
+            raise ValueError("Block is not in this line.")
+        del self._starts[i]
+        del self._blocks[i]
+        self._duration -= block.rawWidth()
+        self._covered = None
+
 class TimelineScene(QGraphicsScene):
     on_seek = Signal(int)
     on_symptom_edit = Signal(Symptom)
@@ -369,6 +615,23 @@ class TimelineScene(QGraphicsScene):
         self._media_duration = None
         self._windowWidth = 0
         self._windowHeight = 0
+        self._levelOfDetail = False
+        # Model of the blocks, updated each time one is added, moved or removed.
+        # Its changes are applied back to the blocks, see _onTimelineChanged().
+        self._timeline = Timeline()
+        self._timeline.addObserver(self._onTimelineChanged)
+        # Blocks per identifier in the timeline.
+        self._blocks : dict[int, TimelineBlock] = {}
+        # Set while the scene writes its own edits to the timeline: the blocks
+        # are already up to date.
+        self._editingTimeline = False
+        # While dragging, only the last mouse position of each frame is applied.
+        self._pendingMove : Optional[QPointF] = None
+        self._moveTimer = QTimer(self)
+        self._moveTimer.setSingleShot(True)
+        self._moveTimer.setTimerType(Qt.PreciseTimer)
+        self._moveTimer.setInterval(frameInterval())
+        self._moveTimer.timeout.connect(self._applyPendingMove)
 
         sceneWidth = self.sceneRect().width()
         sceneHeight = self.sceneRect().height()
@@ -376,33 +639,107 @@ class TimelineScene(QGraphicsScene):
         self._background = TimelineBackground(sceneWidth, sceneHeight)
 
     def getTimeline(self : Self) -> Timeline:
-        timeline = Timeline()
-        for line in self._lines:
-            for item in line:
-                timeline.addSymptom(item.symptom(), int(item.rawX()), int(item.rawX() + item.rawWidth()))
-        return timeline
+        return self._timeline
+
+    @staticmethod
+    def _blockRange(block : TimelineBlock) -> tuple[int, int]:
+        return int(block.rawX()), int(block.rawX() + block.rawWidth())
+
+    @contextmanager
+    def _editTimeline(self : Self) -> Iterator[Timeline]:
+        self._editingTimeline = True
+        try:
+            yield self._timeline
+        finally:
+            self._editingTimeline = False
+
+    def _bindTimeline(self : Self, timeline : Timeline, blocks : list[TimelineBlock]) -> None:
+        self._timeline.removeObserver(self._onTimelineChanged)
+        self._timeline = timeline
+        self._timeline.addObserver(self._onTimelineChanged)
+        self._blocks = {}
+        for block in blocks:
+            identifier = block.identifier()
+            assert identifier is not None
+            self._blocks[identifier] = block
+
+    # Reports the new position of |block| to the timeline.
+    def _onBlockChanged(self : Self, block : TimelineBlock) -> None:
+        start, end = self._blockRange(block)
+        identifier = block.identifier()
+        assert identifier is not None
+        with self._editTimeline() as timeline:
+            timeline.updateSymptom(identifier, start = start, end = end)
+
+    # Applies the changes done to the timeline outside of the scene.
+    def _onTimelineChanged(self : Self, event : TimelineEvent) -> None:
+        if self._editingTimeline:
+            return
+        item = event.item
+        if event.change == TimelineChange.ADDED:
+            added = TimelineBlock(item.symptom, item.start, item.duration)
+            added.setIdentifier(item.identifier)
+            self._blocks[item.identifier] = added
+            self._insertBlock(added)
+            return
+
+        block = self._blocks.get(item.identifier)
+        if block is None:
+            return
+        if event.change == TimelineChange.REMOVED:
+            del self._blocks[item.identifier]
+            self._detachBlock(block)
+            block.setIdentifier(None)
+            return
+
+        if block.symptom() is not item.symptom:
+            block.setSymptom(item.symptom)
+        else:
+            block.invalidateData()
+        if block.rawX() != item.start or block.rawWidth() != item.duration:
+            self._relocateBlock(block, item.start, item.duration)
 
     def getTimelineDuration(self : Self) -> int:
-        duration = 0
-        for line in self._lines:
-            if len(line) == 0:
-                continue
-            duration = max(duration, line[-1].rawX() + line[-1].rawWidth())
-        return duration
+        return self._timeline.getDuration()
 
     def _sceneHeight(self) -> int:
         return LINE_START_PX + len(self._lines) * LINE_HEIGHT_PX
 
     def _computeSceneRect(self : Self) -> None:
-        # If the scene is larger than the window, scrollbars are shown.
-        # - horizontal: we handle that ourselves. Always report the same size.
-        # - vertical: we want to use the max space, but allow scrolling.
-        rect = QRectF(0, 0, self._windowWidth, max(self._sceneHeight(), self._windowHeight))
+        # The scene spans the whole timeline (in ms). Only its height matters
+        # to the views: the horizontal range is handled by _updateViews().
+        # Vertically, we want to use the max space, but allow scrolling.
+        width = max(self.sceneRect().width(), self._media_duration or 0, self.getTimelineDuration())
+        rect = QRectF(0, 0, width, max(self._sceneHeight(), self._windowHeight))
         self.setSceneRect(rect)
         self._cursor.setHeight(rect.height())
-        self._background.resize(rect.width(), rect.height())
+        self._background.resize(self._windowWidth, rect.height())
+        self._updateViews()
         self._redrawScene()
 
+    # The scene index partitions the scene rect: items outside of it are
+    # returned by every lookup, making partial repaints as slow as full ones.
+    # Resizing it rebuilds the index, so the scene grows by doubling.
+    def _extendSceneRect(self : Self, end : float) -> None:
+        rect = self.sceneRect()
+        if end > rect.right():
+            rect.setRight(max(end, 2 * rect.right()))
+            self.setSceneRect(rect)
+
+    # Applies the zoom and offset to the views. Items are left untouched, so
+    # this costs the same whatever the number of blocks.
+    def _updateViews(self : Self) -> None:
+        transform = QTransform.fromScale(self._unit, 1)
+        visible = QRectF(self._offset / self._unit, 0, self._windowWidth / self._unit, self.sceneRect().height())
+        for view in self.views():
+            view.setTransform(transform)
+            view.setSceneRect(visible)
+
+    # Position of the |event| in pixel space, relative to the view.
+    def _eventPosition(self : Self, event : QGraphicsSceneMouseEvent | QGraphicsSceneHelpEvent) -> QPointF:
+        position = event.scenePos()
+        return QPointF(position.x() * self._unit - self._offset, position.y())
+
     def onWindowResize(self, width, height):
         unit = self._unit
         if int(self._windowWidth) != 0 and int(width) != 0:
@@ -416,6 +753,18 @@ class TimelineScene(QGraphicsScene):
         self._computeSceneRect()
         self.setUnit(unit)
 
+    # Moves every block to the line given by packIntervals(): the timeline
+    # ends up on the minimum number of lines. Redrawn once.
+    def repack(self : Self) -> None:
+        blocks = [ block for line in self._lines for block in line ]
+        lines = packIntervals([ (x.rawX(), x.rawX() + x.rawWidth()) for x in blocks ])
+        self._lines = [ TimelineLine() for _ in range(max(lines, default=-1) + 1) ]
+        for block, line in zip(blocks, lines):
+            block.setLine(line)
+            success = self._lines[line].insert(block)
+            assert success
+        self._onLineCountChange()
+
     def _onLineCountChange(self : Self):
         self._computeSceneRect()
 
@@ -435,10 +784,32 @@ class TimelineScene(QGraphicsScene):
     def setUnit(self, unit):
         unit = min(MAX_ZOOM_UNIT, max(self._minUnit(), unit))
         self._unit = unit
-        for item in self.items():
-            item.setUnit(unit)
         self._cursor.setUnit(unit)
         self._background.setUnit(unit)
+        self._updateLevelOfDetail()
+        self._updateViews()
+        self._redrawScene()
+
+    def unit(self):
+        return self._unit
+
+    def levelOfDetail(self : Self) -> bool:
+        return self._levelOfDetail
+
+    # When blocks are only a few pixels wide, drawing them one by one costs a
+    # lot for nothing: lines are then drawn as density bars, whose cost only
+    # depends on the window width. Blocks are hidden, so the scene skips them.
+    def _updateLevelOfDetail(self : Self) -> None:
+        count = sum(len(line) for line in self._lines)
+        duration = sum(line.duration() for line in self._lines)
+        enabled = count != 0 and duration / count * self._unit < LOD_BLOCK_WIDTH_PX
+        if enabled == self._levelOfDetail:
+            return
+        self._levelOfDetail = enabled
+        for line in self._lines:
+            for block in line:
+                block.setVisible(not enabled)
+        # The density bars are part of the cached background.
         self._redrawScene()
 
     def offset(self):
@@ -451,12 +822,12 @@ class TimelineScene(QGraphicsScene):
         return max_time * self._unit
 
     def setOffset(self, offset):
-        offset = max(0, min(self._maxOffset(), offset))
+        # Whole pixels: the view scrolls by whole pixels too.
+        offset = round(max(0, min(self._maxOffset(), offset)))
         self._offset = offset
-        for item in self.items():
-            item.setOffset(offset)
         self._cursor.setOffset(offset)
         self._background.setOffset(offset)
+        self._updateViews()
         self._redrawScene()
 
     def _pixelToTime(self : Self, x_px : float) -> int:
@@ -472,70 +843,169 @@ class TimelineScene(QGraphicsScene):
         # Change default block duration to 30s.
         return 30 * 1000
 
+    def _toPixelSpace(self : Self, painter : QPainter) -> None:
+        transform = pixelToSceneTransform(self._unit, self._offset)
+        painter.setWorldTransform(transform * painter.worldTransform())
+
     def drawBackground(self, painter, rect):
+        painter.save()
+        self._toPixelSpace(painter)
         self._background.paint(painter, QStyleOptionGraphicsItem())
+        if self._levelOfDetail:
+            self._drawDensity(painter, rect)
+        painter.restore()
+
+    # Draws the lines in the exposed |rect| (scene coordinates) as bars shaded
+    # by the fraction of their width covered by blocks. Contiguous bars of the
+    # same shade are merged.
+    def _drawDensity(self : Self, painter : QPainter, rect : QRectF) -> None:
+        first_bar = max(0, int((rect.left() * self._unit - self._offset) // LOD_BAR_WIDTH_PX))
+        last_bar = min(self._windowWidth, rect.right() * self._unit - self._offset) // LOD_BAR_WIDTH_PX + 1
+        first_line = self._pixelToLine(rect.top())
+        last_line = min(len(self._lines), self._pixelToLine(rect.bottom()) + 1)
+
+        start = self._offset / self._unit
+        step = LOD_BAR_WIDTH_PX / self._unit
+        bars = range(first_bar, int(last_bar))
+        levels : list[list[QRectF]] = [ [] for _ in range(LOD_LEVELS) ]
+        for index in range(first_line, last_line):
+            line = self._lines[index]
+            y = LINE_START_PX + index * LINE_HEIGHT_PX + 1
+            covered = [ line.coveredBefore(start + i * step) for i in range(bars.start, bars.stop + 1) ]
+            previous = None
+            for i in bars:
+                fraction = (covered[i - bars.start + 1] - covered[i - bars.start]) / step
+                level = min(LOD_LEVELS - 1, int(fraction * LOD_LEVELS)) if fraction > 0 else None
+                if level is not None and level == previous:
+                    bar = levels[level][-1]
+                    bar.setWidth(bar.width() + LOD_BAR_WIDTH_PX)
+                elif level is not None:
+                    levels[level].append(QRectF(i * LOD_BAR_WIDTH_PX, y, LOD_BAR_WIDTH_PX, LINE_HEIGHT_PX - 1))
+                previous = level
+
+        painter.setPen(Qt.PenStyle.NoPen)
+        for level, rects in enumerate(levels):
+            if len(rects) == 0:
+                continue
+            color = QColor.fromRgb(81, 176, 245)
+            color.setAlphaF((level + 1) / LOD_LEVELS)
+            painter.setBrush(QBrush(color))
+            painter.drawRects(rects)
 
     def drawForeground(self, painter, rect):
+        if not rect.intersects(self._cursor.boundingRect()):
+            return
+        painter.save()
+        self._toPixelSpace(painter)
         self._cursor.paint(painter, QStyleOptionGraphicsItem())
+        painter.restore()
 
-    # Tries to insert the |block| in the list at index |line|.
+    # Tries to insert the |block| in the line at index |line|.
     # Returns True is insertion was done, False otherwise.
     def _addBlockToLine(self, block, line):
         if len(self._lines) <= line:
-            self._lines.append([] * (line - len(self._lines)))
-            self._lines[line].append(block)
+            while len(self._lines) <= line:
+                self._lines.append(TimelineLine())
+            self._lines[line].insert(block)
             self._onLineCountChange()
             return True
 
-        for i in range(len(self._lines[line])):
-            item = self._lines[line][i]
-            # Block on the rigt, insert left.
-            if item.x() >= block.x() + block.width():
-                self._lines[line].insert(i, block)
-                return True
-            # Block on the left, continue checking.
-            if item.x() + item.width() <= block.x():
-                continue
-            # Block neither on the right nor on the left, overlapping.
-            return False
-
-        # Not inserted yet, meaning block is at the end of the list.
-        self._lines[line].append(block)
-        return True
+        return self._lines[line].insert(block)
 
     # Add a block to the timeline.
     def addBlock(self, block):
-        block.setUnit(self._unit)
+        self._insertBlock(block)
+        with self._editTimeline() as timeline:
+            block.setIdentifier(timeline.addSymptom(block.symptom(), *self._blockRange(block)))
+        self._blocks[block.identifier()] = block
+
+    # Shows |block| on the first line it fits in.
+    def _insertBlock(self : Self, block : TimelineBlock) -> None:
+        block.setVisible(not self._levelOfDetail)
         self.addItem(block)
         for i in range(len(self._lines) + 1):
             if self._addBlockToLine(block, i):
                 block.setLine(i)
                 break
+        self._extendSceneRect(block.rawX() + block.rawWidth())
+        self._updateLevelOfDetail()
         self._redrawScene()
 
     def reset(self : Self) -> None:
+        self.setBlocks([])
+
+    # Replaces all the blocks of the scene, and the timeline with a new one
+    # holding them.
+    def setBlocks(self : Self, blocks : list[TimelineBlock]) -> None:
+        timeline = Timeline()
+        identifiers = timeline.bulkLoad((x.symptom(), *self._blockRange(x)) for x in blocks)
+        for block, identifier in zip(blocks, identifiers):
+            block.setIdentifier(identifier)
+        self._bindTimeline(timeline, blocks)
+        self._placeBlocks(blocks)
+
+    # Shows |timeline| in the scene, and returns it from getTimeline(). The
+    # edits done in the scene are written to it, and its changes are shown.
+    def setTimeline(self : Self, timeline : Timeline) -> None:
+        blocks = []
+        for item in timeline.getSymptoms():
+            block = TimelineBlock(item.symptom, item.start, item.duration)
+            block.setIdentifier(item.identifier)
+            blocks.append(block)
+        self._bindTimeline(timeline, blocks)
+        self._placeBlocks(blocks)
+
+    # Replaces all the blocks of the scene in one pass: lines are assigned by
+    # packIntervals(), and the scene rect is computed and the scene redrawn
+    # once. The BSP index inserts the new blocks lazily, in one update.
+    def _placeBlocks(self : Self, blocks : list[TimelineBlock]) -> None:
         for line in self._lines:
             for block in line:
-                assert self.removeBlock(block)
-        self._lines.clear()
+                self.removeItem(block)
+
+        intervals = [ (x.rawX(), x.rawX() + x.rawWidth()) for x in blocks ]
+        lines = packIntervals(intervals)
+        self._lines = [ TimelineLine() for _ in range(max(lines, default=-1) + 1) ]
+        self._levelOfDetail = False
+        # Sorted by start: each insertion appends to its line.
+        for i in sorted(range(len(blocks)), key=lambda x: intervals[x]):
+            blocks[i].setLine(lines[i])
+            blocks[i].setVisible(True)
+            self.addItem(blocks[i])
+            success = self._lines[lines[i]].insert(blocks[i])
+            assert success
+
+        self._extendSceneRect(max((end for _, end in intervals), default=0))
+        self._updateLevelOfDetail()
         self._onLineCountChange()
-        self._redrawScene()
 
     def removeBlock(self : Self, block : TimelineBlock) -> bool:
-        for line in self._lines:
-            if block in line:
-                line.remove(block)
-                self.removeItem(block)
-                self._trimEmptyLines()
-                self._redrawScene()
-                return True
-        return False
+        if not self._detachBlock(block):
+            return False
+        identifier = block.identifier()
+        assert identifier is not None
+        with self._editTimeline() as timeline:
+            timeline.removeSymptom(identifier)
+        del self._blocks[identifier]
+        block.setIdentifier(None)
+        return True
+
+    def _detachBlock(self : Self, block : TimelineBlock) -> bool:
+        if len(self._lines) <= block.line() or block not in self._lines[block.line()]:
+            return False
+        self._lines[block.line()].remove(block)
+        self.removeItem(block)
+        self._trimEmptyLines()
+        self._updateLevelOfDetail()
+        self._redrawScene()
+        return True
 
     def blockAt(self : Self, x : float, y : float) -> Optional[TimelineBlock]:
         line = self._pixelToLine(y)
-        if len(self._lines) <= line:
+        # Blocks are not shown: they can't be picked either.
+        if self._levelOfDetail or len(self._lines) <= line:
             return None
-        for block in self._lines[line]:
+        for block in self._lines[line].around((x + self._offset) / self._unit):
             if block.intersects(x, y):
                 return block
         return None
@@ -544,8 +1014,15 @@ class TimelineScene(QGraphicsScene):
         return self._cursor.rawX()
 
     def updateCursorPosition(self, position):
-        self._cursor.setRawX(position)
-        self._redrawScene()
+        self._moveCursor(position)
+
+    # Only the areas covered by the cursor before and after the move are
+    # repainted. The blocks and the background below it come from caches.
+    def _moveCursor(self : Self, time : float) -> None:
+        old_rect = self._cursor.boundingRect()
+        self._cursor.setRawX(time)
+        self.update(old_rect)
+        self.update(self._cursor.boundingRect())
 
     def updateMediaDuration(self, duration):
         self._media_duration = duration
@@ -558,17 +1035,31 @@ class TimelineScene(QGraphicsScene):
         for item in self.items():
             item.invalidateData()
 
+    # Tooltips are built for the hovered block only, instead of for every block
+    # each time it changes.
+    def helpEvent(self : Self, event : QGraphicsSceneHelpEvent) -> None:
+        position = self._eventPosition(event)
+        block = self.blockAt(position.x(), position.y())
+        if block is None:
+            QToolTip.hideText()
+            event.ignore()
+            return
+        QToolTip.showText(event.screenPos(), block.tooltip(), self.views()[0])
+        event.accept()
+
     def _handleLeftClick(self : Self, event : QGraphicsSceneMouseEvent) -> None:
-        if self._cursor.intersects(event.scenePos().x(), event.scenePos().y()):
-            self._dragState = DragState(event.scenePos(), self._cursor)
+        position = self._eventPosition(event)
+        if self._cursor.intersects(position.x(), position.y()):
+            self._dragState = DragState(position, self._cursor)
             return
 
-        block = self.blockAt(event.scenePos().x(), event.scenePos().y())
-        self._dragState = DragState(event.scenePos(), block)
+        block = self.blockAt(position.x(), position.y())
+        self._dragState = DragState(position, block)
         event.accept()
 
     def _handleRightClick(self : Self, event : QGraphicsSceneMouseEvent) -> None:
-        block = self.blockAt(event.scenePos().x(), event.scenePos().y())
+        position = self._eventPosition(event)
+        block = self.blockAt(position.x(), position.y())
         widget = self.views()[0]
         popupMenu = QMenu(I18N("edit"), widget)
 
@@ -581,6 +1072,10 @@ class TimelineScene(QGraphicsScene):
             edit_action.triggered.connect(lambda: self.on_symptom_edit.emit(block.symptom()))
             popupMenu.addAction(edit_action)
 
+        repack_action = QAction(I18N("repack"), widget)
+        repack_action.triggered.connect(self.repack)
+        popupMenu.addAction(repack_action)
+
         popupMenu.popup(event.screenPos())
         event.accept()
 
@@ -597,48 +1092,52 @@ class TimelineScene(QGraphicsScene):
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.LeftButton:
+            self._applyPendingMove()
             self._dragState = None
         event.accept()
 
+    # The pointer can report moves faster than the screen refreshes: they are
+    # coalesced, and the drag is updated at most once per frame.
     def mouseMoveEvent(self, event):
         if self._dragState is None:
             return
 
         event.accept()
+        self._pendingMove = self._eventPosition(event)
+        if not self._moveTimer.isActive():
+            self._moveTimer.start()
+
+    def _applyPendingMove(self : Self) -> None:
+        self._moveTimer.stop()
+        position, self._pendingMove = self._pendingMove, None
+        if self._dragState is None or position is None:
+            return
+
         if self._dragState.item() is None:
-            self._handlePan(event)
+            self._handlePan(position)
             return
 
         if type(self._dragState.item()) == TimelineCursor:
-            self._handleSeek(event)
+            self._handleSeek(position)
             return
 
         if self._dragState.grabbedLeftHandle():
-            self._handleLeftResize(event, self._dragState.item())
+            self._handleLeftResize(position, self._dragState.item())
         elif self._dragState.grabbedRightHandle():
-            self._handleRightResize(event, self._dragState.item())
+            self._handleRightResize(position, self._dragState.item())
         else:
-            self._handleMove(event, self._dragState.item())
+            self._handleMove(position, self._dragState.item())
 
-    def _handlePan(self, event):
-        delta = self._dragState.latchDelta(event.scenePos())
+    def _handlePan(self, position):
+        delta = self._dragState.latchDelta(position)
         offset = max(0, self._offset - delta.x())
         self.setOffset(offset)
 
     def _getCollidingBlocks(self, line, x, width):
         if len(self._lines) <= line:
             return []
-
-        colliders = []
-        for item in self._lines[line]:
-            if item.x() + item.width() <= x:
-                continue
-
-            # Early exit: list is sorted, we know no block will collide.
-            if item.x() >= x + width:
-                break
-            colliders.append(item)
-        return colliders
+        start = (x + self._offset) / self._unit
+        return self._lines[line].overlapping(start, start + width / self._unit)
 
     def _trimEmptyLines(self : Self):
         line_trimmed = False
@@ -659,9 +1158,30 @@ class TimelineScene(QGraphicsScene):
 
         success = self._addBlockToLine(block, new_line)
         assert success
+        self._onBlockChanged(block)
+        self._extendSceneRect(block.rawX() + block.rawWidth())
         self._trimEmptyLines()
-        self._redrawScene()
+        # The block repaints the areas it left and entered, the rest of the
+        # scene is unchanged.
+        self._updateLevelOfDetail()
 
+    # Moves |block| to [start, start + duration[, on its line if it still fits
+    # there, otherwise on the first line it fits in.
+    def _relocateBlock(self : Self, block : TimelineBlock, start : float, duration : float) -> None:
+        self._lines[block.line()].remove(block)
+        block.setRawX(start)
+        block.setRawWidth(duration)
+        candidates = [ block.line() ] + [ i for i in range(len(self._lines) + 1) if i != block.line() ]
+        for i in candidates:
+            if self._addBlockToLine(block, i):
+                block.setLine(i)
+                break
+        self._extendSceneRect(start + duration)
+        self._trimEmptyLines()
+        self._updateLevelOfDetail()
+        # The density bars are part of the cached background.
+        if self._levelOfDetail:
+            self._redrawScene()
 
     def _printLine(self, line):
         print("line {:2}: ".format(line), end="")
@@ -682,51 +1202,50 @@ class TimelineScene(QGraphicsScene):
             return True
         return False
 
-    def _handleMove(self, event, block):
-        delta = self._dragState.delta(event.scenePos())
+    def _handleMove(self, position, block):
+        delta = self._dragState.delta(position)
 
         new_x = max(0, self._dragState.item().x() + delta.x())
-        new_line = self._pixelToLine(event.scenePos().y())
+        new_line = self._pixelToLine(position.y())
 
         if self._tryCommitBlockChange(block, new_line, new_x, block.width()):
-            self._dragState.latchDelta(event.scenePos())
+            self._dragState.latchDelta(position)
 
-    def _handleLeftResize(self, event, block):
-        delta = self._dragState.delta(event.scenePos())
+    def _handleLeftResize(self, position, block):
+        delta = self._dragState.delta(position)
         new_x = block.x() + delta.x()
         new_width = block.width() - delta.x()
         if new_width < TimelineBlock.HANDLE_CUTOFF:
             return
         if self._tryCommitBlockChange(block, block.line(), new_x, new_width):
-            self._dragState.latchDelta(event.scenePos())
+            self._dragState.latchDelta(position)
 
-    def _handleRightResize(self, event, block):
-        delta = self._dragState.delta(event.scenePos())
+    def _handleRightResize(self, position, block):
+        delta = self._dragState.delta(position)
         new_x = block.x()
         new_width = block.width() + delta.x()
         if new_width < TimelineBlock.HANDLE_CUTOFF:
             return
         if self._tryCommitBlockChange(block, block.line(), new_x, new_width):
-            self._dragState.latchDelta(event.scenePos())
+            self._dragState.latchDelta(position)
 
-    def _handleSeek(self, event):
-        delta = self._dragState.latchDelta(event.scenePos())
+    def _handleSeek(self, position):
+        delta = self._dragState.latchDelta(position)
         new_x = self._dragState.item().x() + delta.x()
 
         new_x = max(0, new_x)
         if self._media_duration is not None:
             new_x = min(new_x, self._media_duration * self._unit - self._offset)
 
-        self._cursor.setX(new_x)
-        self._redrawScene()
+        self._moveCursor((new_x + self._offset) / self._unit)
         self.on_seek.emit(self._cursor.rawX())
 
     def wheelEvent(self : Self, event : QWheelEvent, mouse_position : QPointF) -> None:
         # Normalized cursor position
-        normalize = mouse_position.x() / self.sceneRect().width()
+        normalize = mouse_position.x() / self._windowWidth
 
         old_start = self.offset()
-        old_end = old_start + self.sceneRect().width() / self._unit
+        old_end = old_start + self._windowWidth / self._unit
         # Coordinates (timeline local) of the aimed point.
         old_aimed = old_start + (old_end - old_start) * normalize
 
@@ -739,7 +1258,7 @@ class TimelineScene(QGraphicsScene):
 
         # Recompute start, end, aimed after the zoom.
         new_start = self.offset()
-        new_end = new_start + self.sceneRect().width() / self._unit
+        new_end = new_start + self._windowWidth / self._unit
         new_aimed = new_start + (new_end - new_start) * normalize
 
         # We want to point under the mouse to remains the same.
@@ -765,6 +1284,9 @@ class TimelineView(QGraphicsView):
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff);
         # Always show vertical ones.
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn);
+        # The background only changes on zoom, pan or resize: the cursor moves
+        # are painted over a cached copy.
+        self.setCacheMode(QGraphicsView.CacheBackground)
 
     def wheelEvent(self, event):
         self.scene().wheelEvent(event, self._mouse_position)
@@ -812,9 +1334,7 @@ class TimelineWidget(QWidget):
         self._scene.invalidateSymptomsContent()
 
     def setTimeline(self : Self, timeline : Timeline):
-        self._scene.reset()
-        for item in timeline.getSymptoms():
-            self._scene.addBlock(TimelineBlock(item.symptom, item.start, item.duration))
+        self._scene.setTimeline(timeline)
 
     def getTimeline(self : Self) -> Timeline:
         return self._scene.getTimeline()
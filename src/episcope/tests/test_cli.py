@@ -0,0 +1,127 @@
+import io
+import json
+import pytest
+
+from episcope.cli import BatchOptions, buildCohortIndex, findTimelines, main, parseSymptomFilter, runBatch
+from episcope.core import SymptomDB
+
+SYMPTOMS = {
+    "attributes": [
+        {
+            "name": "lateralized",
+            "type": "exclusive",
+            "values": [ "left", "right" ]
+        }
+    ],
+    "objective_symptoms": [
+        {
+            "name": "category",
+            "children": [
+                { "name": "a", "attributes": [ "lateralized" ] },
+                { "name": "b" }
+            ]
+        }
+    ],
+    "subjective_symptoms": [
+        {
+            "name": "other",
+            "children": [ { "name": "c" } ]
+        }
+    ]
+}
+
+TIMELINE = [
+    { "symptom": { "path": "objective_symptoms/category/a", "attributes": { "lateralized": [ "left" ] } }, "start": 0, "end": 1000 },
+    { "symptom": { "path": "subjective_symptoms/other/c", "attributes": {} }, "start": 500, "end": 2000 }
+]
+
+@pytest.fixture()
+def database() -> SymptomDB:
+    return SymptomDB.deserialize(SYMPTOMS)
+
+@pytest.fixture()
+def tree(tmp_path):
+    (tmp_path / "in" / "sub").mkdir(parents = True)
+    (tmp_path / "in" / "a.json").write_text(json.dumps(TIMELINE))
+    (tmp_path / "in" / "sub" / "b.json").write_text(json.dumps(TIMELINE))
+    (tmp_path / "in" / "sub" / "bad.json").write_text('[{"start": 0}]')
+    (tmp_path / "in" / "notes.txt").write_text("")
+    (tmp_path / "symptoms.json").write_text(json.dumps(SYMPTOMS))
+    return tmp_path
+
+def test_find_timelines(tree):
+    (tree / "in" / "symptoms.json").write_text(json.dumps(SYMPTOMS))
+    (tree / "in" / "out").mkdir()
+    (tree / "in" / "out" / "a.json").write_text(json.dumps(TIMELINE))
+
+    assert findTimelines(str(tree / "in"), [ str(tree / "in" / "out") ]) == [ "a.json", "sub/b.json", "sub/bad.json" ]
+
+def test_run_batch(tree, database):
+    options = BatchOptions(str(tree / "in"), str(tree / "out"), report = True, json = True, frieze = None, unit = None)
+    log = io.StringIO()
+
+    assert runBatch(database, options, 1, log) == 1
+
+    assert (tree / "out" / "sub" / "b.txt").read_text().startswith("Patient number:")
+    assert json.loads((tree / "out" / "a.json").read_text()) == TIMELINE
+    assert not (tree / "out" / "sub" / "bad.txt").exists()
+    assert log.getvalue().splitlines()[1].startswith("[2/3] sub/b.json")
+    assert log.getvalue().splitlines()[2].startswith("[3/3] sub/bad.json: error: ")
+    assert log.getvalue().splitlines()[-1] == "3 timelines, 1 failed."
+
+def test_main_workers(tree, capsys):
+    (tree / "in" / "sub" / "bad.json").unlink()
+
+    assert main([ "batch", str(tree / "in"), "-o", str(tree / "out"), "--symptoms", str(tree / "symptoms.json"), "-j", "2" ]) == 0
+
+    assert (tree / "out" / "a.txt").exists()
+    assert (tree / "out" / "sub" / "b.txt").exists()
+    assert not (tree / "out" / "a.json").exists()
+    assert capsys.readouterr().err.splitlines()[-1] == "2 timelines, 0 failed."
+
+def test_main_json_over_inputs(tree):
+    with pytest.raises(SystemExit):
+        main([ "batch", str(tree / "in"), "-o", str(tree / "in"), "--json" ])
+
+def test_parse_symptom_filter():
+    assert parseSymptomFilter("a") == ("a", {})
+    assert parseSymptomFilter("Head version:lateralized=left") == ("Head version", { "lateralized": "left" })
+    assert parseSymptomFilter("a:x=1,y=2") == ("a", { "x": "1", "y": "2" })
+    assert parseSymptomFilter("a:b") == ("a:b", {})
+    with pytest.raises(ValueError):
+        parseSymptomFilter("a:x=1,y")
+
+def test_build_cohort_index(tree):
+    log = io.StringIO()
+
+    assert buildCohortIndex(str(tree / "in"), str(tree / "cohort.idx"), log) == 1
+
+    assert log.getvalue().splitlines()[0].startswith("sub/bad.json: error: ")
+    assert log.getvalue().splitlines()[-1] == "2 timelines indexed, 1 failed."
+
+def test_build_cohort_index_with_database(tree, database):
+    (tree / "in" / "unknown.json").write_text(json.dumps([ { "symptom": { "path": "objective_symptoms/category/z", "attributes": {} }, "start": 0, "end": 1 } ]))
+    log = io.StringIO()
+
+    assert buildCohortIndex(str(tree / "in"), str(tree / "cohort.idx"), log, database) == 2
+    assert log.getvalue().splitlines()[-1] == "2 timelines indexed, 2 failed."
+
+def test_main_query(tree, capsys):
+    (tree / "in" / "sub" / "c.json").write_text(json.dumps([ TIMELINE[1] ]))
+    assert main([ "index", str(tree / "in"), "-o", str(tree / "cohort.idx"), "--symptoms", str(tree / "symptoms.json") ]) == 1
+    capsys.readouterr()
+
+    assert main([ "query", str(tree / "cohort.idx"), "a:lateralized=left", "--within-onset", "0" ]) == 0
+    output = capsys.readouterr()
+    assert output.out == "a.json\nsub/b.json\n"
+    assert output.err == "2 occurrences in 2 timelines.\n"
+
+    assert main([ "query", str(tree / "cohort.idx"), "c", "--after", "a", "--within", "500", "--occurrences" ]) == 0
+    assert capsys.readouterr().out == "a.json\t500\t2000\nsub/b.json\t500\t2000\n"
+
+    assert main([ "query", str(tree / "cohort.idx"), "c", "--overlapping", "a:lateralized=right" ]) == 0
+    assert capsys.readouterr().out == ""
+
+def test_main_query_needs_within(tree):
+    with pytest.raises(SystemExit):
+        main([ "query", str(tree / "cohort.idx"), "c", "--after", "a" ])